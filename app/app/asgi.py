@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+
+from comment.stream import with_streams
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
+os.environ.setdefault('COMMENT_STREAMS', '1')
+
+# Comment streams are served in front of Django, see comment.stream
+application = with_streams(get_asgi_application())
 
-application = get_asgi_application()
+# Each worker fills its own connection pool before serving
+if settings.DB_POOL_SIZE:
+    call_command('wait_for_db', warm=True)
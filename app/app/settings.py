@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -39,9 +40,11 @@ INSTALLED_APPS = [
     'user',
     'post',
     'comment',
+    'search',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
 ]
 
 if DEBUG:
@@ -62,12 +66,20 @@ if DEBUG:
 
 ROOT_URLCONF = 'app.urls'
 
+# Templates are compiled once per process outside DEBUG
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -80,20 +92,99 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Route the hot read endpoints to async views; enabled when serving ASGI
+ASYNC_VIEWS = bool(int(os.environ.get('ASYNC_VIEWS', 0)))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are checked before
+# reuse. With DB_POOL_SIZE set, closed connections go to an in-process
+# pool instead, shared by the threads of a worker.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS',)
+        'PASSWORD': os.environ.get('DB_PASS',),
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(
+            os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(int(
+            os.environ.get('DB_HEALTH_CHECKS', 1))),
+        'OPTIONS': {
+            'application_name': os.environ.get('DB_APP_NAME', 'iforum'),
+        },
+        'POOL': {
+            'SIZE': DB_POOL_SIZE,
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+        } if DB_POOL_SIZE else None,
     }
 }
 
+# Read replicas as comma separated host[:port] of copies of the default
+# database. Views opt in to reading from them; clients that wrote read
+# from the primary for DB_REPLICA_PIN_SECONDS afterwards.
+DATABASE_REPLICAS = []
+for n, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    host, _, port = replica.strip().partition(':')
+    DATABASES[f'replica{n}'] = dict(
+        DATABASES['default'], HOST=host, PORT=port,
+        TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{n}')
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+
+
+# Cache
+# A per-worker LRU in front of a shared cache: Redis when REDIS_URL is
+# set, otherwise a process local stand in.
+
+REDIS_URL = os.environ.get('REDIS_URL')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': int(
+                os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 1000)),
+            'LOCAL_TIMEOUT': int(os.environ.get('CACHE_LOCAL_TIMEOUT', 5)),
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'iforum',
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'iforum-shared',
+    },
+}
+# Whether every process sees the shared cache: on with Redis, and safe to
+# turn on for a single process. Change stamps, post page fragments and
+# token snapshots, which other processes must see retired, are off without.
+CACHE_SHARED = bool(int(os.environ.get('CACHE_SHARED', int(bool(REDIS_URL)))))
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', 300))
+# Seconds an API token and its user are served from the cache, 0 to disable;
+# off by default unless changes made by other processes retire them
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get(
+    'AUTH_TOKEN_CACHE_TIMEOUT', 300 if CACHE_SHARED else 0))
+# 'db' issues authtoken tokens, 'signed' short lived signed access tokens
+# with refresh tokens; both kinds are accepted either way
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+AUTH_ACCESS_TOKEN_TTL = int(os.environ.get('AUTH_ACCESS_TOKEN_TTL', 900))
+AUTH_REFRESH_TOKEN_TTL = int(
+    os.environ.get('AUTH_REFRESH_TOKEN_TTL', 14 * 24 * 3600))
+# Seconds database tokens stay valid, 0 for ever
+AUTH_DB_TOKEN_TTL = int(os.environ.get('AUTH_DB_TOKEN_TTL', 0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -134,6 +225,22 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 
+# Gallery derivatives: downscaled copies written next to each upload
+THUMBNAIL_WIDTHS = [
+    int(width) for width in
+    os.environ.get('THUMBNAIL_WIDTHS', '100,200,400,800').split(',')]
+THUMBNAIL_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', 80))
+THUMBNAIL_ASYNC = bool(int(os.environ.get('THUMBNAIL_ASYNC', 1)))
+
+# Gallery uploads are spooled to FILE_UPLOAD_TEMP_DIR; keeping it on the
+# MEDIA_ROOT volume lets storage move the file instead of copying it
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
+GALLERY_MAX_UPLOAD_SIZE = int(
+    os.environ.get('GALLERY_MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
+GALLERY_MAX_DIMENSION = int(os.environ.get('GALLERY_MAX_DIMENSION', 8000))
+GALLERY_MAX_PIXELS = int(os.environ.get('GALLERY_MAX_PIXELS', 40000000))
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -142,15 +249,109 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies setting X-Forwarded-For in front of the app: 0 under uwsgi,
+    # whose REMOTE_ADDR is the client, 1 behind the ASGI nginx proxy
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES') or (
+        1 if os.environ.get('APP_SERVER') == 'asgi' else 0)),
+}
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 100))
+
+# Comment streams: published only when served, under ASGI; 'postgres'
+# fans out through LISTEN/NOTIFY across processes, 'local' only within
+# the publishing process
+COMMENT_STREAMS = bool(int(os.environ.get(
+    'COMMENT_STREAMS', int(os.environ.get('APP_SERVER') == 'asgi'))))
+COMMENT_STREAM_BROKER = os.environ.get('COMMENT_STREAM_BROKER', 'postgres')
+COMMENT_STREAM_HEARTBEAT = int(os.environ.get('COMMENT_STREAM_HEARTBEAT', 15))
+COMMENT_STREAM_BACKLOG = 100
+
+# Token bucket limits of unsafe requests, see core.throttling:
+# scope -> {'user' | 'ip' | 'endpoint': (rate, burst)}
+THROTTLE_ENABLED = bool(int(os.environ.get('THROTTLE_ENABLED', 1)))
+THROTTLE_RATES = {
+    'comment': {
+        'user': ('10/min', 5),
+        'ip': ('30/min', 10),
+        'endpoint': ('1200/min', 100),
+    },
+    'post': {
+        'user': ('30/hour', 10),
+        'ip': ('60/hour', 20),
+        'endpoint': ('600/min', 100),
+    },
+    'upload': {
+        'user': ('30/hour', 5),
+        'ip': ('60/hour', 10),
+        'endpoint': ('120/min', 20),
+    },
+    'signup': {
+        'ip': ('10/hour', 3),
+        'endpoint': ('60/min', 20),
+    },
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
 
+# Post views are buffered per worker and written in batches
+VIEW_COUNTER_FLUSH_INTERVAL = int(
+    os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', 10))
+VIEW_COUNTER_FLUSH_THRESHOLD = int(
+    os.environ.get('VIEW_COUNTER_FLUSH_THRESHOLD', 100))
+# Flushed views land on one of VIEW_COUNTER_SHARDS rows per post, summed
+# into Post.views once per VIEW_ROLLUP_INTERVAL seconds
+VIEW_COUNTER_SHARDS = int(os.environ.get('VIEW_COUNTER_SHARDS', 8))
+VIEW_ROLLUP_INTERVAL = int(os.environ.get('VIEW_ROLLUP_INTERVAL', 60))
+
+# Homepage feed: cached window of newest posts and per-post cards
+FEED_PAGE_SIZE = int(os.environ.get('FEED_PAGE_SIZE', 20))
+FEED_WINDOW_SIZE = int(os.environ.get('FEED_WINDOW_SIZE', 1000))
+FEED_CACHE_TIMEOUT = int(os.environ.get('FEED_CACHE_TIMEOUT', 3600))
+# Seconds change stamps of conditional GETs and post fragments are kept
+CHANGE_STAMP_TIMEOUT = int(os.environ.get('CHANGE_STAMP_TIMEOUT', 86400))
+# Rendered post detail fragments, keyed on the post's change stamp
+POST_FRAGMENT_CACHE_TIMEOUT = int(
+    os.environ.get('POST_FRAGMENT_CACHE_TIMEOUT', 3600))
+
+COMMENT_PAGE_SIZE = int(os.environ.get('COMMENT_PAGE_SIZE', 50))
+
+# Trending posts: publishing, views and comments count with their weight,
+# halved every TRENDING_HALF_LIFE seconds; post.checks refuses a publish
+# weight or half life <= 0
+TRENDING_HALF_LIFE = int(os.environ.get('TRENDING_HALF_LIFE', 86400))
+TRENDING_PUBLISH_WEIGHT = float(
+    os.environ.get('TRENDING_PUBLISH_WEIGHT', 20))
+TRENDING_VIEW_WEIGHT = float(os.environ.get('TRENDING_VIEW_WEIGHT', 1))
+TRENDING_COMMENT_WEIGHT = float(
+    os.environ.get('TRENDING_COMMENT_WEIGHT', 10))
+TRENDING_SIZE = int(os.environ.get('TRENDING_SIZE', 20))
+
+# Full-text search over posts and comments
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+SEARCH_FACET_SIZE = int(os.environ.get('SEARCH_FACET_SIZE', 10))
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Background tasks, run by `manage.py run_tasks`. TASKS_EAGER runs them
+# inline instead, for development without a worker.
+TASKS_EAGER = bool(int(os.environ.get('TASKS_EAGER', 0)))
+TASK_BATCH_SIZE = int(os.environ.get('TASK_BATCH_SIZE', 10))
+TASK_MAX_ATTEMPTS = int(os.environ.get('TASK_MAX_ATTEMPTS', 5))
+TASK_RETRY_BACKOFF = float(os.environ.get('TASK_RETRY_BACKOFF', 2))
+TASK_RETRY_MAX_DELAY = float(os.environ.get('TASK_RETRY_MAX_DELAY', 600))
+TASK_TIMEOUT = int(os.environ.get('TASK_TIMEOUT', 300))
+TASK_RETENTION = int(os.environ.get('TASK_RETENTION', 7 * 24 * 3600))
+
+# Fraction of requests profiled by core.middleware.ProfilingMiddleware and
+# how often a statement may repeat before it is flagged as an N+1 query
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0.01))
+PROFILING_NPLUSONE_THRESHOLD = int(
+    os.environ.get('PROFILING_NPLUSONE_THRESHOLD', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -160,15 +361,28 @@ LOGGING = {
             "datefmt": "%Y-%m-%d %H:%M",
             "style": "{",
         },
+        "plain": {"format": "{message}", "style": "{"},
     },
     "handlers": {
         "console": {"class": "logging.StreamHandler",
                     "stream":"ext://sys.stdout",
                     "formatter": "verbose",
                     },
+        "profile": {"class": "logging.StreamHandler",
+                    "stream": "ext://sys.stdout",
+                    "formatter": "plain",
+                    },
+        },
+    "loggers": {
+        "core.profiling": {
+            "handlers": ["profile"],
+            "level": "INFO",
+            "propagate": False,
         },
+    },
     "root": {
             "handlers": ["console"],
-            "level": "DEBUG",
+            "level": os.environ.get(
+                'LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO'),
         }
     }
@@ -8,8 +8,11 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path('', include('post.urls')),
     path("user/", include("user.urls")),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -19,6 +22,8 @@ urlpatterns = [
         name='api-docs',),
     path('api/user/', include('user.api_urls')),
     path('api/comment/', include('comment.api_urls')),
+    path('api/search/', include('search.api_urls')),
+    path('api/cache/', include('core.api_urls')),
     path('api/', include('post.api_urls')),]
 
 if settings.DEBUG:
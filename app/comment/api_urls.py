@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from comment import views
@@ -10,3 +11,9 @@ app_name = 'comment'
 urlpatterns = [
     path('', include(router.urls)),
     ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('comments/', views.CommentViewSet.as_async_view(
+            {'get': 'list', 'post': 'create'}), name='comment-list'),
+    ] + urlpatterns
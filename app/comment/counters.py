@@ -0,0 +1,37 @@
+""" Denormalized comment counts per commented object """
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.models import CommentCounter
+
+
+def add_comments(content_type_id, object_id, n=1):
+    """ Atomically add ``n`` (possibly negative) to a target's count. """
+    counters = CommentCounter.objects.filter(
+        content_type_id=content_type_id, object_id=object_id)
+    if counters.update(count=F('count') + n) or n < 0:
+        return
+    try:
+        with transaction.atomic():
+            CommentCounter.objects.create(
+                content_type_id=content_type_id, object_id=object_id,
+                count=n)
+    except IntegrityError:
+        counters.update(count=F('count') + n)
+
+
+def get_counts(content_type_id, object_ids):
+    """ Return ``{object_id: count}`` for many targets in one query. """
+    counts = dict.fromkeys(object_ids, 0)
+    counts.update(CommentCounter.objects.filter(
+        content_type_id=content_type_id,
+        object_id__in=object_ids).values_list('object_id', 'count'))
+    return counts
+
+
+def get_count(obj):
+    """ Return the number of comments on ``obj``. """
+    content_type = ContentType.objects.get_for_model(obj)
+    return get_counts(content_type.id, [obj.pk])[obj.pk]
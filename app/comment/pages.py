@@ -0,0 +1,36 @@
+""" Loading one page of comments for a commented object """
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from core.models import Comment
+from core.pagination import from_cursor, to_cursor
+from comment.counters import get_count
+
+
+def load_comment_page(obj, cursor=None, size=None):
+    """
+    Return ``(comments, count, next_cursor)`` for the comments on ``obj``.
+
+    Comments come newest first from the (content_type, object_id,
+    created_at) index with their creators joined in, and the total comes
+    from the maintained counter, so a page costs two queries however
+    long the thread is.
+    """
+    size = size or settings.COMMENT_PAGE_SIZE
+    content_type = ContentType.objects.get_for_model(obj)
+    qs = Comment.objects.filter(
+        content_type=content_type, object_id=obj.pk).select_related(
+        'creator').order_by('-created_at', '-id')
+    position = from_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, pk = position
+        qs = qs.filter(Q(created_at__lt=created_at) |
+                       Q(created_at=created_at, id__lt=pk))
+    comments = list(qs[:size + 1])
+    next_cursor = None
+    if len(comments) > size:
+        comments = comments[:size]
+        next_cursor = to_cursor(comments[-1].created_at, comments[-1].pk)
+    return comments, get_count(obj), next_cursor
@@ -0,0 +1,27 @@
+""" Signal handlers keeping comment counters up to date """
+
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import metrics
+from core.models import Comment
+from comment import stream
+from comment.counters import add_comments
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """ Count a new comment on its target and stream it. """
+    if created:
+        add_comments(instance.content_type_id, instance.object_id)
+        stream.publish(instance)
+        metrics.COMMENTS_CREATED.labels(
+            ContentType.objects.get_for_id(instance.content_type_id).model,
+        ).inc()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """ Uncount a deleted comment. """
+    add_comments(instance.content_type_id, instance.object_id, -1)
@@ -0,0 +1,277 @@
+""" Server-Sent Events streams of new comments
+
+``GET /api/comment/stream/?content_type=<id>&object_id=<id>`` holds the
+connection open and sends each comment created on that object as a
+``comment`` event carrying its API representation. Reconnecting
+clients send ``Last-Event-ID`` and receive what they missed.
+
+Django 3.2 cannot stream from a coroutine, so streams are served by a
+small ASGI app in front of Django (``with_streams`` in ``app.asgi``);
+an idle subscriber costs a queue and a suspended coroutine. New
+comments are published after commit with Postgres ``NOTIFY``, which
+one ``LISTEN`` connection per worker fans out to its subscribers, or
+with COMMENT_STREAM_BROKER = 'local' straight to the subscribers of the
+publishing process. Nothing is published unless COMMENT_STREAMS is set,
+as it is under ASGI, since no process could be listening.
+
+Streams bypass Django's middleware: only the ``Host`` header is checked
+against ALLOWED_HOSTS here. They are anonymous and read only, like the
+comment list, so sessions, authentication, throttling and profiling do
+not apply to them.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.http.request import split_domain_port, validate_host
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/api/comment/stream/'
+CHANNEL = 'comments'
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD = 7900
+REPLAY_LIMIT = 100
+
+
+class Broker:
+    """ Subscriber queues of one worker process, per commented object. """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._listener = None
+        self._loop = None
+        self.listening = False
+
+    def __len__(self):
+        return sum(map(len, self._subscribers.values()))
+
+    def subscribe(self, key):
+        self._loop = asyncio.get_running_loop()
+        if settings.COMMENT_STREAM_BROKER == 'postgres':
+            self._listen()
+        queue = asyncio.Queue(maxsize=settings.COMMENT_STREAM_BACKLOG)
+        self._subscribers[key].add(queue)
+        return queue
+
+    def unsubscribe(self, key, queue):
+        queues = self._subscribers.get(key)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[key]
+
+    def publish(self, event):
+        """ Hand ``event`` to the subscribers of its object. """
+        key = (event['content_type'], event['object_id'])
+        for queue in list(self._subscribers.get(key, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: close the stream, the client
+                # reconnects and replays from its last event
+                self.unsubscribe(key, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def publish_threadsafe(self, event):
+        """ ``publish`` from any thread of the process. """
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self.publish, event)
+
+    def _listen(self):
+        if (self._listener is None or self._listener.done()
+                or self._listener.get_loop() is not self._loop):
+            self._listener = self._loop.create_task(self._run_listener())
+
+    async def _run_listener(self):
+        """ Relay NOTIFY events to the subscribers until cancelled. """
+        import psycopg2
+
+        loop = asyncio.get_running_loop()
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(
+                    **connections['default'].get_connection_params())
+                conn.autocommit = True
+                conn.cursor().execute(f'LISTEN {CHANNEL}')
+                ready = asyncio.Event()
+                loop.add_reader(conn, ready.set)
+                self.listening = True
+                try:
+                    while True:
+                        await ready.wait()
+                        ready.clear()
+                        conn.poll()
+                        while conn.notifies:
+                            await self._relay(conn.notifies.pop(0).payload)
+                finally:
+                    self.listening = False
+                    loop.remove_reader(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Comment stream listener failed, '
+                                 'reconnecting')
+                await asyncio.sleep(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    async def _relay(self, payload):
+        event = json.loads(payload)
+        if 'data' not in event:
+            from core.aio import database_sync_to_async
+            event = await database_sync_to_async(_load_event)(event['id'])
+            if event is None:
+                return
+        self.publish(event)
+
+
+broker = Broker()
+
+
+def _event(comment):
+    from comment.srzs import CommentSRZ
+
+    return {
+        'id': comment.pk,
+        'content_type': comment.content_type_id,
+        'object_id': comment.object_id,
+        'data': CommentSRZ(comment).data,
+    }
+
+
+def _load_event(pk):
+    from core.models import Comment
+
+    comment = Comment.objects.filter(pk=pk).first()
+    return comment and _event(comment)
+
+
+def publish(comment):
+    """ Stream ``comment`` to its subscribers once the write commits. """
+    if not settings.COMMENT_STREAMS:
+        return
+    event = _event(comment)
+
+    def send():
+        if settings.COMMENT_STREAM_BROKER != 'postgres':
+            return broker.publish_threadsafe(event)
+        payload = json.dumps(event)
+        if len(payload) > MAX_PAYLOAD:
+            payload = json.dumps({'id': comment.pk})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+    transaction.on_commit(send)
+
+
+def _replay(key, last_id):
+    from core.models import Comment
+
+    comments = Comment.objects.filter(
+        content_type_id=key[0], object_id=key[1], pk__gt=last_id,
+    ).order_by('pk')[:REPLAY_LIMIT]
+    return [_event(comment) for comment in comments]
+
+
+def _format(event):
+    data = json.dumps(event['data'])
+    return f'id: {event["id"]}\nevent: comment\ndata: {data}\n\n'.encode()
+
+
+async def _respond(send, status, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain')]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send(send, body):
+    await send({'type': 'http.response.body', 'body': body,
+                'more_body': True})
+
+
+async def _disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def stream(scope, receive, send):
+    """ ASGI app streaming the comments of one object. """
+    if scope['method'] != 'GET':
+        return await _respond(send, 405, b'Method not allowed')
+    params = parse_qs(scope['query_string'].decode())
+    headers = dict(scope['headers'])
+    try:
+        key = (int(params['content_type'][0]), int(params['object_id'][0]))
+        last_id = int(headers.get(b'last-event-id', 0))
+    except (KeyError, ValueError):
+        return await _respond(
+            send, 400, b'content_type and object_id are required')
+
+    queue = broker.subscribe(key)
+    disconnected = asyncio.ensure_future(_disconnect(receive))
+    getter = None
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream'),
+                                (b'cache-control', b'no-cache'),
+                                (b'x-accel-buffering', b'no')]})
+        await _send(send, b'retry: 3000\n\n')
+        if last_id:
+            from core.aio import database_sync_to_async
+            for event in await database_sync_to_async(_replay)(key, last_id):
+                await _send(send, _format(event))
+                last_id = event['id']
+        while True:
+            getter = getter or asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected}, return_when=asyncio.FIRST_COMPLETED,
+                timeout=settings.COMMENT_STREAM_HEARTBEAT)
+            if disconnected in done:
+                return
+            if getter not in done:
+                await _send(send, b': ping\n\n')
+                continue
+            event, getter = getter.result(), None
+            if event is None:
+                break
+            # Already sent when replayed
+            if event['id'] > last_id:
+                await _send(send, _format(event))
+        await send({'type': 'http.response.body'})
+    finally:
+        broker.unsubscribe(key, queue)
+        disconnected.cancel()
+        if getter is not None:
+            getter.cancel()
+
+
+def _allowed_host(scope):
+    """ Validate the ``Host`` header as ``HttpRequest.get_host`` does. """
+    host = dict(scope['headers']).get(b'host', b'').decode('latin-1')
+    allowed = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed:
+        allowed = ['.localhost', '127.0.0.1', '[::1]']
+    domain, _ = split_domain_port(host)
+    return bool(domain) and validate_host(domain, allowed)
+
+
+def with_streams(app):
+    """ Serve comment streams in front of the ASGI ``app``. """
+    async def application(scope, receive, send):
+        if (scope['type'] == 'http' and scope['path'] == STREAM_PATH
+                and settings.COMMENT_STREAMS):
+            if not _allowed_host(scope):
+                return await _respond(send, 400, b'Bad Request')
+            return await stream(scope, receive, send)
+        return await app(scope, receive, send)
+    return application
@@ -0,0 +1,77 @@
+""" Tests for comment counters and comment pages. """
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Comment, CommentCounter, Post
+from comment.counters import get_count
+from comment.pages import load_comment_page
+from post.counters import view_counter
+
+
+def create_user(n=0):
+    """ Create and return a new user """
+    return get_user_model().objects.create_user(
+        email=f'commenter{n}@example.com', password='testpass123')
+
+
+class CommentPageTests(TestCase):
+    """ Test counting and loading comments of a post. """
+
+    def setUp(self):
+        self.user = create_user()
+        self.post = Post.objects.create(
+            author=self.user, title='Commented post', content='content',
+            published_at='2023-02-02T11:11:11Z')
+        self.ctype = ContentType.objects.get_for_model(self.post)
+
+    def add_comments(self, n):
+        for i in range(n):
+            Comment.objects.create(
+                creator=create_user(Comment.objects.count() + 1),
+                content=f'Comment {i}', content_type=self.ctype,
+                object_id=self.post.id)
+
+    def test_counter_follows_creates_and_deletes(self):
+        """ Test the counter is maintained on create and delete. """
+        self.add_comments(3)
+        self.assertEqual(get_count(self.post), 3)
+        Comment.objects.first().delete()
+        self.assertEqual(get_count(self.post), 2)
+        self.assertEqual(CommentCounter.objects.count(), 1)
+
+    def test_pages_walk_thread(self):
+        """ Test cursors walk every comment newest first. """
+        self.add_comments(5)
+        seen = []
+        cursor = None
+        while True:
+            comments, count, cursor = load_comment_page(
+                self.post, cursor, size=2)
+            seen += [c.id for c in comments]
+            if cursor is None:
+                break
+        self.assertEqual(count, 5)
+        self.assertEqual(seen, list(Comment.objects.order_by(
+            '-created_at', '-id').values_list('id', flat=True)))
+
+    @patch.object(view_counter, 'flush_threshold', 10 ** 6)
+    @patch.object(view_counter, 'flush_interval', 10 ** 6)
+    def test_detail_queries_constant(self):
+        """ Test the detail page query count ignores thread length. """
+        url = reverse('tpost:post-detail', args=[self.post.id])
+        self.add_comments(1)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as short:
+            self.client.get(url)
+        self.add_comments(20)
+        with CaptureQueriesContext(connection) as long:
+            res = self.client.get(url)
+        self.assertEqual(len(short), len(long))
+        self.assertContains(res, 'Comments (21)')
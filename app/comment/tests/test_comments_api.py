@@ -70,7 +70,7 @@ class PublicCommetAPITests(TestCase):
                                       object_id=post.id)
         res = self.client.get(COMM_URL, {'content_type': 8, 'object_id': post.id})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(comm.content, res.data[0]['content'])
+        self.assertIn(comm.content, res.data['results'][0]['content'])
 
 
 class PrivateCommentApiTests(TestCase):
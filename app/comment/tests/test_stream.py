@@ -0,0 +1,184 @@
+""" Tests for the comment event streams. """
+
+import asyncio
+import gc
+import json
+from contextlib import suppress
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from comment import stream
+from core.management.commands.bench_stream import StreamClient
+from core.models import Comment, Post
+
+
+async def subscribed(count=1):
+    while len(stream.broker) < count:
+        await asyncio.sleep(0)
+
+
+def parse(body):
+    lines = dict(line.split(': ', 1) for line in body.decode().split('\n')
+                 if line)
+    return int(lines['id']), lines['event'], json.loads(lines['data'])
+
+
+class StreamMixin:
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='stream@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            author=self.user, title='Post', content='content')
+        self.content_type = ContentType.objects.get_for_model(Post)
+
+    def comment(self, content='comment'):
+        return Comment.objects.create(
+            creator=self.user, content=content,
+            content_type=self.content_type, object_id=self.post.id)
+
+
+@override_settings(COMMENT_STREAMS=True, COMMENT_STREAM_BROKER='local',
+                   PROFILING_SAMPLE_RATE=0, THROTTLE_ENABLED=False)
+class LocalStreamTests(StreamMixin, TestCase):
+    """ Test streams fed by the in-process broker """
+
+    def comment_committed(self, content='comment'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.comment(content)
+
+    async def test_new_comment_streamed(self):
+        """ Test a comment is sent to the streams of its object only. """
+        client = StreamClient(self.content_type.id, self.post.id)
+        other = StreamClient(self.content_type.id, self.post.id + 1)
+        tasks = [client.run(), other.run()]
+        await subscribed(2)
+        comment = await sync_to_async(self.comment_committed)('hello')
+        body = await asyncio.wait_for(client.events.get(), 5)
+        self.assertEqual(client.status, 200)
+        self.assertEqual(parse(body)[:2], (comment.id, 'comment'))
+        self.assertEqual(parse(body)[2]['content'], 'hello')
+        self.assertTrue(other.events.empty())
+        client.close()
+        other.close()
+        await asyncio.gather(*tasks)
+        self.assertEqual(len(stream.broker), 0)
+
+    async def test_api_comment_streamed(self):
+        """ Test comments posted through the API are streamed. """
+        client = StreamClient(self.content_type.id, self.post.id)
+        task = client.run()
+        await subscribed()
+
+        def post_comment():
+            api = APIClient()
+            api.force_authenticate(self.user)
+            with self.captureOnCommitCallbacks(execute=True):
+                return api.post(reverse('comment:comment-list'), {
+                    'content': 'via api',
+                    'content_type': self.content_type.id,
+                    'object_id': self.post.id,
+                })
+        res = await sync_to_async(post_comment)()
+        self.assertEqual(res.status_code, 201)
+        body = await asyncio.wait_for(client.events.get(), 5)
+        self.assertEqual(parse(body)[2]['content'], 'via api')
+        client.close()
+        await task
+
+    async def test_bad_request(self):
+        """ Test a stream needs its object. """
+        client = StreamClient('post', 1)
+        await client.run()
+        self.assertEqual(client.status, 400)
+
+    def test_not_published_unless_streamed(self):
+        """ Test nothing is published when streams are not served. """
+        with self.settings(COMMENT_STREAMS=False):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.comment()
+        self.assertEqual(callbacks, [])
+
+    async def test_host_validated(self):
+        """ Test streams in front of Django check the Host header. """
+        async def django(scope, receive, send):
+            await stream._respond(send, 404, b'Not found')
+
+        app = stream.with_streams(django)
+        client = StreamClient(self.content_type.id, self.post.id)
+        client.scope['headers'].append((b'host', b'evil.example.com'))
+        await app(client.scope, client.receive, client.send)
+        self.assertEqual(client.status, 400)
+
+        client = StreamClient(self.content_type.id, self.post.id)
+        client.scope['headers'].append((b'host', b'testserver'))
+        task = asyncio.ensure_future(
+            app(client.scope, client.receive, client.send))
+        await subscribed()
+        self.assertEqual(client.status, 200)
+        client.close()
+        await task
+
+        with self.settings(COMMENT_STREAMS=False):
+            await app(client.scope, client.receive, client.send)
+        self.assertEqual(client.status, 404)
+
+    def test_bench_stream(self):
+        """ Test the benchmark reports memory and fan out time. """
+        out = StringIO()
+        call_command('bench_stream', subscribers=20, objects=2, stdout=out)
+        self.assertIn('subscribers=20 objects=2', out.getvalue())
+
+
+@override_settings(COMMENT_STREAMS=True, COMMENT_STREAM_BROKER='local',
+                   PROFILING_SAMPLE_RATE=0)
+class ReplayTests(StreamMixin, TransactionTestCase):
+    """ Test replays, which read committed comments from other threads """
+
+    def tearDown(self):
+        # Free the connections the replay opened in executor threads
+        # before the test database is dropped
+        gc.collect()
+
+    async def test_replay_missed(self):
+        """ Test a reconnect with Last-Event-ID gets what it missed. """
+        first = await sync_to_async(self.comment)('first')
+        await sync_to_async(self.comment)('second')
+        client = StreamClient(self.content_type.id, self.post.id,
+                              last_event_id=first.id)
+        task = client.run()
+        body = await asyncio.wait_for(client.events.get(), 5)
+        self.assertEqual(parse(body)[2]['content'], 'second')
+        client.close()
+        await task
+
+
+@override_settings(COMMENT_STREAMS=True, COMMENT_STREAM_BROKER='postgres',
+                   PROFILING_SAMPLE_RATE=0)
+class PostgresStreamTests(StreamMixin, TransactionTestCase):
+    """ Test streams fed through LISTEN/NOTIFY """
+
+    async def test_notify_streamed(self):
+        """ Test a committed comment reaches the stream via NOTIFY. """
+        client = StreamClient(self.content_type.id, self.post.id)
+        task = client.run()
+        await subscribed()
+        while not stream.broker.listening:
+            await asyncio.sleep(.01)
+        comment = await sync_to_async(self.comment)('notified')
+        body = await asyncio.wait_for(client.events.get(), 5)
+        self.assertEqual(parse(body)[0], comment.id)
+        client.close()
+        await task
+        # Close its connection before the test database is dropped
+        listener = stream.broker._listener
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
@@ -1,8 +1,8 @@
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import Q
 
 from rest_framework import viewsets, generics
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
     IsAuthenticated, )
@@ -10,7 +10,14 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 
+from core.aio import AsyncReadMixin
+from core.auth import TOKEN_AUTHENTICATION
+from core.cache import cache_anonymous
+from core.conditional import conditional
+from core.db.router import ReplicaReadMixin
 from core.models import Post, Comment, Tag, Gallery
+from core.pagination import CommentPagination
+from core.throttling import THROTTLES
 from comment import srzs
 
 import logging
@@ -41,6 +48,13 @@ from drf_spectacular.utils import (
 #     logger.debug('Except block : %s', e)
 #     my_models = {'1': 1}
 
+def thread_stamps(view, request):
+    """ The comments of one commented object. """
+    params = request.query_params
+    return [('comments', params.get('content_type', 0),
+             params.get('object_id', 0))]
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -58,12 +72,25 @@ from drf_spectacular.utils import (
         ]
     )
 )
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ReplicaReadMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """ View for manage comment APIs """
     serializer_class = srzs.CommentSRZ
     queryset = Comment.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = TOKEN_AUTHENTICATION
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CommentPagination
+    throttle_classes = THROTTLES
+    throttle_scope = 'comment'
+
+    @conditional(thread_stamps)
+    @cache_anonymous('comments', timeout=settings.API_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(thread_stamps)
+    @cache_anonymous('comments', timeout=settings.API_CACHE_TIMEOUT)
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
 
     def retrieve(self, request, pk=None):
         obj = self.get_object()
@@ -4,6 +4,7 @@ from django.utils.translation import gettext_lazy as _
 from core import models
 from django.utils.html import format_html
 from django.db.models import Count
+from post import images
 
 
 class IforumUserAdmin(UserAdmin):
@@ -97,6 +98,8 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ['author', 'published_at', 'created_at', ViewFilter]
     filter_horizontal = ('tags',)
     prepopulated_fields = {"slug": ("title",)}
+    # Counted by post.counters; full saves leave it out
+    readonly_fields = ('views',)
 
     def tags_n(self, obj):
         return obj.tags.count()
@@ -128,9 +131,11 @@ class GalleryAdmin(admin.ModelAdmin):
 
     def thumbnail(self, obj):
         if obj.image:
+            urls = images.derivative_urls(obj)
+            url = urls[0][1] if urls else obj.image.url
             return format_html('<img src="{}" style="max-height: \
                                50px; max-width: 80px; border-radius: 4px; \
-                               align: center;"/>'.format(obj.image.url))
+                               align: center;"/>'.format(url))
         else:
             return '[x]'
 
@@ -140,8 +145,16 @@ class CommentAdmin(admin.ModelAdmin):
     list_filter = ['creator', ]
 
 
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error', )
+
+
 admin.site.register(models.User, IforumUserAdmin)
 admin.site.register(models.Post, PostAdmin)
 admin.site.register(models.Tag, TagAdmin)
 admin.site.register(models.Gallery, GalleryAdmin)
 admin.site.register(models.Comment, CommentAdmin)
+admin.site.register(models.Task, TaskAdmin)
@@ -0,0 +1,139 @@
+""" Async views for the read heavy API endpoints """
+
+import functools
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.http import Http404
+from rest_framework.response import Response
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def database_sync_to_async(func):
+    """
+    Run ``func`` on the default executor rather than the single thread
+    Django reserves for sync code, so slow queries of concurrent
+    requests overlap. Stale connections are closed around each call.
+    """
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+async def afetch(queryset):
+    """
+    Evaluate ``queryset`` to a list without blocking the event loop.
+
+    Uses the async ORM where this Django version supports the query
+    and falls back to a worker thread otherwise.
+    """
+    native = hasattr(queryset, '__aiter__') and (
+        django.VERSION >= (5, 0) or not queryset._prefetch_related_lookups)
+    if native:
+        return [obj async for obj in queryset]
+    return await database_sync_to_async(list)(queryset)
+
+
+async def afirst(queryset):
+    """ Return the first object of ``queryset`` or None. """
+    objs = await afetch(queryset[:1])
+    return objs[0] if objs else None
+
+
+class AsyncReadMixin:
+    """
+    Serve ``list`` and ``retrieve`` of a DRF generic view as a native
+    coroutine under ASGI.
+
+    ``as_async_view`` returns a Django async view. Safe methods run the
+    ``alist`` / ``aretrieve`` coroutines; other methods go to the sync
+    view unchanged.
+    """
+
+    @classmethod
+    def as_async_view(cls, actions=None, **initkwargs):
+        if actions is None:
+            sync_view = cls.as_view(**initkwargs)
+            actions = {'get': 'list'}
+        else:
+            sync_view = cls.as_view(actions, **initkwargs)
+        actions = dict(actions, head=actions['get'])
+        run_sync = sync_to_async(sync_view)
+
+        async def view(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await run_sync(request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = actions
+            self.action = actions['get']
+            return await self.adispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """ Async counterpart of ``APIView.dispatch`` for safe methods. """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await database_sync_to_async(self.initial)(
+                request, *args, **kwargs)
+            handler = getattr(self, f'a{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs)
+        await database_sync_to_async(self.response.render)()
+        return self.response
+
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await afirst(queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}))
+        except (TypeError, ValueError, ValidationError):
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def aserialize(self, instance, **kwargs):
+        """ Return serialized data, run off the loop as it may query. """
+        return await database_sync_to_async(
+            lambda: self.get_serializer(instance, **kwargs).data)()
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        paginator = self.paginator
+        if paginator is None:
+            return Response(await self.aserialize(
+                await afetch(queryset), many=True))
+        if hasattr(paginator, 'apaginate_queryset'):
+            page = await paginator.apaginate_queryset(
+                queryset, request, view=self)
+        else:
+            page = await database_sync_to_async(
+                paginator.paginate_queryset)(queryset, request, view=self)
+        data = await self.aserialize(page, many=True)
+        return self.get_paginated_response(data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        return Response(await self.aserialize(instance))
@@ -0,0 +1,236 @@
+""" Token authentication served from the cache, and signed tokens
+
+Besides the database tokens of ``rest_framework.authtoken``, users can
+be issued short lived signed access tokens with a longer lived refresh
+token (AUTH_TOKEN_MODE = 'signed'). Those are checked against
+SECRET_KEY and the revocation list, kept on the shared cache until the
+tokens expire when every process sees it (CACHE_SHARED), so a request
+sending one costs no query while its user is cached. Without, each
+request looks its token ID up in the small revocation table.
+"""
+
+import datetime
+import hashlib
+import secrets
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication, get_authorization_header)
+
+from core.models import RevokedToken
+
+ACCESS, REFRESH = 'access', 'refresh'
+
+
+def token_cache_key(key):
+    """ Cache key of a token, without the token itself in it. """
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def user_cache_key(pk):
+    return f'auth:user:{pk}'
+
+
+def revoked_cache_key(jti):
+    return f'auth:revoked:{jti}'
+
+
+def forget_tokens(*keys):
+    """ Drop the cached snapshots of the tokens ``keys``. """
+    caches['default'].delete_many([token_cache_key(key) for key in keys])
+
+
+def forget_user(pk):
+    """ Drop the cached user ``pk`` of signed tokens. """
+    caches['default'].delete(user_cache_key(pk))
+
+
+def db_token_expired(token):
+    """ Whether a database token is older than AUTH_DB_TOKEN_TTL. """
+    ttl = settings.AUTH_DB_TOKEN_TTL
+    return bool(ttl) and token.created < timezone.now() - datetime.timedelta(
+        seconds=ttl)
+
+
+def _fingerprint(user):
+    """ Changes with the password, retiring the tokens issued before. """
+    return salted_hmac('core.auth.fingerprint', user.password).hexdigest()[:8]
+
+
+def _user_fields():
+    return [field.attname for field in get_user_model()._meta.concrete_fields
+            if field.attname != 'password']
+
+
+def _snapshot(user):
+    """
+    Cacheable state of ``user``: every field but the password hash,
+    whose fingerprint stands in for it.
+    """
+    return {'fields': [getattr(user, name) for name in _user_fields()],
+            'fingerprint': _fingerprint(user)}
+
+
+def _restore(snapshot):
+    """
+    Return the user of ``snapshot`` and its fingerprint. The password is
+    deferred: loaded if read, and only saved once set.
+    """
+    user = get_user_model().from_db(
+        DEFAULT_DB_ALIAS, _user_fields(), snapshot['fields'])
+    return user, snapshot['fingerprint']
+
+
+def _sign(user, kind, ttl):
+    payload = {'u': user.pk, 'p': _fingerprint(user),
+               'j': secrets.token_urlsafe(12), 'e': int(time.time()) + ttl}
+    return signing.dumps(payload, salt=f'core.auth.{kind}')
+
+
+def issue_tokens(user):
+    """ Return a new signed access and refresh token pair for ``user``. """
+    return {
+        'token': _sign(user, ACCESS, settings.AUTH_ACCESS_TOKEN_TTL),
+        'refresh': _sign(user, REFRESH, settings.AUTH_REFRESH_TOKEN_TTL),
+        'expires_in': settings.AUTH_ACCESS_TOKEN_TTL,
+    }
+
+
+def revoked(jti):
+    """
+    Whether the signed token ``jti`` was revoked. Read from the shared
+    cache, or the table without one, so a logout holds on every worker
+    at once.
+    """
+    if settings.CACHE_SHARED:
+        return caches['shared'].has_key(revoked_cache_key(jti))
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke(payload):
+    """
+    Refuse the signed token with ``payload`` until it expires; return
+    False if it already was.
+    """
+    expires_at = datetime.datetime.fromtimestamp(
+        payload['e'], tz=datetime.timezone.utc)
+    _, created = RevokedToken.objects.get_or_create(
+        jti=payload['j'], defaults={'expires_at': expires_at})
+    if settings.CACHE_SHARED:
+        caches['shared'].set(revoked_cache_key(payload['j']), True,
+                             max(1, payload['e'] - int(time.time())))
+    return created
+
+
+def get_user(pk):
+    """
+    Return active user ``pk`` and its password fingerprint, from the
+    cache or the database; ``(None, None)`` if there is none.
+    """
+    timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+    cache = caches['default']
+    snapshot = cache.get(user_cache_key(pk)) if timeout else None
+    if snapshot is None:
+        user = get_user_model().objects.filter(pk=pk).first()
+        if user is None:
+            return None, None
+        snapshot = _snapshot(user)
+        if timeout:
+            cache.set(user_cache_key(pk), snapshot, timeout)
+    user, fingerprint = _restore(snapshot)
+    return (user, fingerprint) if user.is_active else (None, None)
+
+
+def verify(token, kind=ACCESS):
+    """
+    Return the ``(user, payload)`` of a valid signed ``token`` of
+    ``kind``, or raise ``AuthenticationFailed``.
+    """
+    try:
+        payload = signing.loads(token, salt=f'core.auth.{kind}')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if payload['e'] < time.time():
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    if revoked(payload['j']):
+        raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+    user, fingerprint = get_user(payload['u'])
+    if user is None or fingerprint != payload['p']:
+        raise exceptions.AuthenticationFailed(
+            _('User inactive, deleted or credentials changed.'))
+    return user, payload
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that keeps each token with its user in the
+    cache for AUTH_TOKEN_CACHE_TIMEOUT seconds, sparing the token and
+    user query of every authenticated request.
+
+    Snapshots hold the user without its password hash, and are dropped
+    when the token is deleted or its user saved, see ``core.signals``.
+    Other workers may keep a local copy for up to CACHE_LOCAL_TIMEOUT
+    seconds after that.
+    """
+
+    def authenticate_credentials(self, key):
+        timeout = settings.AUTH_TOKEN_CACHE_TIMEOUT
+        if not timeout:
+            return super().authenticate_credentials(key)
+        cache = caches['default']
+        cache_key = token_cache_key(key)
+        model = self.get_model()
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            snapshot = {'created': token.created,
+                        'user': _snapshot(token.user)}
+            cache.set(cache_key, snapshot, timeout)
+        user = _restore(snapshot['user'])[0]
+        token = model(key=key, user=user, created=snapshot['created'])
+        if db_token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return (token.user, token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate ``Authorization: Bearer <token>`` with a signed access
+    token. ``request.auth`` is the token payload.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.'))
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header.'))
+        return verify(token)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+TOKEN_AUTHENTICATION = [CachedTokenAuthentication, SignedTokenAuthentication]
@@ -0,0 +1,378 @@
+""" Cache backends and response caching helpers """
+
+import asyncio
+import functools
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.functional import cached_property
+
+from core.db.router import primary_reads
+
+_MISSING = object()
+
+_THROTTLE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local wait = tat - tolerance - now
+if wait > 0 then return tostring(wait) end
+tat = tat + interval
+redis.call('SET', KEYS[1], tostring(tat), 'PX',
+           math.ceil((tat - now) * 1000))
+return '0'
+"""
+
+
+class RedisCache(BaseCache):
+    """
+    Shared cache on a Redis compatible server.
+
+    Values are pickled, except plain integers which are stored as is so
+    ``incr`` works server side.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        self._url = server
+        self._options = params.get('OPTIONS', {})
+
+    @cached_property
+    def _client(self):
+        import redis
+        return redis.Redis.from_url(self._url, **self._options)
+
+    def _dumps(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _loads(self, raw):
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def _expiry(self, timeout):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(int(timeout), 0)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            return False
+        return bool(self._client.set(
+            self._key(key, version), self._dumps(value), ex=expiry, nx=True))
+
+    def get(self, key, default=None, version=None):
+        raw = self._client.get(self._key(key, version))
+        return default if raw is None else self._loads(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            self._client.delete(key)
+        else:
+            self._client.set(key, self._dumps(value), ex=expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self._client.persist(key))
+        return bool(self._client.expire(key, expiry))
+
+    def delete(self, key, version=None):
+        return bool(self._client.delete(self._key(key, version)))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raws = self._client.mget([self._key(key, version) for key in keys])
+        return {key: self._loads(raw)
+                for key, raw in zip(keys, raws) if raw is not None}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expiry = self._expiry(timeout)
+        pipe = self._client.pipeline()
+        for key, value in data.items():
+            key = self._key(key, version)
+            if expiry == 0:
+                pipe.delete(key)
+            else:
+                pipe.set(key, self._dumps(value), ex=expiry)
+        pipe.execute()
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._client.exists(self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        if not self._client.exists(key):
+            raise ValueError("Key '%s' not found" % key)
+        return self._client.incr(key, delta)
+
+    def clear(self):
+        self._client.flushdb()
+
+    def throttle(self, key, interval, tolerance, version=None):
+        """
+        Take a slot of the rate limit ``key`` atomically on the server,
+        see ``core.throttling``. Return the seconds to wait, 0 if taken.
+        """
+        return float(self._client.eval(
+            _THROTTLE_SCRIPT, 1, self._key(key, version), time.time(),
+            interval, tolerance))
+
+
+class TieredCache(BaseCache):
+    """
+    A small per-worker LRU in front of a shared cache.
+
+    Reads are served from process memory for up to ``LOCAL_TIMEOUT``
+    seconds before going to the ``SHARED`` cache alias. Writes and
+    deletes go to both tiers, so other workers see a change once their
+    local copy expires. Hits and misses are counted per tier.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        """ Return this worker's hit and miss counts. """
+        with self._lock:
+            return dict(self._stats, local_entries=len(self._local))
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _local_get(self, key, version):
+        with self._lock:
+            entry = self._local.get((key, version))
+            if entry is None:
+                return _MISSING
+            expires, raw = entry
+            if expires < time.monotonic():
+                del self._local[(key, version)]
+                return _MISSING
+            self._local.move_to_end((key, version))
+            self._stats['local_hits'] += 1
+        return pickle.loads(raw)
+
+    def _local_set(self, key, value, timeout, version):
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        local_timeout = self._local_timeout
+        if timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        if local_timeout <= 0:
+            return self._local_drop([key], version)
+        raw = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[(key, version)] = (time.monotonic() + local_timeout,
+                                           raw)
+            self._local.move_to_end((key, version))
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _local_drop(self, keys, version):
+        with self._lock:
+            for key in keys:
+                self._local.pop((key, version), None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._local_set(key, value, timeout, version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self._local_get(key, version)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        self._local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self._local_set(key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._local_drop([key], version)
+        return self.shared.delete(key, version)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            value = self._local_get(key, version)
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            fetched = self.shared.get_many(remote, version)
+            self._count('shared_hits', len(fetched))
+            self._count('misses', len(remote) - len(fetched))
+            for key, value in fetched.items():
+                self._local_set(key, value, DEFAULT_TIMEOUT, version)
+            found.update(fetched)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            self._local_set(key, value, timeout, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._local_drop(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        if self._local_get(key, version) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version)  # noqa: W601
+
+    def incr(self, key, delta=1, version=None):
+        self._local_drop([key], version)
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+        self.shared.clear()
+
+
+def _group_version(group):
+    cache = caches['default']
+    version = cache.get(f'group:{group}')
+    if version is None:
+        cache.add(f'group:{group}', 1, None)
+        version = cache.get(f'group:{group}', 1)
+    return version
+
+
+def invalidate(*groups):
+    """ Orphan every entry cached under ``groups``. """
+    cache = caches['default']
+    for group in groups:
+        try:
+            cache.incr(f'group:{group}')
+        except ValueError:
+            cache.add(f'group:{group}', 1, None)
+
+
+def group_key(group, *parts):
+    """ Build a cache key that ``invalidate(group)`` will retire. """
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'{group}:{_group_version(group)}:{digest}'
+
+
+def cache_anonymous(*groups, timeout=DEFAULT_TIMEOUT):
+    """
+    Cache the data of successful anonymous GET responses of a DRF
+    handler, sync or async, keyed by path and query string.
+
+    Entries are dropped whenever any of ``groups`` is invalidated.
+    """
+    def lookup(request):
+        key = 'response:' + ':'.join(
+            group_key(group, request.get_full_path()) for group in groups)
+        return key, caches['default'].get(key, _MISSING)
+
+    def decorator(handler):
+        from rest_framework.response import Response
+
+        if asyncio.iscoroutinefunction(handler):
+            from core.aio import database_sync_to_async
+
+            @functools.wraps(handler)
+            async def async_wrapped(self, request, *args, **kwargs):
+                if request.method != 'GET' or request.user.is_authenticated:
+                    return await handler(self, request, *args, **kwargs)
+                key, data = await database_sync_to_async(lookup)(request)
+                if data is not _MISSING:
+                    return Response(data)
+                with primary_reads():
+                    response = await handler(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    await database_sync_to_async(caches['default'].set)(
+                        key, response.data, timeout)
+                return response
+            return async_wrapped
+
+        @functools.wraps(handler)
+        def wrapped(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return handler(self, request, *args, **kwargs)
+            key, data = lookup(request)
+            if data is not _MISSING:
+                return Response(data)
+            with primary_reads():
+                response = handler(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                caches['default'].set(key, response.data, timeout)
+            return response
+        return wrapped
+    return decorator
+
+
+def memoize(*groups, timeout=DEFAULT_TIMEOUT):
+    """ Cache a function's result per arguments until ``groups`` change. """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapped(*args):
+            cache = caches['default']
+            key = f'memo:{func.__module__}.{func.__qualname__}:' + ':'.join(
+                group_key(group, args) for group in groups)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                with primary_reads():
+                    value = func(*args)
+                cache.set(key, value, timeout)
+            return value
+        return wrapped
+    return decorator
@@ -0,0 +1,182 @@
+""" Conditional GET for API handlers, without serialization
+
+Writes ``touch`` the change stamps of what they affect, e.g. the post
+or the comment thread, after the transaction commits. A handler
+decorated with ``conditional`` derives a weak ETag and Last-Modified
+from the stamps it depends on, answers a matching ``If-None-Match`` or
+``If-Modified-Since`` with 304 before running, and sets both headers
+on the 200 it returns otherwise. On detail routes the 304 is only given
+once an EXISTS query finds the object among those the user may see, so
+it tells nothing of missing or hidden objects.
+
+Stamps are the time of the last change, kept for CHANGE_STAMP_TIMEOUT
+seconds on the shared cache. A missing stamp is recreated as now, so
+expiry or eviction only costs one full response. Stamps are only kept,
+and validators only sent, when every process sees the shared cache
+(CACHE_SHARED): a process with its own stamps would answer 304 for
+changes made by the others. ETags are keyed with SECRET_KEY and cover the
+full path and the user, so a client cannot guess one for a resource it
+never saw. Counters such as post views are not part of them.
+"""
+
+import asyncio
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.crypto import salted_hmac
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _part(value):
+    # '012' from a URL and 12 from a model name the same stamp
+    try:
+        return str(int(value))
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _key(parts):
+    return 'stamp:' + ':'.join(map(_part, parts))
+
+
+def enabled():
+    """ Return whether change stamps are seen by every process. """
+    return settings.CACHE_SHARED
+
+
+def touch(*parts):
+    """ Record a change of ``parts`` once the current transaction commits. """
+    if enabled():
+        transaction.on_commit(lambda: caches['shared'].set(
+            _key(parts), time.time(), settings.CHANGE_STAMP_TIMEOUT))
+
+
+def last_changed(*keys):
+    """ Return the latest change stamp of the stamp tuples ``keys``. """
+    cache = caches['shared']
+    found = cache.get_many([_key(parts) for parts in keys])
+    now = time.time()
+    stamps = []
+    for parts in keys:
+        stamp = found.get(_key(parts))
+        if stamp is None:
+            cache.add(_key(parts), now, settings.CHANGE_STAMP_TIMEOUT)
+            stamp = cache.get(_key(parts), now)
+        stamps.append(stamp)
+    return stamps
+
+
+def _validators(request, keys):
+    stamps = last_changed(*keys)
+    user = request.user.pk if request.user.is_authenticated else 0
+    digest = salted_hmac(
+        'core.conditional', f'{request.get_full_path()}:{user}:{stamps}',
+    ).hexdigest()[:24]
+    return f'W/"{digest}"', max(stamps)
+
+
+def _opaque(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def _not_modified(request, etag, modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = parse_etags(if_none_match)
+        return '*' in tags or _opaque(etag) in map(_opaque, tags)
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(modified) <= since
+
+
+def _visible(view, kwargs):
+    """ Return whether the object a detail route names may be shown. """
+    lookup = getattr(view, 'lookup_url_kwarg', None) or getattr(
+        view, 'lookup_field', None)
+    if lookup not in kwargs:
+        return True
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        return queryset.filter(
+            **{view.lookup_field: kwargs[lookup]}).exists()
+    except (TypeError, ValueError, ValidationError):
+        return False
+
+
+def _set_validators(response, etag, modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    return response
+
+
+def settled(modified):
+    """
+    Return whether every replica shows the change stamped ``modified``.
+
+    Replicas may lag for REPLICA_PIN_SECONDS; keying anything on a
+    younger stamp could keep data read there around as current.
+    """
+    return (not settings.DATABASE_REPLICAS
+            or time.time() - modified > settings.REPLICA_PIN_SECONDS)
+
+
+def _finish(response, etag, modified):
+    if response.status_code == 200 and settled(modified):
+        _set_validators(response, etag, modified)
+    return response
+
+
+def conditional(stamps):
+    """
+    Serve conditional GETs of a DRF handler, sync or async.
+
+    ``stamps(view, request, *args, **kwargs)`` returns the stamp
+    tuples, as given to ``touch``, that the response depends on.
+    Requests are passed through while stamps are not ``enabled``.
+    """
+    def decorator(handler):
+        def check(self, request, *args, **kwargs):
+            etag, modified = _validators(
+                request, stamps(self, request, *args, **kwargs))
+            not_modified = None
+            if (_not_modified(request, etag, modified)
+                    and _visible(self, kwargs)):
+                not_modified = _set_validators(Response(
+                    status=status.HTTP_304_NOT_MODIFIED), etag, modified)
+            return etag, modified, not_modified
+
+        if asyncio.iscoroutinefunction(handler):
+            from core.aio import database_sync_to_async
+
+            @functools.wraps(handler)
+            async def async_wrapped(self, request, *args, **kwargs):
+                if request.method not in SAFE_METHODS or not enabled():
+                    return await handler(self, request, *args, **kwargs)
+                etag, modified, not_modified = await database_sync_to_async(
+                    check)(self, request, *args, **kwargs)
+                if not_modified is not None:
+                    return not_modified
+                response = await handler(self, request, *args, **kwargs)
+                return _finish(response, etag, modified)
+            return async_wrapped
+
+        @functools.wraps(handler)
+        def wrapped(self, request, *args, **kwargs):
+            if request.method not in SAFE_METHODS or not enabled():
+                return handler(self, request, *args, **kwargs)
+            etag, modified, not_modified = check(
+                self, request, *args, **kwargs)
+            if not_modified is not None:
+                return not_modified
+            response = handler(self, request, *args, **kwargs)
+            return _finish(response, etag, modified)
+        return wrapped
+    return decorator
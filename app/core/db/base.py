@@ -0,0 +1,71 @@
+""" Postgres backend with connection health checks and pooling """
+
+from django.db.backends.postgresql import base
+
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The stock psycopg2 backend plus two settings:
+
+    ``CONN_HEALTH_CHECKS`` checks a persistent connection with a cheap
+    query before its first use in each request, reconnecting instead
+    of failing the request when the server dropped it.
+
+    ``POOL`` hands closed connections to a per-process ``ConnectionPool``
+    so threads and later requests reuse them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False)
+        self.health_check_done = False
+
+    def _connect(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict, conn_params)
+        if self.pool is None:
+            return self._connect(conn_params)
+        connection = self.pool.acquire(lambda: self._connect(conn_params))
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def connect(self):
+        self.health_check_done = True
+        super().connect()
+
+    def _close(self):
+        if self.connection is not None and self.pool is not None:
+            # The wrapper keeps its reference until an atomic block
+            # exits, so such a connection can not be shared yet
+            if self.in_atomic_block:
+                return self.pool.discard(self.connection)
+            with self.wrap_database_errors:
+                return self.pool.release(self.connection)
+        return super()._close()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None and self.health_check_enabled
+                and not self.health_check_done and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def warm_pool(self):
+        """ Fill this database's pool; return the connections opened. """
+        conn_params = self.get_connection_params()
+        pool = get_pool(self.alias, self.settings_dict, conn_params)
+        if pool is None:
+            return 0
+        return pool.warm(lambda: self._connect(conn_params))
@@ -0,0 +1,175 @@
+""" A thread safe pool of raw psycopg2 connections """
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Keep up to ``size`` idle connections for reuse.
+
+    Up to ``max_overflow`` more may be open while all pooled ones are
+    in use; they are closed rather than kept when returned. Beyond that
+    ``acquire`` waits ``timeout`` seconds for a connection to come back.
+    Connections older than ``recycle`` seconds are replaced.
+    """
+
+    def __init__(self, size=5, max_overflow=10, timeout=30, recycle=3600):
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = deque()
+        self._born = {}
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {'created': 0, 'reused': 0, 'discarded': 0,
+                       'waits': 0, 'timeouts': 0}
+
+    def stats(self):
+        """ Return the pool's configuration, usage and counters. """
+        with self._cond:
+            return dict(
+                self._stats, size=self.size, max_overflow=self.max_overflow,
+                open=self._open, idle=len(self._idle),
+                in_use=self._open - len(self._idle))
+
+    def _expired(self, conn):
+        return time.monotonic() - self._born.get(id(conn), 0) > self.recycle
+
+    def _discard(self, conn):
+        """ Close ``conn`` and free its slot; called holding the lock. """
+        self._born.pop(id(conn), None)
+        self._open -= 1
+        self._stats['discarded'] += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self._cond.notify()
+
+    def acquire(self, connect):
+        """ Return an idle connection, or a new one made by ``connect``. """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed or self._expired(conn):
+                        self._discard(conn)
+                        continue
+                    self._stats['reused'] += 1
+                    return conn
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                self._stats['waits'] += 1
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and (
+                            self._open >= self.size + self.max_overflow):
+                        self._stats['timeouts'] += 1
+                        raise psycopg2.OperationalError(
+                            'Connection pool exhausted: %d connections in '
+                            'use after %ss' % (self._open, self.timeout))
+        try:
+            conn = connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._stats['created'] += 1
+        return conn
+
+    def discard(self, conn):
+        """ Close a checked out ``conn`` instead of returning it. """
+        with self._cond:
+            self._discard(conn)
+
+    def release(self, conn):
+        """ Return ``conn`` to the pool, rolling back any open transaction. """
+        status = (extensions.TRANSACTION_STATUS_UNKNOWN if conn.closed
+                  else conn.info.transaction_status)
+        if status in (extensions.TRANSACTION_STATUS_INTRANS,
+                      extensions.TRANSACTION_STATUS_INERROR):
+            try:
+                conn.rollback()
+                status = extensions.TRANSACTION_STATUS_IDLE
+            except psycopg2.Error:
+                status = extensions.TRANSACTION_STATUS_UNKNOWN
+        with self._cond:
+            if (status != extensions.TRANSACTION_STATUS_IDLE
+                    or len(self._idle) >= self.size or self._expired(conn)):
+                self._discard(conn)
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def warm(self, connect):
+        """ Open connections until ``size`` are idle; return how many. """
+        opened = []
+        with self._cond:
+            wanted = min(self.size - len(self._idle),
+                         self.size + self.max_overflow - self._open)
+            self._open += max(wanted, 0)
+        try:
+            for _ in range(wanted):
+                opened.append(connect())
+        finally:
+            with self._cond:
+                self._open -= wanted - len(opened)
+                now = time.monotonic()
+                for conn in opened:
+                    self._born[id(conn)] = now
+                    self._idle.append(conn)
+                self._stats['created'] += len(opened)
+                self._cond.notify_all()
+        return len(opened)
+
+    def close(self):
+        """ Close every idle connection. """
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """
+    Return the pool for one set of connection parameters, or None when
+    ``settings_dict`` has no ``POOL`` configured.
+
+    Pools are per process; a forked worker starts with empty ones.
+    """
+    options = settings_dict.get('POOL')
+    if not options:
+        return None
+    key = (os.getpid(), alias, tuple(sorted(
+        (name, str(value)) for name, value in conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                size=options.get('SIZE', 5),
+                max_overflow=options.get('MAX_OVERFLOW', 10),
+                timeout=options.get('TIMEOUT', 30),
+                recycle=options.get('RECYCLE', 3600))
+        return pool
+
+
+def all_pools():
+    """ Return ``{alias: pool}`` for the pools of this process. """
+    pid = os.getpid()
+    with _pools_lock:
+        return {key[1]: pool for key, pool in _pools.items()
+                if key[0] == pid}
@@ -0,0 +1,124 @@
+""" Route the reads of opted in views to read replicas """
+
+import functools
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'primary_pin'
+
+# Auth lookups stay on the primary so a new token or session works
+# on the very next request
+PRIMARY_APPS = ('authtoken', 'sessions')
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def _pin_key(request):
+    auth = request.META.get('HTTP_AUTHORIZATION')
+    if not auth:
+        return None
+    return 'primary-pin:' + hashlib.sha256(auth.encode()).hexdigest()
+
+
+def pin_to_primary(request, response):
+    """
+    Send the reads of the client behind ``request`` to the primary for
+    ``REPLICA_PIN_SECONDS``, so it sees its own writes. Browsers are
+    recognised by a cookie, API clients by their Authorization header.
+    """
+    seconds = settings.REPLICA_PIN_SECONDS
+    response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True,
+                        samesite='Lax')
+    key = _pin_key(request)
+    if key is not None:
+        caches['shared'].set(key, 1, seconds)
+
+
+def is_pinned(request):
+    """ Whether the client behind ``request`` wrote recently. """
+    if PIN_COOKIE in request.COOKIES:
+        return True
+    key = _pin_key(request)
+    return key is not None and caches['shared'].get(key) is not None
+
+
+def can_read_replica(request):
+    """ Whether the reads of ``request`` may be served by a replica. """
+    return (bool(settings.DATABASE_REPLICAS)
+            and request.method in SAFE_METHODS and not is_pinned(request))
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """ Let reads inside the block go to a replica. """
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def primary_reads():
+    """
+    Send reads inside the block to the primary. Cache fills use this so
+    a lagging replica can not outlive its lag in the cache.
+    """
+    return replica_reads(False)
+
+
+def read_from_replica(view):
+    """ Serve the reads of a function view from a replica when allowed. """
+    @functools.wraps(view)
+    def wrapped(request, *args, **kwargs):
+        with replica_reads(can_read_replica(request)):
+            return view(request, *args, **kwargs)
+    return wrapped
+
+
+class ReplicaReadMixin:
+    """ Serve the reads of a DRF view, sync or async, from a replica. """
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads(can_read_replica(request)):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        from core.aio import database_sync_to_async
+
+        enabled = await database_sync_to_async(can_read_replica)(request)
+        with replica_reads(enabled):
+            return await super().adispatch(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random replica inside ``replica_reads`` blocks and
+    everything else to the primary.
+
+    Reads stay on the primary while it has a transaction open, since
+    they may depend on its uncommitted writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or not _replica_reads.get()
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in settings.DATABASE_REPLICAS
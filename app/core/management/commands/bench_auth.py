@@ -0,0 +1,76 @@
+""" Django command to benchmark token authentication queries """
+
+import itertools
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core import profiling
+from core.auth import forget_tokens
+from core.models import Post
+
+
+class Command(BaseCommand):
+    """ Compare queries of a mixed API workload with and without caching. """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests to send per run.')
+        parser.add_argument(
+            '--write-every', type=int, default=50,
+            help='Send a profile update, which drops the cached token, '
+                 'every this many requests.')
+
+    def handle(self, *args, **options):
+        profiling.install()
+        user = get_user_model().objects.create_user(
+            email=f'bench-{time.time_ns()}@example.com')
+        token = Token.objects.create(user=user)
+        post = Post.objects.create(
+            author=user, title='Benchmark post', content='Post',
+            published_at=timezone.now())
+        try:
+            for timeout in (0, 300):
+                forget_tokens(token.key)
+                with override_settings(ALLOWED_HOSTS=['testserver'],
+                                       AUTH_TOKEN_CACHE_TIMEOUT=timeout):
+                    self._run(token.key, post.pk, timeout, options)
+        finally:
+            post.delete()
+            user.delete()
+
+    def _run(self, key, pk, timeout, options):
+        factory = APIRequestFactory()
+        auth = {'HTTP_AUTHORIZATION': f'Token {key}'}
+        reads = itertools.cycle([
+            '/api/posts/', f'/api/posts/{pk}/', '/api/tags/',
+            '/api/comment/comments/', '/api/user/me/'])
+        every = options['write_every']
+        start = time.perf_counter()
+        with profiling.profiling() as profile:
+            for n in range(1, options['requests'] + 1):
+                if every and n % every == 0:
+                    path = '/api/user/me/'
+                    request = factory.patch(
+                        path, {'username': f'bench{n}'}, format='json',
+                        **auth)
+                else:
+                    path = next(reads)
+                    request = factory.get(path, **auth)
+                match = resolve(path)
+                response = match.func(request, *match.args, **match.kwargs)
+                if response.status_code >= 400:
+                    self.stderr.write(f'{path}: {response.status_code}')
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'cache_timeout={timeout} '
+            f'requests={options["requests"]} queries={profile.queries} '
+            f'per_request={profile.queries / options["requests"]:.2f} '
+            f'seconds={elapsed:.2f}')
@@ -0,0 +1,88 @@
+""" Django command to benchmark concurrent view count writes """
+
+import multiprocessing
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import F
+from django.test import override_settings
+from django.utils import timezone
+
+from core.models import Post
+from post.counters import add_to_shards, rollup_views
+
+
+def _worker(pk, shards, writes, start, results):
+    """ Add ``writes`` single views to one post, each in a transaction. """
+    start.wait()
+    began = time.perf_counter()
+    with override_settings(VIEW_COUNTER_SHARDS=shards or 1):
+        for _ in range(writes):
+            with transaction.atomic():
+                if shards:
+                    add_to_shards({pk: 1})
+                else:
+                    Post.objects.filter(pk=pk).update(views=F('views') + 1)
+    elapsed = time.perf_counter() - began
+    connections.close_all()
+    results.put(elapsed)
+
+
+class Command(BaseCommand):
+    """
+    Compare writes per second to one hot post, updating its row directly
+    or through view shards, per worker count.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', default='1,4,16',
+            help='Comma separated worker counts to run.')
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Views each worker writes.')
+        parser.add_argument(
+            '--shards', type=int, default=8,
+            help='Shards per post of the sharded run.')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            email=f'bench-{time.time_ns()}@example.com')
+        post = Post.objects.create(
+            author=user, title='Benchmark post', content='Hot post',
+            published_at=timezone.now())
+        try:
+            for workers in map(int, options['workers'].split(',')):
+                for shards in (0, 1, options['shards']):
+                    self._run(post, workers, shards, options['writes'])
+        finally:
+            post.delete()
+            user.delete()
+
+    def _run(self, post, workers, shards, writes):
+        connections.close_all()
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(post.pk, shards, writes, start, results))
+            for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        start.set()
+        elapsed = max(results.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+        rollup_views()
+        post.refresh_from_db()
+        total = workers * writes
+        mode = f'shards={shards}' if shards else 'direct'
+        line = (f'mode={mode} workers={workers} writes={total} '
+                f'wps={total / elapsed:.0f}')
+        if post.views != total:
+            line += f' lost={total - post.views}'
+        self.stdout.write(line)
+        Post.objects.filter(pk=post.pk).update(views=0)
@@ -0,0 +1,134 @@
+""" Django command to load test a running server at several concurrencies """
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class StaleConnection(Exception):
+    """ The server closed a kept-alive connection before responding. """
+
+
+async def _read_body(reader, headers):
+    """ Consume the body, returning True when it ran to end of stream. """
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                return False
+    if 'content-length' not in headers:
+        await reader.read()
+        return True
+    await reader.readexactly(int(headers['content-length']))
+    return False
+
+
+async def _request(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise StaleConnection
+    status = int(line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    to_eof = await _read_body(reader, headers)
+    return status, to_eof or headers.get('connection') == 'close'
+
+
+async def _client(url, headers, deadline, timeout, latencies, errors):
+    """ Issue keep-alive GETs on one connection until ``deadline``. """
+    path = (url.path or '/') + (f'?{url.query}' if url.query else '')
+    request = ''.join(
+        [f'GET {path} HTTP/1.1\r\nHost: {url.netloc}\r\n',
+         'Accept: application/json\r\n']
+        + [f'{header}\r\n' for header in headers] + ['\r\n']).encode()
+    writer = None
+    while time.monotonic() < deadline:
+        start = time.monotonic()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(url.hostname, url.port or 80),
+                    timeout)
+            status, close = await asyncio.wait_for(
+                _request(reader, writer, request), timeout)
+        except StaleConnection:
+            writer.close()
+            writer = None
+            continue
+        except (OSError, ValueError, IndexError, asyncio.TimeoutError,
+                asyncio.IncompleteReadError):
+            errors['io'] += 1
+            close = True
+            await asyncio.sleep(.1)
+        else:
+            latencies.append(time.monotonic() - start)
+            if status >= 400:
+                errors['status'] += 1
+        if close and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _run(url, headers, concurrency, duration, timeout):
+    latencies = []
+    errors = {'io': 0, 'status': 0}
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    await asyncio.gather(*(
+        _client(url, headers, deadline, timeout, latencies, errors)
+        for _ in range(concurrency)))
+    return latencies, errors, time.monotonic() - started
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    """ Django command to compare servers under concurrent load. """
+
+    help = ('Load test a URL of a running server, e.g. the same endpoint '
+            'behind uwsgi and behind the ASGI server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('url',
+                            help='e.g. http://127.0.0.1:8000/api/posts/')
+        parser.add_argument('--concurrency', default='50,200,1000',
+                            help='Comma separated connection counts.')
+        parser.add_argument('-H', '--header', action='append', default=[],
+                            help='Extra request header, e.g. '
+                                 '"Authorization: Token <key>".')
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=10)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only plain http:// URLs are supported.')
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        self.stdout.write(f'{"conns":>6} {"req/s":>9} {"p50 ms":>8} '
+                          f'{"p99 ms":>8} {"errors":>7}')
+        for level in levels:
+            latencies, errors, elapsed = asyncio.run(_run(
+                url, options['header'], level, options['duration'],
+                options['timeout']))
+            latencies.sort()
+            self.stdout.write(
+                f'{level:>6} {len(latencies) / elapsed:>9.1f} '
+                f'{_percentile(latencies, .5) * 1000:>8.1f} '
+                f'{_percentile(latencies, .99) * 1000:>8.1f} '
+                f'{errors["io"] + errors["status"]:>7}')
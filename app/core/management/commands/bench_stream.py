@@ -0,0 +1,93 @@
+""" Django command to benchmark idle comment stream subscribers """
+
+import asyncio
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from comment import stream
+
+
+class StreamClient:
+    """ An in-memory ASGI client of one comment stream. """
+
+    def __init__(self, content_type, object_id, last_event_id=None):
+        headers = []
+        if last_event_id:
+            headers.append((b'last-event-id', str(last_event_id).encode()))
+        self.scope = {
+            'type': 'http', 'method': 'GET', 'path': stream.STREAM_PATH,
+            'query_string': (f'content_type={content_type}'
+                             f'&object_id={object_id}').encode(),
+            'headers': headers,
+        }
+        self.events = asyncio.Queue()
+        self.status = None
+        self._requested = False
+        self._closed = asyncio.Event()
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b''}
+        await self._closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+        elif message.get('body', b'').startswith(b'id: '):
+            await self.events.put(message['body'])
+
+    def run(self):
+        return asyncio.ensure_future(
+            stream.stream(self.scope, self.receive, self.send))
+
+    def close(self):
+        self._closed.set()
+
+
+class Command(BaseCommand):
+    """ Hold idle streams in one process and time a fan out to them. """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subscribers', type=int, default=5000,
+            help='Idle streams to open.')
+        parser.add_argument(
+            '--objects', type=int, default=100,
+            help='Commented objects to spread the streams over.')
+
+    def handle(self, *args, **options):
+        with override_settings(COMMENT_STREAM_BROKER='local',
+                               COMMENT_STREAM_HEARTBEAT=3600):
+            asyncio.run(self._run(options['subscribers'], options['objects']))
+
+    async def _run(self, count, objects):
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        clients = [StreamClient(1, n % objects) for n in range(count)]
+        tasks = [client.run() for client in clients]
+        while len(stream.broker) < count:
+            await asyncio.sleep(0)
+        memory = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for object_id in range(objects):
+            stream.broker.publish({'id': 1, 'content_type': 1,
+                                   'object_id': object_id,
+                                   'data': {'content': 'benchmark'}})
+        for client in clients:
+            await client.events.get()
+        elapsed = time.perf_counter() - start
+
+        for client in clients:
+            client.close()
+        await asyncio.gather(*tasks)
+        self.stdout.write(
+            f'subscribers={count} objects={objects} '
+            f'kb_per_subscriber={memory / count / 1024:.1f} '
+            f'fanout_ms={elapsed * 1000:.1f}')
@@ -0,0 +1,92 @@
+""" Django command to benchmark rendering of the post pages """
+
+import copy
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from core import profiling
+from core.cache import invalidate
+from core.conditional import touch
+from core.models import Post, Tag
+from post import feed
+from post.temp_views import index, post_detail
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+
+
+class Command(BaseCommand):
+    """ Time cold and warm renders of the index and a post detail page. """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=500,
+            help='Published posts to create, all shown on the index.')
+        parser.add_argument(
+            '--renders', type=int, default=20,
+            help='Warm renders to average per page.')
+
+    def handle(self, *args, **options):
+        profiling.install()
+        stamp = time.time_ns()
+        user = get_user_model().objects.create_user(
+            email=f'bench-{stamp}@example.com')
+        tag = Tag.objects.create(value=f'bench-{stamp}')
+        now = timezone.now()
+        posts = Post.objects.bulk_create(
+            Post(author=user, title=f'Benchmark post {n}',
+                 content='Benchmark content ' * 20, slug=f'bench-{n}',
+                 published_at=now - timedelta(minutes=n))
+            for n in range(options['posts']))
+        pks = [post.pk for post in posts]
+        Post.tags.through.objects.bulk_create(
+            Post.tags.through(post_id=pk, tag_id=tag.pk) for pk in pks)
+        try:
+            for cached in (False, True):
+                loaders = settings.TEMPLATE_LOADERS
+                if cached:
+                    loaders = [(CACHED_LOADER, loaders)]
+                templates = copy.deepcopy(settings.TEMPLATES)
+                templates[0]['OPTIONS']['loaders'] = loaders
+                with override_settings(TEMPLATES=templates,
+                                       FEED_PAGE_SIZE=len(pks),
+                                       ALLOWED_HOSTS=['testserver']):
+                    self._run(cached, pks, options['renders'])
+        finally:
+            Post.objects.filter(pk__in=pks).delete()
+            tag.delete()
+            user.delete()
+
+    def _run(self, cached, pks, renders):
+        factory = RequestFactory()
+
+        def render(view, *args):
+            request = factory.get('/')
+            request.user = AnonymousUser()
+            with profiling.profiling() as profile:
+                start = time.perf_counter()
+                response = view(request, *args)
+                elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                self.stderr.write(f'{view.__name__}: {response.status_code}')
+            return elapsed, profile.queries
+
+        pages = [('index', index, (), lambda: feed.invalidate_posts(
+                      pks, window=True)),
+                 ('detail', post_detail, (pks[0],), lambda: (
+                      touch('post', pks[0]), invalidate('posts')))]
+        for page, view, args, drop in pages:
+            drop()
+            cold, cold_queries = render(view, *args)
+            warm = [render(view, *args) for _ in range(renders)]
+            self.stdout.write(
+                f'cached_loader={cached} page={page} posts={len(pks)} '
+                f'cold_ms={cold * 1000:.1f} cold_queries={cold_queries} '
+                f'warm_ms={sum(t for t, _ in warm) / renders * 1000:.1f} '
+                f'warm_queries={max(q for _, q in warm)}')
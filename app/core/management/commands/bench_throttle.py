@@ -0,0 +1,56 @@
+""" Django command to benchmark the cost of rate limit checks """
+
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.throttling import THROTTLES, local_buckets
+
+
+class _View:
+    throttle_scope = 'bench'
+
+
+class Command(BaseCommand):
+    """ Time the throttle checks of one request against the shared cache. """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=20000,
+            help='Checks to time per run.')
+        parser.add_argument(
+            '--clients', type=int, default=100,
+            help='Distinct client addresses to spread the checks over.')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        requests = [
+            factory.post('/', REMOTE_ADDR=f'10.0.{n // 256}.{n % 256}')
+            for n in range(options['clients'])]
+        for request in requests:
+            request.user = None
+        limit = ('1000000/s', 1000000)
+        rates = {'bench': {'user': limit, 'ip': limit, 'endpoint': limit}}
+        backend = type(caches['shared']).__name__
+        for enabled in (False, True):
+            local_buckets.clear()
+            with override_settings(THROTTLE_ENABLED=enabled,
+                                   THROTTLE_RATES=rates):
+                elapsed = self._run(requests, options['requests'])
+            self.stdout.write(
+                f'enabled={enabled} backend={backend} '
+                f'requests={options["requests"]} '
+                f'us_per_request={elapsed / options["requests"] * 1e6:.1f}')
+
+    def _run(self, requests, count):
+        throttles = [throttle() for throttle in THROTTLES]
+        view = _View()
+        start = time.perf_counter()
+        for n in range(count):
+            request = requests[n % len(requests)]
+            for throttle in throttles:
+                throttle.allow_request(request, view)
+        return time.perf_counter() - start
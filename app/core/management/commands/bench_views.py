@@ -0,0 +1,72 @@
+""" Django command to benchmark reads of one hot post """
+
+import multiprocessing
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from core.models import Post
+
+
+def _worker(pk, duration, results):
+    """ Hit the post detail API until ``duration`` runs out. """
+    from post.counters import view_counter
+    from post.views import PostViewSet
+
+    view = PostViewSet.as_view({'get': 'retrieve'})
+    factory = APIRequestFactory()
+    done = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        view(factory.get(f'/api/posts/{pk}/'), pk=pk)
+        done += 1
+    view_counter.flush()
+    connections.close_all()
+    results.put(done)
+
+
+class Command(BaseCommand):
+    """ Measure detail throughput on one post per worker count. """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', default='1,2,4,8',
+            help='Comma separated worker counts to run.')
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Seconds to run each worker count for.')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create_user(
+            email=f'bench-{time.time_ns()}@example.com')
+        post = Post.objects.create(
+            author=user, title='Benchmark post', content='Hot post',
+            published_at=timezone.now())
+        try:
+            for workers in map(int, options['workers'].split(',')):
+                self._run(post, workers, options['duration'])
+        finally:
+            post.delete()
+            user.delete()
+
+    def _run(self, post, workers, duration):
+        connections.close_all()
+        results = multiprocessing.Queue()
+        procs = [
+            multiprocessing.Process(
+                target=_worker, args=(post.pk, duration, results))
+            for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        total = sum(results.get() for _ in procs)
+        for proc in procs:
+            proc.join()
+        post.refresh_from_db()
+        self.stdout.write(
+            f'workers={workers} requests={total} '
+            f'rps={total / duration:.0f} views={post.views}')
+        Post.objects.filter(pk=post.pk).update(views=0)
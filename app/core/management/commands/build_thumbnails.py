@@ -0,0 +1,34 @@
+""" Django command to build missing gallery thumbnails """
+
+from django.core.management.base import BaseCommand
+
+from core.models import Gallery
+
+
+class Command(BaseCommand):
+    """ Django command to backfill gallery derivatives. """
+
+    help = 'Build thumbnail and WebP derivatives of gallery images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Rebuild images that already have derivatives.')
+
+    def handle(self, *args, **options):
+        from post.images import build_thumbnails
+
+        galleries = Gallery.objects.exclude(image='').order_by('id')
+        if not options['force']:
+            galleries = galleries.filter(thumbnails=[])
+        built = failed = 0
+        for gallery in galleries.iterator():
+            try:
+                build_thumbnails(gallery)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Gallery {gallery.pk}: {exc}')
+            else:
+                built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Built thumbnails for {built} images, {failed} failed.'))
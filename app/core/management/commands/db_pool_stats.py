@@ -0,0 +1,61 @@
+""" Django command to report database connection and pool usage """
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.db.pool import all_pools
+
+
+class Command(BaseCommand):
+    """ Django command to show how connections are configured and used. """
+
+    help = ('Report the pooling mode of each database and the connections '
+            'the server sees from this application, by state.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true',
+                            help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        pools = all_pools()
+        report = {}
+        for conn in connections.all():
+            settings_dict = conn.settings_dict
+            entry = {
+                'conn_max_age': settings_dict['CONN_MAX_AGE'],
+                'health_checks': settings_dict.get(
+                    'CONN_HEALTH_CHECKS', False),
+                'pool': settings_dict.get('POOL') or None,
+            }
+            if conn.alias in pools:
+                entry['process_pool'] = pools[conn.alias].stats()
+            if conn.vendor == 'postgresql':
+                entry['server'] = self.server_stats(conn)
+            report[conn.alias] = entry
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for alias, entry in report.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(alias))
+            for key, value in entry.items():
+                if isinstance(value, dict):
+                    value = ', '.join(f'{k}={v}' for k, v in value.items())
+                self.stdout.write(f'  {key}: {value}')
+
+    def server_stats(self, conn):
+        """ Count this application's server sessions by state. """
+        with conn.cursor() as cursor:
+            cursor.execute('SHOW max_connections')
+            max_connections = int(cursor.fetchone()[0])
+            cursor.execute(
+                "SELECT coalesce(state, 'unknown'), count(*) "
+                "FROM pg_stat_activity "
+                "WHERE datname = current_database() "
+                "AND application_name = current_setting('application_name') "
+                "AND pid <> pg_backend_pid() "
+                "GROUP BY 1 ORDER BY 1")
+            states = dict(cursor.fetchall())
+        return dict(states, total=sum(states.values()),
+                    max_connections=max_connections)
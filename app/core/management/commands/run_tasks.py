@@ -0,0 +1,52 @@
+""" Django command to run queued background tasks """
+
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    """ Django command to work through the task queue. """
+
+    help = ('Run queued tasks until stopped. Start as many workers as '
+            'needed; they share the queue without blocking each other.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the tasks due now and exit.')
+        parser.add_argument('--batch', type=int,
+                            default=settings.TASK_BATCH_SIZE)
+        parser.add_argument('--poll', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        tasks.discover()
+        if options['once']:
+            ran = tasks.run_pending(options['batch'])
+            self.stdout.write(f'Ran {ran} tasks')
+            return
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.stdout.write('Waiting for tasks ...')
+        last_sweep = 0
+        while not self.stopping:
+            close_old_connections()
+            if time.monotonic() - last_sweep > settings.TASK_TIMEOUT / 2:
+                tasks.requeue_stale()
+                tasks.prune()
+                last_sweep = time.monotonic()
+            claimed = tasks.claim(options['batch'])
+            for task in claimed:
+                tasks.execute(task)
+            if not claimed:
+                time.sleep(options['poll'])
+
+    def stop(self, signum, frame):
+        """ Finish the current batch, then exit. """
+        self.stopping = True
@@ -0,0 +1,25 @@
+""" Django command to delete expired auth tokens """
+
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.models import RevokedToken
+
+
+class Command(BaseCommand):
+    """ Delete expired revocations and, with AUTH_DB_TOKEN_TTL, tokens. """
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        revoked, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+        tokens = 0
+        if settings.AUTH_DB_TOKEN_TTL:
+            cutoff = now - datetime.timedelta(
+                seconds=settings.AUTH_DB_TOKEN_TTL)
+            tokens, _ = Token.objects.filter(created__lt=cutoff).delete()
+        self.stdout.write(
+            f'Deleted {tokens} expired tokens and {revoked} revocations')
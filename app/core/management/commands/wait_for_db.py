@@ -3,6 +3,7 @@
 import time
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.db import connections
 from django.db.utils import OperationalError
 from django.core.management.base import BaseCommand
 
@@ -10,6 +11,11 @@ from django.core.management.base import BaseCommand
 class Command(BaseCommand):
     """ Django command to wait for db. """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Fill the connection pools once the database is up.')
+
     def handle(self, *args, **options):
         self.stdout.write('Waiting for database ... ')
         db_up = False
@@ -23,3 +29,15 @@ class Command(BaseCommand):
                 time.sleep(1)
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
+        if options['warm']:
+            self.warm()
+
+    def warm(self):
+        """ Open the pooled connections of every database. """
+        connections.close_all()
+        for conn in connections.all():
+            warm_pool = getattr(conn, 'warm_pool', None)
+            if warm_pool is not None:
+                opened = warm_pool()
+                self.stdout.write(
+                    f'Opened {opened} pooled connections to {conn.alias}')
@@ -0,0 +1,87 @@
+""" Prometheus metrics of the application
+
+Each worker process records its own values. When
+``PROMETHEUS_MULTIPROC_DIR`` is set before the workers start, the
+values live in memory mapped files in that directory and ``exposition``
+sums them over every worker. Processes of other containers, such as the
+task worker, keep theirs in their own directory on a shared volume;
+the comma separated ``METRICS_EXTRA_DIRS`` are summed in too.
+"""
+
+import glob
+import os
+
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess)
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST, generate_latest)
+
+REQUEST_LATENCY = Histogram(
+    'iforum_request_duration_seconds', 'Request latency by route.',
+    ['view', 'method', 'status'])
+
+DB_QUERY_DURATION = Histogram(
+    'iforum_db_query_duration_seconds', 'Database query time.',
+    ['alias', 'operation'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+
+GALLERY_UPLOAD_BYTES = Histogram(
+    'iforum_gallery_upload_bytes', 'Size of accepted gallery uploads.',
+    buckets=(16 << 10, 64 << 10, 256 << 10, 1 << 20, 2 << 20, 5 << 20,
+             10 << 20))
+GALLERY_UPLOAD_SECONDS = Histogram(
+    'iforum_gallery_upload_seconds',
+    'Time to receive, check and store a gallery upload.', ['outcome'])
+THUMBNAIL_BUILD_SECONDS = Histogram(
+    'iforum_thumbnail_build_seconds',
+    'Time to build the derivatives of a gallery image.')
+
+COMMENTS_CREATED = Counter(
+    'iforum_comments_created', 'Comments created, by commented model.',
+    ['model'])
+
+THROTTLED_REQUESTS = Counter(
+    'iforum_throttled_requests', 'Requests refused by a rate limit.',
+    ['scope', 'kind'])
+
+PROFILED_REQUESTS = Counter(
+    'iforum_profiled_requests', 'Requests sampled for profiling.', ['view'])
+PROFILED_QUERIES = Counter(
+    'iforum_profiled_queries', 'Queries of profiled requests.', ['view'])
+PROFILED_DB_SECONDS = Counter(
+    'iforum_profiled_db_seconds', 'Query time of profiled requests.',
+    ['view'])
+PROFILED_SERIALIZER_SECONDS = Counter(
+    'iforum_profiled_serializer_seconds',
+    'Serializer time of profiled requests.', ['view'])
+PROFILED_TEMPLATE_SECONDS = Counter(
+    'iforum_profiled_template_seconds',
+    'Template render time of profiled requests.', ['view'])
+N_PLUS_ONE = Counter(
+    'iforum_n_plus_one', 'Repeated statements flagged in profiled requests.',
+    ['view'])
+
+
+class DirectoriesCollector:
+    """ Sum the value files of the processes writing to ``paths``. """
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def collect(self):
+        files = [name for path in self.paths
+                 for name in glob.glob(os.path.join(path, '*.db'))]
+        return multiprocess.MultiProcessCollector.merge(files)
+
+
+def exposition():
+    """ Return ``(body, content_type)`` of every metric in OpenMetrics. """
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        extra = os.environ.get('METRICS_EXTRA_DIRS', '').split(',')
+        registry = CollectorRegistry()
+        registry.register(DirectoriesCollector(
+            [path] + list(filter(None, extra))))
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
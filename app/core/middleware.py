@@ -0,0 +1,130 @@
+""" Project wide middleware """
+
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from core import metrics, profiling
+from core.db.router import SAFE_METHODS, pin_to_primary
+
+profile_logger = logging.getLogger('core.profiling')
+
+
+class ProfilingMiddleware:
+    """
+    Time every request by view and profile a sampled fraction of them:
+    query count and time, serializer and template time and statements
+    repeated with different parameters (N+1 queries).
+
+    Profiles are logged as JSON to ``core.profiling`` and summed into
+    the ``/metrics`` counters. Under ASGI the middleware runs as a
+    coroutine; the profile is bound to the request's context, which
+    ``sync_to_async`` carries into the threads that run its queries.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        profiling.install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            response = self.get_response(request)
+            self.observe(request, response, time.perf_counter() - start)
+            return response
+        with profiling.profiling() as profile:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        view = self.observe(request, response, elapsed)
+        self.report(request, response, view, elapsed, profile)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            response = await self.get_response(request)
+            self.observe(request, response, time.perf_counter() - start)
+            return response
+        with profiling.profiling() as profile:
+            response = await self.get_response(request)
+        elapsed = time.perf_counter() - start
+        view = self.observe(request, response, elapsed)
+        self.report(request, response, view, elapsed, profile)
+        return response
+
+    def observe(self, request, response, elapsed):
+        """ Record the request latency; return the view name. """
+        view = getattr(request.resolver_match, 'view_name', None) or (
+            '<unresolved>')
+        metrics.REQUEST_LATENCY.labels(
+            view, request.method, f'{response.status_code // 100}xx',
+        ).observe(elapsed)
+        return view
+
+    def report(self, request, response, view, elapsed, profile):
+        repeated = profile.n_plus_one(settings.PROFILING_NPLUSONE_THRESHOLD)
+        metrics.PROFILED_REQUESTS.labels(view).inc()
+        metrics.PROFILED_QUERIES.labels(view).inc(profile.queries)
+        metrics.PROFILED_DB_SECONDS.labels(view).inc(profile.db_time)
+        metrics.PROFILED_SERIALIZER_SECONDS.labels(view).inc(
+            profile.timings['serializer'])
+        metrics.PROFILED_TEMPLATE_SECONDS.labels(view).inc(
+            profile.timings['template'])
+        if repeated:
+            metrics.N_PLUS_ONE.labels(view).inc(len(repeated))
+        profile_logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'queries': profile.queries,
+            'db_ms': round(profile.db_time * 1000, 2),
+            'serializer_ms': round(profile.timings['serializer'] * 1000, 2),
+            'template_ms': round(profile.timings['template'] * 1000, 2),
+            'n_plus_one': [{'sql': sql, 'count': count}
+                           for sql, count in repeated],
+        }))
+
+
+class ReplicaPinMiddleware:
+    """ Pin clients to the primary database after a successful write. """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            pin_to_primary(request, response)
+        return response
+
+    async def __acall__(self, request):
+        from core.aio import database_sync_to_async
+
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            await database_sync_to_async(pin_to_primary)(request, response)
+        return response
+
+    def wrote(self, request, response):
+        """ Whether ``request`` changed data a replica may lag on. """
+        return (bool(settings.DATABASE_REPLICAS)
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400)
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_authorprofile_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gallery',
+            index=models.Index(fields=['created_at', 'id'], name='gallery_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['published_at', 'id'], name='post_published_id_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def count_comments(apps, schema_editor):
+    """ Backfill counters from the existing comments. """
+    Comment = apps.get_model('core', 'Comment')
+    CommentCounter = apps.get_model('core', 'CommentCounter')
+    totals = Comment.objects.values('content_type', 'object_id').annotate(
+        total=models.Count('id')).order_by()
+    CommentCounter.objects.bulk_create(
+        [CommentCounter(content_type_id=row['content_type'],
+                        object_id=row['object_id'],
+                        count=row['total']) for row in totals],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0005_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['content_type', 'object_id', 'created_at'], name='comment_target_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='commentcounter',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype'),
+        ),
+        migrations.AddConstraint(
+            model_name='commentcounter',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_comment_counter'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
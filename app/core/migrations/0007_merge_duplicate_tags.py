@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:15
+
+from django.db import migrations, models
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """ Fold tags sharing a value into the oldest one. """
+    Tag = apps.get_model('core', 'Tag')
+    Through = apps.get_model('core', 'Post').tags.through
+    duplicates = Tag.objects.values('value').annotate(
+        keep=models.Min('id'), total=models.Count('id')).filter(
+        total__gt=1).order_by()
+    for row in duplicates:
+        tagged = Through.objects.filter(tag_id=row['keep']).values('post_id')
+        others = Tag.objects.filter(value=row['value']).exclude(
+            id=row['keep'])
+        for other in others:
+            Through.objects.filter(tag_id=other.id).exclude(
+                post_id__in=tagged).update(tag_id=row['keep'])
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_comment_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
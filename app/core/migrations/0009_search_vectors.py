@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:17
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def index_existing(apps, schema_editor):
+    """ Fill the search vectors of existing posts and comments. """
+    config = settings.SEARCH_CONFIG
+    apps.get_model('core', 'Post').objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config) +
+        SearchVector('content', weight='B', config=config)))
+    apps.get_model('core', 'Comment').objects.update(
+        search_vector=SearchVector('content', config=config))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_unique_tag_value'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(index_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='comment_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='post_search_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-17 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gallery',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
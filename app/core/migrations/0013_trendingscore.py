@@ -0,0 +1,49 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:19
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def score_posts(apps, schema_editor):
+    """ Rank published posts, counting past views and comments at publish. """
+    Post = apps.get_model('core', 'Post')
+    CommentCounter = apps.get_model('core', 'CommentCounter')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TrendingScore = apps.get_model('core', 'TrendingScore')
+    comments = dict(CommentCounter.objects.filter(
+        content_type__in=ContentType.objects.filter(
+            app_label='core', model='post'),
+    ).values_list('object_id', 'count'))
+    tau = settings.TRENDING_HALF_LIFE / math.log(2)
+    posts = Post.objects.filter(published_at__isnull=False).values_list(
+        'id', 'published_at', 'views')
+    TrendingScore.objects.bulk_create(
+        [TrendingScore(post_id=pk, score=math.log(
+            settings.TRENDING_PUBLISH_WEIGHT
+            + views * settings.TRENDING_VIEW_WEIGHT
+            + comments.get(pk, 0) * settings.TRENDING_COMMENT_WEIGHT,
+        ) + published_at.timestamp() / tau)
+         for pk, published_at, views in posts.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0012_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingScore',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='core.post')),
+                ('score', models.FloatField(db_index=True)),
+            ],
+        ),
+        migrations.RunPython(score_posts, migrations.RunPython.noop),
+    ]
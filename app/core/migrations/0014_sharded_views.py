@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-17 18:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_trendingscore'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='views',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PostViewShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_shards', to='core.post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postviewshard',
+            constraint=models.UniqueConstraint(fields=('post', 'shard'), name='unique_post_view_shard'),
+        ),
+    ]
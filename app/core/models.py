@@ -7,8 +7,11 @@ from django.utils.translation import gettext_lazy as _
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import PermissionDenied
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -58,6 +61,12 @@ class User(AbstractUser):
 class Tag(models.Model):
     value = models.CharField(max_length=100)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['value'],
+                                    name='unique_tag_value'),
+        ]
+
     def create(self, *args, **kwargs):
         if not self.request.user.is_authorized:
             raise PermissionDenied(
@@ -75,6 +84,13 @@ class Gallery(models.Model):
         upload_to='gallery/%Y/%m/%d')  # upload_to=galler_image_path
     created_at = models.DateTimeField(
         auto_now_add=True, db_index=True)
+    thumbnails = models.JSONField(default=list, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'],
+                         name='gallery_created_id_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -87,6 +103,28 @@ class Comment(models.Model):
     content_object = GenericForeignKey("content_type", "object_id")
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     modified_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'created_at'],
+                         name='comment_target_created_idx'),
+            GinIndex(fields=['search_vector'], name='comment_search_idx'),
+        ]
+
+
+class CommentCounter(models.Model):
+    """ Number of comments on one generic target. """
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name='+')
+    object_id = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'],
+                                    name='unique_comment_counter'),
+        ]
 
 
 class Post(models.Model):
@@ -99,18 +137,68 @@ class Post(models.Model):
     title = models.TextField(max_length=100)
     content = models.TextField()
     slug = models.SlugField()
-    views = models.SmallIntegerField(default=0)
+    views = models.BigIntegerField(default=0)
     tags = models.ManyToManyField(Tag, related_name='posts', blank=True)
     comments = GenericRelation(Comment)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_at', 'id'],
+                         name='post_published_id_idx'),
+            GinIndex(fields=['search_vector'], name='post_search_idx'),
+        ]
 
     def save(self, *args, **kwargs):
+        """
+        Save every field but ``views`` of an existing post. Being an
+        UPDATE with ``update_fields``, saving a post deleted meanwhile
+        raises DatabaseError ("did not affect any rows") instead of
+        inserting it again.
+        """
         self.slug = slugify(self.title + '_' + f'{self.pk}')
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None):
+            # views only moves by the counters' UPDATEs: writing back the
+            # count read earlier would undo a roll up committed since
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views'
+                and field.attname not in deferred]
         super(Post, self).save(*args, **kwargs)
 
     def __str__(self) -> str:
         return self.title
 
 
+class PostViewShard(models.Model):
+    """ Views of a post not yet rolled up into ``Post.views``. """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='view_shards')
+    shard = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'shard'],
+                                    name='unique_post_view_shard'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}/{self.shard}: {self.count}'
+
+
+class TrendingScore(models.Model):
+    """ Time-decayed popularity of a published post, see post.trending. """
+    post = models.OneToOneField(Post, on_delete=models.CASCADE,
+                                primary_key=True, related_name='trending')
+    score = models.FloatField(db_index=True)
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score}'
+
+
 class AuthorProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -123,3 +211,48 @@ class AuthorProfile(models.Model):
 
     def __str__(self):
         return f"{self.__class__.__name__} object for {self.user}"
+
+
+class Task(models.Model):
+    """ A unit of background work, run by the ``run_tasks`` worker """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'),
+                      (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=200, unique=True,
+                                       null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_at'], name='task_queued_idx',
+                         condition=models.Q(status='queued')),
+            models.Index(fields=['status', 'finished_at'],
+                         name='task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class RevokedToken(models.Model):
+    """ A signed token refused until it would have expired anyway. """
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,195 @@
+""" Keyset (cursor) pagination for the API list views """
+
+import base64
+import datetime
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import DateTimeField, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.aio import afetch
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def to_cursor(moment, pk):
+    """ Encode a ``(datetime, id)`` position as ``<microseconds>-<id>``. """
+    micros = (moment - EPOCH) // datetime.timedelta(microseconds=1)
+    return f'{micros}-{pk}'
+
+
+def from_cursor(cursor):
+    """ Decode a ``to_cursor`` value, returning None when malformed. """
+    try:
+        micros, pk = (int(part) for part in cursor.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return EPOCH + datetime.timedelta(microseconds=micros), pk
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on an indexed column plus a unique tie breaker.
+
+    ``ordering`` lists the sort fields, descending when prefixed with
+    ``-``; the last one must be unique. Numeric annotations such as a
+    search rank may be used too. The cursor is an opaque encoding
+    of those values for the last row served, so each page is one LIMITed
+    range scan however deep the client has paged.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.API_PAGE_SIZE
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._set_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self._set_page(
+            await afetch(self._page_queryset(queryset, request)))
+
+    def _page_queryset(self, queryset, request):
+        """ Return the unevaluated query for the requested page. """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.model = queryset.model
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self._after(cursor))
+        queryset = queryset.order_by(*self.ordering)
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, page):
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = [self._dump(getattr(last, name)) for name in self.fields]
+        cursor = base64.urlsafe_b64encode(
+            json.dumps(values).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_first_link(self):
+        url = self.request.build_absolute_uri()
+        return remove_query_param(url, self.cursor_query_param)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [self._load(name, value)
+                    for name, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _dump(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _field(self, name):
+        """ Return the model field ``name``, or None for annotations. """
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _load(self, name, value):
+        field = self._field(name)
+        if field is None:
+            if not isinstance(value, (int, float)):
+                raise ValueError
+            return value
+        if value is None:
+            return value
+        if isinstance(field, DateTimeField) and not isinstance(value, str):
+            raise ValueError
+        # Checks the type as the query would, before it is built
+        return field.get_prep_value(field.to_python(value))
+
+    def _after(self, cursor):
+        """
+        Build the filter selecting rows strictly after ``cursor``.
+
+        Follows Postgres' default NULL placement (NULLs compare larger
+        than any value) so the plain column indexes serve the ordering.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for name, value in zip(self.ordering, cursor):
+            field = name.lstrip('-')
+            if name.startswith('-'):
+                step = (Q(**{f'{field}__isnull': False}) if value is None
+                        else Q(**{f'{field}__lt': value}))
+            elif value is None:
+                step = None
+            else:
+                step = Q(**{f'{field}__gt': value})
+                if getattr(self._field(field), 'null', False):
+                    step |= Q(**{f'{field}__isnull': True})
+            if step is not None:
+                condition |= equal & step
+            equal &= (Q(**{f'{field}__isnull': True}) if value is None
+                      else Q(**{field: value}))
+        return condition
+
+
+class PostPagination(KeysetPagination):
+    """ Newest published posts first. """
+    ordering = ('-published_at', '-id')
+
+
+class CommentPagination(KeysetPagination):
+    """ Newest comments first. """
+    ordering = ('-created_at', '-id')
+
+
+class GalleryPagination(KeysetPagination):
+    """ Newest images first. """
+    ordering = ('-created_at', '-id')
+
+
+class TagPagination(KeysetPagination):
+    """ Tags in creation order. """
+    ordering = ('id',)
@@ -0,0 +1,133 @@
+""" Sampled request profiling of queries, serializers and templates """
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from core import metrics
+
+OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+_profile = ContextVar('profile', default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+
+class Profile:
+    """
+    Timings of one request. Query time is collected from every database
+    connection used on its behalf, in any thread, including several at
+    once for async views; serializer and template time count the
+    outermost call only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = {'serializer': 0.0, 'template': 0.0}
+        self._statements = {}
+        self._active = set()
+
+    def add_query(self, sql, params, elapsed):
+        with self._lock:
+            self.queries += 1
+            self.db_time += elapsed
+            seen = self._statements.setdefault(sql, [0, set()])
+            seen[0] += 1
+            seen[1].add(repr(params))
+
+    @contextmanager
+    def timed(self, name):
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+            self._active.discard(name)
+
+    def n_plus_one(self, threshold):
+        """
+        Return ``[(sql, count)]`` of statements run at least ``threshold``
+        times with differing parameters, most repeated first.
+        """
+        found = [(sql, count) for sql, (count, params)
+                 in self._statements.items()
+                 if count >= threshold and len(params) > 1]
+        return sorted(found, key=lambda item: -item[1])
+
+
+@contextmanager
+def profiling():
+    """ Profile the code inside the block; yields the ``Profile``. """
+    profile = Profile()
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+def _operation(sql):
+    verb = sql.lstrip()[:6].upper()
+    return verb if verb in OPERATIONS else 'OTHER'
+
+
+def _record_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.DB_QUERY_DURATION.labels(
+            context['connection'].alias, _operation(sql)).observe(elapsed)
+        profile = _profile.get()
+        if profile is not None:
+            profile.add_query(sql, params, elapsed)
+
+
+def _add_query_wrapper(sender=None, connection=None, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        profile = _profile.get()
+        if profile is None:
+            return func(*args, **kwargs)
+        with profile.timed(name):
+            return func(*args, **kwargs)
+    return wrapped
+
+
+def install():
+    """
+    Hook query execution, DRF serialization and template rendering.
+    Every query is timed into the metrics; the other hooks cost a
+    context variable lookup outside profiled requests.
+    """
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.base import Template
+        from rest_framework.serializers import BaseSerializer
+
+        connection_created.connect(_add_query_wrapper)
+        for conn in connections.all():
+            _add_query_wrapper(connection=conn)
+        BaseSerializer.data = property(
+            _timed('serializer', BaseSerializer.data.fget))
+        Template.render = _timed('template', Template.render)
+        _installed = True
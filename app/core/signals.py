@@ -0,0 +1,61 @@
+""" Signal handlers retiring cached responses when models change """
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.auth import forget_tokens, forget_user
+from core.cache import invalidate
+from core.conditional import touch
+from core.models import Comment, Gallery, Post, Tag
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    invalidate('posts')
+    touch('posts')
+    touch('post', instance.pk)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        invalidate('posts', 'tags')
+        touch('posts')
+        touch('tags')
+        for pk in (pk_set or []) if reverse else [instance.pk]:
+            touch('post', pk)
+    elif action == 'pre_clear' and reverse:
+        for pk in instance.posts.values_list('pk', flat=True):
+            touch('post', pk)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate('posts', 'tags')
+    touch('tags')
+
+
+@receiver([post_save, post_delete], sender=Gallery)
+def gallery_changed(sender, instance, **kwargs):
+    invalidate('gallery')
+    touch('post', instance.post_id)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate('comments')
+    touch('comments', instance.content_type_id, instance.object_id)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    forget_tokens(instance.key)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    forget_tokens(*Token.objects.filter(user=instance).values_list(
+        'key', flat=True))
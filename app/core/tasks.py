@@ -0,0 +1,143 @@
+""" A Postgres backed background task queue
+
+Side effects are registered with ``@task`` and enqueued with
+``func.delay(*args, **kwargs)``, which inserts a ``Task`` row in the
+caller's transaction, so work is only visible to workers once the
+change that caused it commits. ``manage.py run_tasks`` claims due rows
+with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of workers
+share the queue without blocking each other.
+"""
+
+import datetime
+import functools
+import logging
+import random
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name=None, max_attempts=None):
+    """
+    Register a function as a task and give it ``delay``.
+
+    ``delay(*args, key=None, countdown=0, **kwargs)`` enqueues a call
+    with JSON serializable arguments. A call enqueued with the ``key``
+    of a task still on record is dropped.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        _registry[task_name] = func
+        func.task_name = task_name
+        func.delay = functools.partial(
+            enqueue, task_name, max_attempts=max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(name, *args, key=None, countdown=0, max_attempts=None,
+            **kwargs):
+    """ Queue a call of task ``name``, or run it now with TASKS_EAGER. """
+    if settings.TASKS_EAGER:
+        _registry[name](*args, **kwargs)
+        return
+    Task.objects.bulk_create([Task(
+        name=name, args=list(args), kwargs=kwargs, idempotency_key=key,
+        max_attempts=max_attempts or settings.TASK_MAX_ATTEMPTS,
+        run_at=timezone.now() + datetime.timedelta(seconds=countdown),
+    )], ignore_conflicts=key is not None)
+
+
+def discover():
+    """ Import the ``tasks`` module of every installed app. """
+    autodiscover_modules('tasks')
+
+
+def claim(limit):
+    """ Mark up to ``limit`` due tasks running and return them. """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(Task.objects.select_for_update(skip_locked=True).filter(
+            status=Task.QUEUED, run_at__lte=now).order_by('run_at')[:limit])
+        Task.objects.filter(pk__in=[t.pk for t in tasks]).update(
+            status=Task.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+    for t in tasks:
+        t.status, t.locked_at, t.attempts = Task.RUNNING, now, t.attempts + 1
+    return tasks
+
+
+def backoff(attempts):
+    """ Seconds to wait before retrying after ``attempts`` failures. """
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1),
+                settings.TASK_RETRY_MAX_DELAY)
+    return delay * random.uniform(.5, 1)
+
+
+def execute(t):
+    """ Run a claimed task, then record its success or schedule a retry. """
+    try:
+        func = _registry[t.name]
+        with transaction.atomic():
+            func(*t.args, **t.kwargs)
+    except Exception:
+        t.last_error = traceback.format_exc()
+        if t.attempts < t.max_attempts:
+            t.status = Task.QUEUED
+            t.run_at = timezone.now() + datetime.timedelta(
+                seconds=backoff(t.attempts))
+            logger.warning('Task %s #%d failed, retry %d at %s', t.name,
+                           t.pk, t.attempts, t.run_at)
+        else:
+            t.status = Task.FAILED
+            t.finished_at = timezone.now()
+            logger.error('Task %s #%d failed for good', t.name, t.pk)
+        t.save(update_fields=['status', 'run_at', 'last_error',
+                              'finished_at'])
+        return False
+    t.status = Task.DONE
+    t.finished_at = timezone.now()
+    t.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+def run_pending(limit=None):
+    """ Run the tasks due now, batch by batch; return how many ran. """
+    limit = limit or settings.TASK_BATCH_SIZE
+    ran = 0
+    while True:
+        tasks = claim(limit)
+        for t in tasks:
+            execute(t)
+        ran += len(tasks)
+        if len(tasks) < limit:
+            return ran
+
+
+def requeue_stale():
+    """ Queue again tasks whose worker died while running them. """
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=now - datetime.timedelta(seconds=settings.TASK_TIMEOUT))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished_at=now, last_error='Worker lost')
+    return stale.update(status=Task.QUEUED, run_at=now)
+
+
+def prune():
+    """ Delete finished tasks older than TASK_RETENTION seconds. """
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=settings.TASK_RETENTION)
+    deleted, _ = Task.objects.filter(
+        status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
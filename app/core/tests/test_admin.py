@@ -5,6 +5,8 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import Client
 
+from core.models import Post
+
 
 class AdminSiteTests(TestCase):
     """ Test for Django admin. """
@@ -43,3 +45,12 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_post_views_read_only(self):
+        """ Test post views are shown but not edited in the admin. """
+        post = Post.objects.create(
+            author=self.user, title='Post', content='content', views=7)
+        url = reverse('admin:core_post_change', args=[post.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotContains(res, 'name="views"')
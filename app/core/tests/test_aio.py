@@ -0,0 +1,134 @@
+""" Tests for the async read views. """
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import path
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from comment.views import CommentViewSet
+from core.aio import database_sync_to_async
+from core.models import Comment, Post, Tag
+from post.counters import view_counter
+from post.views import PostViewSet, TagView
+
+urlpatterns = [
+    path('posts/', PostViewSet.as_async_view(
+        {'get': 'list', 'post': 'create'})),
+    path('posts/<pk>/', PostViewSet.as_async_view(
+        {'get': 'retrieve', 'delete': 'destroy'})),
+    path('tags/', TagView.as_async_view()),
+    path('comments/', CommentViewSet.as_async_view({'get': 'list'})),
+]
+
+
+async def run(func, *args, **kwargs):
+    """ Call sync ``func`` from a test coroutine. """
+    return await database_sync_to_async(func)(*args, **kwargs)
+
+
+# Worker thread connections would otherwise outlive the test database
+@patch.dict(connection.settings_dict, CONN_MAX_AGE=0)
+@override_settings(ROOT_URLCONF='core.tests.test_aio')
+class AsyncViewTests(TransactionTestCase):
+    """ Test the async views answer like the sync ones. """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='async@example.com', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+        tag = Tag.objects.create(value='async')
+        self.posts = []
+        for n in range(3):
+            post = Post.objects.create(
+                author=self.user, title=f'Post {n}', content='content',
+                published_at=f'2023-02-0{n + 1}T11:11:11Z')
+            post.tags.add(tag)
+            self.posts.append(post)
+        self.draft = Post.objects.create(
+            author=self.user, title='Draft', content='content')
+        self.ctype = ContentType.objects.get_for_model(Post)
+        self.async_client = AsyncClient()
+
+    def tearDown(self):
+        view_counter.flush()
+
+    def auth(self):
+        return {'AUTHORIZATION': f'Token {self.token.key}'}
+
+    async def test_list_posts_like_sync(self):
+        """ Test the async post list matches the sync one. """
+        res = await self.async_client.get('/posts/?page_size=2')
+        self.assertEqual(res.status_code, 200)
+        with override_settings(ROOT_URLCONF='app.urls'):
+            sync = await run(APIClient().get, '/api/posts/',
+                             {'page_size': 2})
+        self.assertEqual(res.json()['results'], sync.json()['results'])
+        self.assertEqual([p['title'] for p in res.json()['results']],
+                         ['Post 2', 'Post 1'])
+        nxt = res.json()['next'].replace('http://testserver', '')
+        res = await self.async_client.get(nxt)
+        self.assertEqual([p['title'] for p in res.json()['results']],
+                         ['Post 0'])
+
+    async def test_list_posts_authenticated(self):
+        """ Test authors see their drafts through the async view. """
+        res = await self.async_client.get('/posts/', **self.auth())
+        titles = [p['title'] for p in res.json()['results']]
+        self.assertIn('Draft', titles)
+
+    async def test_anonymous_list_cached(self):
+        """ Test anonymous async lists are served from the cache. """
+        await self.async_client.get('/tags/')
+        await run(Tag.objects.filter(value='async').update, value='changed')
+        res = await self.async_client.get('/tags/')
+        self.assertEqual(res.json()['results'][0]['value'], 'async')
+
+    async def test_retrieve_counts_view(self):
+        """ Test the async detail view counts the view. """
+        post = self.posts[0]
+        res = await self.async_client.get(f'/posts/{post.id}/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['views'], 1)
+        self.assertEqual(res.json()['title'], post.title)
+
+    async def test_retrieve_missing(self):
+        """ Test unknown and malformed ids are 404s. """
+        for pk in (self.draft.id, 10 ** 6, 'abc'):
+            res = await self.async_client.get(f'/posts/{pk}/')
+            self.assertEqual(res.status_code, 404)
+
+    async def test_bad_token(self):
+        """ Test authentication errors come back as 401s. """
+        res = await self.async_client.get(
+            '/posts/', AUTHORIZATION='Token wrong')
+        self.assertEqual(res.status_code, 401)
+
+    async def test_comment_list(self):
+        """ Test comments of a post are listed newest first. """
+        post = self.posts[0]
+        ctype = self.ctype
+        for n in range(2):
+            await run(Comment.objects.create, creator=self.user,
+                      content=f'Comment {n}', content_type=ctype,
+                      object_id=post.id)
+        res = await self.async_client.get(
+            f'/comments/?content_type={ctype.id}&object_id={post.id}')
+        self.assertEqual([c['content'] for c in res.json()['results']],
+                         ['Comment 1', 'Comment 0'])
+
+    async def test_writes_use_sync_view(self):
+        """ Test unsafe methods fall through to the sync view. """
+        post = self.posts[0]
+        res = await self.async_client.delete(f'/posts/{post.id}/',
+                                             **self.auth())
+        self.assertEqual(res.status_code, 204)
+        res = await self.async_client.get(f'/posts/{post.id}/')
+        self.assertEqual(res.status_code, 404)
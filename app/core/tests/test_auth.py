@@ -0,0 +1,223 @@
+""" Tests for cached token authentication. """
+
+import datetime
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.auth import token_cache_key
+from core.models import RevokedToken
+
+ME_URL = reverse('user:me')
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+
+
+@override_settings(AUTH_TOKEN_CACHE_TIMEOUT=300, PROFILING_SAMPLE_RATE=0)
+class CachedTokenAuthenticationTests(TestCase):
+    """ Test tokens are served from the cache until they change """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='auth@example.com', password='testpass123',
+            username='Auth')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_cached(self):
+        """ Test the token query runs on the first request only. """
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_password_hash_not_cached(self):
+        """ Test snapshots leave out the password hash. """
+        self.client.get(ME_URL)
+        snapshot = caches['shared'].get(token_cache_key(self.token.key))
+        self.assertEqual(snapshot['user']['fields'][0], self.user.pk)
+        self.assertNotIn(self.user.password, repr(snapshot))
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        """ Test a zero timeout looks the token up every time. """
+        self.client.get(ME_URL)
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    def test_invalid_token(self):
+        """ Test unknown tokens are rejected. """
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token(self):
+        """ Test a deleted token stops working at once. """
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user(self):
+        """ Test a deactivated user is rejected at once. """
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change(self):
+        """ Test a password change drops the cached user. """
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'password': 'newpass123'})
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertTrue(res.wsgi_request.user.check_password('newpass123'))
+
+    def test_bench_auth(self):
+        """ Test the benchmark reports both runs. """
+        out = StringIO()
+        call_command('bench_auth', requests=10, write_every=5, stdout=out)
+        self.assertIn('cache_timeout=0 requests=10', out.getvalue())
+        self.assertIn('cache_timeout=300 requests=10', out.getvalue())
+
+    @override_settings(AUTH_DB_TOKEN_TTL=60)
+    def test_expired_token_rotated(self):
+        """ Test old database tokens are refused and replaced. """
+        Token.objects.filter(pk=self.token.pk).update(
+            created=timezone.now() - datetime.timedelta(minutes=5))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = APIClient().post(TOKEN_URL, {'email': 'auth@example.com',
+                                           'password': 'testpass123'})
+        self.assertNotEqual(res.data['token'], self.token.key)
+
+    def test_revoke_db_token(self):
+        """ Test logging out deletes the database token. """
+        res = self.client.post(REVOKE_URL)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.exists())
+
+
+@override_settings(AUTH_TOKEN_MODE='signed', AUTH_TOKEN_CACHE_TIMEOUT=300,
+                   PROFILING_SAMPLE_RATE=0)
+class SignedTokenTests(TestCase):
+    """ Test signed access and refresh tokens """
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='signed@example.com', password='testpass123')
+        self.client = APIClient()
+        res = self.client.post(TOKEN_URL, {'email': 'signed@example.com',
+                                           'password': 'testpass123'})
+        self.tokens = res.data
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_issue_and_use(self):
+        """ Test an access token only costs its revocation lookup. """
+        self.assertEqual(set(self.tokens), {'token', 'refresh', 'expires_in'})
+        self.assertFalse(Token.objects.exists())
+        self.authorize(self.tokens['token'])
+        self.client.get(ME_URL)
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_revocations_on_shared_cache(self):
+        """ Test a shared cache spares the revocation lookup. """
+        caches['shared'].clear()
+        self.authorize(self.tokens['token'])
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.post(REVOKE_URL)
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_is_not_an_access_token(self):
+        """ Test refresh tokens and tampered tokens are refused. """
+        for token in (self.tokens['refresh'], self.tokens['token'] + 'x'):
+            self.authorize(token)
+            res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired(self):
+        """ Test access tokens stop working after their lifetime. """
+        self.authorize(self.tokens['token'])
+        with patch('core.auth.time.time', return_value=2 ** 40):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates(self):
+        """ Test a refresh token gives a new pair once. """
+        data = {'refresh': self.tokens['refresh']}
+        res = self.client.post(REFRESH_URL, data)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.authorize(res.data['token'])
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+        res = self.client.post(REFRESH_URL, data)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke(self):
+        """ Test revoked access and refresh tokens are refused. """
+        self.authorize(self.tokens['token'])
+        res = self.client.post(REVOKE_URL, {'refresh': self.tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(REFRESH_URL,
+                               {'refresh': self.tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_elsewhere(self):
+        """ Test a revocation no cache was told about is honoured. """
+        self.authorize(self.tokens['token'])
+        self.client.get(ME_URL)
+        payload = signing.loads(self.tokens['token'], salt='core.auth.access')
+        RevokedToken.objects.bulk_create([RevokedToken(
+            jti=payload['j'], expires_at=timezone.now())])
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change(self):
+        """ Test changing the password retires issued tokens. """
+        self.user.set_password('newpass123')
+        self.user.save()
+        self.authorize(self.tokens['token'])
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_sweep_tokens(self):
+        """ Test the sweep deletes expired revocations only. """
+        now = timezone.now()
+        RevokedToken.objects.create(
+            jti='old', expires_at=now - datetime.timedelta(minutes=1))
+        RevokedToken.objects.create(
+            jti='new', expires_at=now + datetime.timedelta(minutes=1))
+        out = StringIO()
+        call_command('sweep_tokens', stdout=out)
+        self.assertIn('0 expired tokens and 1 revocations', out.getvalue())
+        self.assertEqual(
+            list(RevokedToken.objects.values_list('jti', flat=True)),
+            ['new'])
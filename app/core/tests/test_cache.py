@@ -0,0 +1,103 @@
+""" Tests for the tiered cache and response caching. """
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import TieredCache
+from core.models import Tag
+
+TAGS_URL = reverse('post:tags')
+STATS_URL = reverse('core:cache-stats')
+
+
+class TieredCacheTests(SimpleTestCase):
+    """ Test the per-worker tier in front of the shared cache. """
+
+    def setUp(self):
+        self.cache = TieredCache(None, {'OPTIONS': {
+            'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2}})
+        self.cache.clear()
+
+    def test_reads_served_locally(self):
+        """ Test a second read does not reach the shared cache. """
+        self.cache.set('a', {'x': 1})
+        with patch.object(caches['shared'], 'get') as shared_get:
+            self.assertEqual(self.cache.get('a'), {'x': 1})
+        shared_get.assert_not_called()
+        self.assertEqual(self.cache.stats()['local_hits'], 1)
+
+    def test_shared_hit_and_miss(self):
+        """ Test values set by another worker are found and counted. """
+        caches['shared'].set('b', 2)
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual((stats['shared_hits'], stats['misses']), (1, 1))
+
+    def test_lru_eviction(self):
+        """ Test the local tier keeps only the newest entries. """
+        for key in 'abc':
+            self.cache.set(key, key)
+        self.assertEqual(self.cache.stats()['local_entries'], 2)
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(self.cache.stats()['shared_hits'], 1)
+
+    def test_delete_and_incr_reach_both_tiers(self):
+        """ Test writes are not shadowed by the local tier. """
+        self.cache.set('n', 1)
+        self.assertEqual(self.cache.incr('n'), 2)
+        self.assertEqual(self.cache.get('n'), 2)
+        self.cache.delete('n')
+        self.assertIsNone(caches['shared'].get('n'))
+        self.assertIsNone(self.cache.get('n'))
+
+
+class ResponseCacheTests(TestCase):
+    """ Test anonymous response caching and invalidation. """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_anonymous_list_cached(self):
+        """ Test a repeated anonymous list needs no queries. """
+        Tag.objects.create(value='cached')
+        self.client.get(TAGS_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+        self.assertEqual(res.data['results'][0]['value'], 'cached')
+
+    def test_tag_save_invalidates(self):
+        """ Test a new tag shows up right away. """
+        self.client.get(TAGS_URL)
+        Tag.objects.create(value='fresh')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([t['value'] for t in res.data['results']],
+                         ['fresh'])
+
+    def test_authenticated_not_cached(self):
+        """ Test authenticated requests always hit the database. """
+        user = get_user_model().objects.create_user(
+            email='cached@example.com', password='testpass123')
+        self.client.force_authenticate(user)
+        self.client.get(TAGS_URL)
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_URL)
+
+    def test_stats_admin_only(self):
+        """ Test cache stats need an admin user. """
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com', password='testpass123')
+        self.client.force_authenticate(admin)
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('local_hits', res.data)
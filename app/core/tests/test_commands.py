@@ -1,5 +1,6 @@
 """ Test custom Django management commands. """
 
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
@@ -28,3 +29,10 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
         self.assertEqual(patched_check.call_count, 5)
         patched_check.assert_called_with(databases=['default'])
+
+    def test_wait_for_db_warm(self, patched_check):
+        """ Test warming reports the pool of every database. """
+        out = StringIO()
+        call_command('wait_for_db', warm=True, stdout=out)
+        self.assertIn('Opened 0 pooled connections to default',
+                      out.getvalue())
@@ -0,0 +1,146 @@
+""" Tests for conditional GET of posts, comments and tags. """
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+
+COMMENT_URL = reverse('comment:comment-list')
+TAGS_URL = reverse('post:tags')
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, DATABASE_REPLICAS=[],
+                   CACHE_SHARED=True)
+class ConditionalGetTests(TestCase):
+    """ Test unchanged resources are answered with 304 """
+
+    def setUp(self):
+        caches['shared'].clear()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='etag@example.com', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                author=self.user, title='Post', content='content',
+                published_at=timezone.now())
+        self.detail_url = reverse('post:post-detail', args=[self.post.id])
+        self.thread = {
+            'content_type': ContentType.objects.get_for_model(Post).id,
+            'object_id': self.post.id,
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_post_not_modified(self):
+        """ Test a matching ETag is answered with one EXISTS query. """
+        res = self.client.get(self.detail_url)
+        etag = res['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertIn('Last-Modified', res)
+        with patch('post.views.srzs.PostDetailSRZ') as srz, \
+                self.assertNumQueries(1):
+            res = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+        srz.assert_not_called()
+
+    def test_post_changed(self):
+        """ Test editing a post or its tags changes its ETag. """
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Edited'
+            self.post.save()
+        res = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Edited')
+
+        etag = res['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.tags.add(Tag.objects.create(value='new'))
+        res = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_per_user(self):
+        """ Test one user's ETag does not validate for another. """
+        etag = self.client.get(self.detail_url)['ETag']
+        res = APIClient().get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_comments_thread(self):
+        """ Test only a change of the polled thread changes its ETag. """
+        etag = self.client.get(COMMENT_URL, self.thread)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                creator=self.user, content='elsewhere',
+                content_type=ContentType.objects.get_for_model(Tag),
+                object_id=self.post.id)
+        res = self.client.get(COMMENT_URL, self.thread,
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(
+                creator=self.user, content='here',
+                content_type_id=self.thread['content_type'],
+                object_id=self.post.id)
+        res = self.client.get(COMMENT_URL, self.thread,
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_if_modified_since(self):
+        """ Test Last-Modified is honoured when no ETag is sent. """
+        modified = self.client.get(TAGS_URL)['Last-Modified']
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        with patch('core.conditional.time.time',
+                   return_value=timezone.now().timestamp() + 5), \
+                self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(value='later')
+        res = self.client.get(TAGS_URL, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_missing_post_not_answered(self):
+        """ Test no 304 is given for a post that does not exist. """
+        url = reverse('post:post-detail', args=[self.post.id + 1000])
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hidden_draft_not_answered(self):
+        """ Test no 304 tells an anonymous user a draft exists. """
+        with self.captureOnCommitCallbacks(execute=True):
+            draft = Post.objects.create(
+                author=self.user, title='Draft', content='content')
+        url = reverse('post:post-detail', args=[draft.id])
+        res = APIClient().get(url, HTTP_IF_MODIFIED_SINCE=(
+            'Fri, 01 Jan 2100 00:00:00 GMT'))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        res = self.client.get(url, HTTP_IF_MODIFIED_SINCE=(
+            'Fri, 01 Jan 2100 00:00:00 GMT'))
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'],
+                       REPLICA_PIN_SECONDS=10)
+    def test_recent_change_untagged(self):
+        """ Test no validators are given while replicas may lag. """
+        res = self.client.get(self.detail_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_process_local_cache_untagged(self):
+        """ Test no validators are given when stamps stay in one process. """
+        res = self.client.get(self.detail_url)
+        self.assertNotIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+        res = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=(
+            'Fri, 01 Jan 2100 00:00:00 GMT'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
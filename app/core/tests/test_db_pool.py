@@ -0,0 +1,156 @@
+""" Tests for the database connection pool and health checks. """
+
+import json
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import psycopg2
+from psycopg2 import extensions
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db.base import DatabaseWrapper
+from core.db.pool import ConnectionPool
+
+
+class FakeConnection:
+    """ Just enough of a psycopg2 connection for the pool. """
+
+    def __init__(self):
+        self.closed = 0
+        self.info = SimpleNamespace(
+            transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+        self.rolled_back = False
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """ Test the pool hands out and takes back connections """
+
+    def test_reuse(self):
+        """ Test a released connection is handed out again. """
+        pool = ConnectionPool(size=2, max_overflow=0)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['reused']), (1, 1))
+
+    def test_overflow_closed_on_release(self):
+        """ Test connections beyond the size are closed when returned. """
+        pool = ConnectionPool(size=1, max_overflow=1)
+        first = pool.acquire(FakeConnection)
+        second = pool.acquire(FakeConnection)
+        pool.release(first)
+        pool.release(second)
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_exhausted(self):
+        """ Test acquiring past size and overflow times out. """
+        pool = ConnectionPool(size=1, max_overflow=0, timeout=0.01)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_failed_connect_frees_slot(self):
+        """ Test a failing connect does not leak a slot. """
+        pool = ConnectionPool(size=1, max_overflow=0)
+
+        def connect():
+            raise psycopg2.OperationalError
+
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.acquire(connect)
+        self.assertEqual(pool.stats()['open'], 0)
+
+    def test_open_transaction_rolled_back(self):
+        """ Test a connection returned mid transaction is rolled back. """
+        pool = ConnectionPool(size=1, max_overflow=0)
+        conn = pool.acquire(FakeConnection)
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+        pool.release(conn)
+        self.assertTrue(conn.rolled_back)
+        self.assertIs(pool.acquire(FakeConnection), conn)
+
+    def test_broken_discarded(self):
+        """ Test closed and expired connections are replaced. """
+        pool = ConnectionPool(size=2, max_overflow=0, recycle=60)
+        broken = pool.acquire(FakeConnection)
+        pool.release(broken)
+        broken.closed = 1
+        old = pool.acquire(FakeConnection)
+        self.assertIsNot(old, broken)
+        with patch('core.db.pool.time.monotonic', return_value=10 ** 9):
+            pool.release(old)
+        self.assertTrue(old.closed)
+        self.assertEqual(pool.stats()['discarded'], 2)
+
+    def test_warm(self):
+        """ Test warming opens connections up to the size. """
+        pool = ConnectionPool(size=3, max_overflow=0)
+        pool.acquire(FakeConnection)
+        self.assertEqual(pool.warm(FakeConnection), 2)
+        self.assertEqual(pool.warm(FakeConnection), 0)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+
+class DatabaseWrapperTests(TestCase):
+    """ Test the database backend """
+
+    def wrapper(self, **settings):
+        conn = DatabaseWrapper(dict(connection.settings_dict, **settings),
+                               alias=connection.alias)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_health_check_reconnects(self):
+        """ Test a connection dropped by the server is replaced. """
+        conn = self.wrapper(CONN_MAX_AGE=60, CONN_HEALTH_CHECKS=True,
+                            POOL=None)
+        conn.ensure_connection()
+        raw = conn.connection
+        raw.close()
+        conn.close_if_unusable_or_obsolete()
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertIsNot(conn.connection, raw)
+
+    def test_pooled_connection_reused(self):
+        """ Test closing a pooled wrapper keeps the raw connection. """
+        conn = self.wrapper(CONN_MAX_AGE=0, POOL={'SIZE': 1})
+        conn.ensure_connection()
+        raw = conn.connection
+        conn.close()
+        self.assertFalse(raw.closed)
+        conn.ensure_connection()
+        self.assertIs(conn.connection, raw)
+        conn.close()
+        conn.pool.close()
+        self.assertTrue(raw.closed)
+        self.assertEqual(conn.pool.stats()['reused'], 1)
+
+
+class PoolStatsCommandTests(TestCase):
+    """ Test the pool report command """
+    databases = '__all__'
+
+    def test_db_pool_stats(self):
+        """ Test the report shows configuration and server sessions. """
+        out = StringIO()
+        call_command('db_pool_stats', json=True, stdout=out)
+        report = json.loads(out.getvalue())['default']
+        self.assertIn('conn_max_age', report)
+        self.assertGreater(report['server']['max_connections'], 0)
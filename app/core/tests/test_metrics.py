@@ -0,0 +1,131 @@
+""" Tests for the application metrics. """
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post
+from post.tests.test_uploads import sample_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FILE_UPLOAD_TEMP_DIR=MEDIA_ROOT,
+                   THUMBNAIL_ASYNC=False, METRICS_TOKEN='secret',
+                   PROFILING_SAMPLE_RATE=0, THROTTLE_ENABLED=False)
+class MetricsTests(TestCase):
+    """ Test requests, queries, uploads and comments are measured """
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='metrics@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            author=self.user, title='Post', content='content',
+            published_at='2023-02-01T11:11:11Z')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_request_and_query_metrics(self):
+        """ Test requests are timed per route and queries per alias. """
+        requests = dict(view='post:post-list', method='GET', status='2xx')
+        queries = dict(alias='default', operation='SELECT')
+        before = (
+            sample('iforum_request_duration_seconds_count', **requests),
+            sample('iforum_db_query_duration_seconds_count', **queries))
+        self.client.get(reverse('post:post-list'))
+        self.assertEqual(
+            sample('iforum_request_duration_seconds_count', **requests),
+            before[0] + 1)
+        self.assertGreater(
+            sample('iforum_db_query_duration_seconds_count', **queries),
+            before[1])
+
+    def test_gallery_upload_metrics(self):
+        """ Test upload sizes and times are recorded by outcome. """
+        before = (
+            sample('iforum_gallery_upload_bytes_count'),
+            sample('iforum_gallery_upload_seconds_count', outcome='created'),
+            sample('iforum_gallery_upload_seconds_count', outcome='rejected'),
+            sample('iforum_thumbnail_build_seconds_count'))
+        for image in (sample_image(400, 300),
+                      SimpleUploadedFile('notes.png', b'not an image')):
+            self.client.post(reverse('post:gallery'),
+                             {'post': self.post.id, 'image': image},
+                             format='multipart')
+        self.assertEqual(sample('iforum_gallery_upload_bytes_count'),
+                         before[0] + 1)
+        self.assertEqual(sample('iforum_gallery_upload_seconds_count',
+                                outcome='created'), before[1] + 1)
+        self.assertEqual(sample('iforum_gallery_upload_seconds_count',
+                                outcome='rejected'), before[2] + 1)
+        self.assertEqual(sample('iforum_thumbnail_build_seconds_count'),
+                         before[3] + 1)
+
+    def test_comment_metrics(self):
+        """ Test created comments are counted by commented model. """
+        before = sample('iforum_comments_created_total', model='post')
+        Comment.objects.create(
+            creator=self.user, content='comment', object_id=self.post.id,
+            content_type=ContentType.objects.get_for_model(Post))
+        self.assertEqual(sample('iforum_comments_created_total',
+                                model='post'), before + 1)
+
+    def record(self, path, count=1):
+        """ Count a comment in ``count`` processes writing to ``path``. """
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=path)
+        for _ in range(count):
+            subprocess.run(
+                [sys.executable, '-c',
+                 'from core import metrics; '
+                 'metrics.COMMENTS_CREATED.labels("post").inc()'],
+                cwd=settings.BASE_DIR, env=env, check=True)
+
+    def scrape(self, **environ):
+        with patch.dict(os.environ, **environ):
+            return self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_workers_aggregated(self):
+        """ Test /metrics sums the values of every worker process. """
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.record(path, 2)
+        res = self.scrape(PROMETHEUS_MULTIPROC_DIR=path)
+        self.assertTrue(res['Content-Type'].startswith(
+            'application/openmetrics-text'))
+        self.assertIn('iforum_comments_created_total{model="post"} 2.0',
+                      res.content.decode())
+
+    def test_task_worker_included(self):
+        """ Test the task worker's directory is summed in. """
+        app, worker = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, app)
+        self.addCleanup(shutil.rmtree, worker)
+        self.record(app)
+        self.record(worker)
+        res = self.scrape(PROMETHEUS_MULTIPROC_DIR=app,
+                          METRICS_EXTRA_DIRS=worker)
+        self.assertIn('iforum_comments_created_total{model="post"} 2.0',
+                      res.content.decode())
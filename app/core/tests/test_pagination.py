@@ -0,0 +1,99 @@
+""" Tests for keyset pagination of the list APIs. """
+
+import base64
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+from core.pagination import KeysetPagination
+
+POST_URL = reverse('post:post-list')
+COMM_URL = reverse('comment:comment-list')
+TAGS_URL = reverse('post:tags')
+
+
+def walk(client, url, params):
+    """ Follow ``next`` links and return every result id in order. """
+    ids = []
+    res = client.get(url, params)
+    while True:
+        ids += [item['id'] for item in res.data['results']]
+        if not res.data['next']:
+            return ids
+        res = client.get(res.data['next'])
+
+
+class KeysetPaginationTests(TestCase):
+    """ Test paging through posts, comments and tags. """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='pager@example.com', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        same = '2023-02-02T11:11:11Z'
+        self.posts = [
+            Post.objects.create(author=self.user, title=f'Post {n}',
+                                content='content', published_at=published)
+            for n, published in enumerate(
+                [same, same, same, '2023-03-03T11:11:11Z', None, None])]
+
+    def test_walk_posts_with_ties_and_drafts(self):
+        """ Test every post is served once with ties and NULLs. """
+        ids = walk(self.client, POST_URL, {'page_size': 2})
+        expected = list(Post.objects.order_by(
+            '-published_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_walk_posts_filtered_by_tags(self):
+        """ Test the tag filter still applies on every page. """
+        tag = Tag.objects.create(value='paged')
+        for post in self.posts[:4]:
+            post.tags.add(tag)
+        ids = walk(self.client, POST_URL,
+                   {'page_size': 1, 'tags': str(tag.id)})
+        self.assertEqual(sorted(ids), sorted(p.id for p in self.posts[:4]))
+
+    def test_walk_comments(self):
+        """ Test comments of one post are paged newest first. """
+        post = self.posts[0]
+        ctype = ContentType.objects.get_for_model(post)
+        comments = [Comment.objects.create(
+            creator=self.user, content=f'Comment {n}', content_type=ctype,
+            object_id=post.id) for n in range(5)]
+        ids = walk(self.client, COMM_URL, {
+            'content_type': ctype.id, 'object_id': post.id, 'page_size': 2})
+        self.assertEqual(ids, [c.id for c in reversed(comments)])
+
+    @patch.object(KeysetPagination, 'max_page_size', 3)
+    def test_page_size_capped(self):
+        """ Test the requested page size is capped. """
+        for n in range(4):
+            Tag.objects.create(value=f'tag {n}')
+        res = self.client.get(TAGS_URL, {'page_size': 1000})
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        """ Test a malformed cursor is rejected. """
+        res = self.client.get(POST_URL, {'cursor': 'garbage'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_of_wrong_types(self):
+        """ Test a cursor that decodes to values of the wrong type. """
+        for url, values in [(TAGS_URL, ['abc']),
+                            (POST_URL, ['2023-01-01T00:00:00Z', 'x']),
+                            (POST_URL, [5, 1]),
+                            (POST_URL, ['yesterday', 1])]:
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(values).encode()).decode()
+            res = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,126 @@
+""" Tests for the profiling middleware and metrics endpoint. """
+
+import asyncio
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings)
+from django.urls import include, path
+
+from core.middleware import ProfilingMiddleware
+from core.models import Post
+from post.views import PostViewSet
+
+USER = dict(email='profile@example.com', password='testpass123')
+
+
+def n_plus_one_view(request):
+    titles = [Post.objects.get(pk=pk).title for pk in
+              Post.objects.values_list('pk', flat=True)]
+    return HttpResponse(', '.join(titles))
+
+
+urlpatterns = [
+    path('api/', include('post.api_urls')),
+    path('loop/', n_plus_one_view, name='loop'),
+    path('async/posts/', PostViewSet.as_async_view({'get': 'list'})),
+]
+
+
+@override_settings(ROOT_URLCONF='core.tests.test_profiling',
+                   PROFILING_SAMPLE_RATE=1, PROFILING_NPLUSONE_THRESHOLD=3)
+class ProfilingMiddlewareTests(TestCase):
+    """ Test sampled requests are profiled """
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(**USER)
+        for n in range(4):
+            Post.objects.create(author=user, title=f'Post {n}',
+                                content='content',
+                                published_at='2023-02-01T11:11:11Z')
+
+    def profile(self, path):
+        with self.assertLogs('core.profiling') as logs:
+            res = self.client.get(path)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(logs.records), 1)
+        return json.loads(logs.records[0].getMessage())
+
+    def test_api_profile(self):
+        """ Test an API request records queries and serializer time. """
+        profile = self.profile('/api/posts/')
+        self.assertEqual(profile['view'], 'post:post-list')
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['queries'], 0)
+        self.assertGreater(profile['serializer_ms'], 0)
+        self.assertEqual(profile['n_plus_one'], [])
+
+    def test_n_plus_one_flagged(self):
+        """ Test a statement repeated with new parameters is flagged. """
+        profile = self.profile('/loop/')
+        self.assertEqual(profile['queries'], 5)
+        [repeated] = profile['n_plus_one']
+        self.assertEqual(repeated['count'], 4)
+        self.assertIn('WHERE', repeated['sql'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled(self):
+        """ Test requests outside the sample are not profiled. """
+        with self.assertNoLogs('core.profiling'):
+            self.client.get('/api/posts/')
+
+
+# Worker thread connections would otherwise outlive the test database
+@patch.dict(connection.settings_dict, CONN_MAX_AGE=0)
+@override_settings(ROOT_URLCONF='core.tests.test_profiling',
+                   PROFILING_SAMPLE_RATE=1)
+class AsyncProfilingTests(TransactionTestCase):
+    """ Test async views are profiled without leaving the event loop """
+
+    async def test_async_profile(self):
+        """ Test queries run on executor threads count to the profile. """
+        middleware = ProfilingMiddleware(PostViewSet.as_async_view(
+            {'get': 'list'}))
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        with self.assertLogs('core.profiling') as logs:
+            res = await AsyncClient().get('/async/posts/')
+        self.assertEqual(res.status_code, 200)
+        profile = json.loads(logs.records[0].getMessage())
+        self.assertGreater(profile['queries'], 0)
+        self.assertGreater(profile['db_ms'], 0)
+
+
+@override_settings(METRICS_TOKEN='secret', PROFILING_SAMPLE_RATE=0)
+class MetricsViewTests(TestCase):
+    """ Test the metrics endpoint """
+
+    def test_requires_token_or_staff(self):
+        """ Test anonymous scrapes are refused. """
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 403)
+        res = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(res.status_code, 403)
+
+    def test_metrics(self):
+        """ Test profiled views show up in the exposition. """
+        with self.settings(PROFILING_SAMPLE_RATE=1), \
+                self.assertLogs('core.profiling'):
+            self.client.get('/api/tags/')
+        res = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(res.status_code, 200)
+        body = res.content.decode()
+        self.assertIn('iforum_request_duration_seconds_bucket{', body)
+        self.assertIn('iforum_profiled_queries_total{view="post:tags"}', body)
+
+    def test_staff(self):
+        """ Test staff can read the metrics without a token. """
+        self.client.force_login(get_user_model().objects.create_superuser(
+            email='admin@example.com', password='testpass123'))
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
@@ -0,0 +1,170 @@
+""" Tests for read replica routing. """
+
+import asyncio
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, connections, router
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from core.db.router import (
+    PIN_COOKIE, ReplicaReadMixin, ReplicaRouter, primary_reads,
+    read_from_replica, replica_reads)
+from core.middleware import ReplicaPinMiddleware
+from core.models import Post
+
+REPLICAS = ['replica1', 'replica2']
+
+
+class ProbeView(ReplicaReadMixin, APIView):
+    """ Answer with the database reads would go to. """
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        return Response(router.db_for_read(Post))
+
+    post = get
+
+
+@read_from_replica
+def probe_view(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    """ Test where the router sends queries """
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_default_outside_views(self):
+        """ Test reads go to the primary unless a view opts in. """
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replica_reads(self):
+        """ Test reads inside replica_reads go to a replica. """
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_primary_only(self):
+        """ Test writes, auth and transactions stay on the primary. """
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Token), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            with patch.object(connection, 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_no_replicas(self):
+        """ Test everything goes to the primary without replicas. """
+        with self.settings(DATABASE_REPLICAS=[]), replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_migrate_primary_only(self):
+        """ Test replicas are never migrated. """
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=10)
+class ReplicaPinTests(SimpleTestCase):
+    """ Test clients are pinned to the primary after writing """
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.factory = RequestFactory()
+        self.view = ProbeView.as_view()
+
+    def write(self, status=201, **headers):
+        request = self.factory.post('/', **headers)
+        return ReplicaPinMiddleware(
+            lambda request: HttpResponse(status=status))(request)
+
+    def test_views_read_replica(self):
+        """ Test opted in views read a replica and write the primary. """
+        res = self.view(self.factory.get('/'))
+        self.assertIn(res.data, REPLICAS)
+        res = self.view(self.factory.post('/'))
+        self.assertEqual(res.data, 'default')
+        res = probe_view(self.factory.get('/'))
+        self.assertIn(res.content.decode(), REPLICAS)
+
+    def test_cookie_pin(self):
+        """ Test a browser that wrote reads the primary. """
+        res = self.write()
+        self.assertEqual(res.cookies[PIN_COOKIE]['max-age'], 10)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.view(request).data, 'default')
+        self.assertEqual(probe_view(request).content.decode(), 'default')
+
+    def test_token_pin(self):
+        """ Test an API client that wrote reads the primary. """
+        self.write(HTTP_AUTHORIZATION='Token writer')
+        res = self.view(self.factory.get(
+            '/', HTTP_AUTHORIZATION='Token writer'))
+        self.assertEqual(res.data, 'default')
+        res = self.view(self.factory.get(
+            '/', HTTP_AUTHORIZATION='Token reader'))
+        self.assertIn(res.data, REPLICAS)
+
+    async def test_async_pin(self):
+        """ Test the middleware runs as a coroutine in an async chain. """
+        async def view(request):
+            return HttpResponse(status=201)
+
+        middleware = ReplicaPinMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        res = await middleware(self.factory.post('/'))
+        self.assertEqual(res.cookies[PIN_COOKIE]['max-age'], 10)
+
+    def test_failed_write_not_pinned(self):
+        """ Test rejected writes and setups without replicas don't pin. """
+        self.assertNotIn(PIN_COOKIE, self.write(status=400).cookies)
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertNotIn(PIN_COOKIE, self.write().cookies)
+
+
+@skipUnless(settings.DATABASE_REPLICAS,
+            'set DB_REPLICA_HOSTS to run against a replica')
+class ReplicaDatabaseTests(TransactionTestCase):
+    """ Test API reads reach the replica database """
+    databases = '__all__'
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='replica@example.com', password='testpass123')
+        Post.objects.create(author=user, title='Post', content='content',
+                            published_at='2023-02-01T11:11:11Z')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+
+    def replica_queries(self, method, path, **data):
+        replica = connections[settings.DATABASE_REPLICAS[0]]
+        with self.settings(DATABASE_REPLICAS=[replica.alias]), \
+                CaptureQueriesContext(replica) as queries:
+            res = getattr(self.client, method)(path, data)
+        self.assertLess(res.status_code, 400)
+        return len(queries)
+
+    def test_reads_then_pinned(self):
+        """ Test reads use the replica until the client writes. """
+        self.assertGreater(self.replica_queries('get', '/api/posts/'), 0)
+        self.assertEqual(self.replica_queries(
+            'post', '/api/tags/', value='new'), 0)
+        self.assertEqual(self.replica_queries('get', '/api/posts/'), 0)
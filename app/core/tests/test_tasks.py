@@ -0,0 +1,146 @@
+""" Tests for the background task queue. """
+
+import datetime
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import tasks
+from core.models import Post, Task
+
+calls = []
+
+
+@tasks.task(name='tests.record')
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@tasks.task(name='tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('boom')
+
+
+class TaskQueueTests(TestCase):
+    """ Test enqueueing, running and retrying tasks """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_then_run(self):
+        """ Test a queued call runs once with its arguments. """
+        record.delay(1, 'two', three=3)
+        self.assertEqual(calls, [])
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(calls, [((1, 'two'), {'three': 3})])
+        task = Task.objects.get(name='tests.record')
+        self.assertEqual((task.status, task.attempts), (Task.DONE, 1))
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_idempotency_key(self):
+        """ Test a key already on record drops the new call. """
+        record.delay(1, key='once')
+        record.delay(2, key='once')
+        tasks.run_pending()
+        record.delay(3, key='once')
+        tasks.run_pending()
+        self.assertEqual(calls, [((1,), {})])
+
+    def test_countdown(self):
+        """ Test delayed tasks wait for their time. """
+        record.delay(countdown=60)
+        self.assertEqual(tasks.run_pending(), 0)
+
+    def test_retry_with_backoff(self):
+        """ Test failures are retried later, then given up on. """
+        fail.delay()
+        tasks.run_pending()
+        task = Task.objects.get(name='tests.fail')
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertGreater(task.run_at, timezone.now())
+        self.assertIn('ValueError: boom', task.last_error)
+        self.assertEqual(tasks.run_pending(), 0)
+        Task.objects.update(run_at=timezone.now())
+        tasks.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    @override_settings(TASK_RETRY_BACKOFF=2, TASK_RETRY_MAX_DELAY=10)
+    def test_backoff_grows(self):
+        """ Test the retry delay doubles up to the maximum. """
+        with patch('core.tasks.random.uniform', return_value=1):
+            self.assertEqual([tasks.backoff(n) for n in (1, 2, 3, 4)],
+                             [2, 4, 8, 10])
+
+    def test_failed_writes_rolled_back(self):
+        """ Test a failing task leaves no partial writes. """
+        user = get_user_model().objects.create_user(email='t@example.com')
+
+        @tasks.task(name='tests.half')
+        def half():
+            Post.objects.create(author=user, title='Half', content='c')
+            raise ValueError('boom')
+
+        half.delay()
+        tasks.run_pending()
+        self.assertFalse(Post.objects.filter(title='Half').exists())
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        """ Test eager mode runs calls inline. """
+        record.delay(1)
+        self.assertEqual(calls, [((1,), {})])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASK_TIMEOUT=60, TASK_RETENTION=60)
+    def test_requeue_stale_and_prune(self):
+        """ Test lost tasks are retried and old results deleted. """
+        old = timezone.now() - datetime.timedelta(minutes=5)
+        lost = Task.objects.create(name='tests.record', status=Task.RUNNING,
+                                   locked_at=old, attempts=1)
+        dead = Task.objects.create(name='tests.record', status=Task.RUNNING,
+                                   locked_at=old, attempts=5)
+        done = Task.objects.create(name='tests.record', status=Task.DONE,
+                                   finished_at=old)
+        self.assertEqual(tasks.requeue_stale(), 1)
+        lost.refresh_from_db()
+        dead.refresh_from_db()
+        self.assertEqual(lost.status, Task.QUEUED)
+        self.assertEqual(dead.status, Task.FAILED)
+        self.assertEqual(tasks.prune(), 1)
+        self.assertFalse(Task.objects.filter(pk=done.pk).exists())
+
+    def test_run_tasks_once(self):
+        """ Test the worker command drains the queue. """
+        record.delay()
+        out = StringIO()
+        call_command('run_tasks', once=True, stdout=out)
+        self.assertIn('Ran 1 tasks', out.getvalue())
+
+
+class TaskClaimTests(TransactionTestCase):
+    """ Test concurrent workers do not block each other """
+
+    def test_skip_locked(self):
+        """ Test a row locked by one worker is skipped by another. """
+        first = Task.objects.create(name='tests.record')
+        second = Task.objects.create(name='tests.record')
+        claimed = []
+
+        def other_worker():
+            claimed.extend(tasks.claim(10))
+            connection.close()
+
+        with transaction.atomic():
+            Task.objects.select_for_update().get(pk=first.pk)
+            worker = threading.Thread(target=other_worker)
+            worker.start()
+            worker.join(10)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([t.pk for t in claimed], [second.pk])
@@ -0,0 +1,138 @@
+""" Tests for the token bucket rate limits. """
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import throttling
+from core.models import Post
+
+COMMENT_URL = reverse('comment:comment-list')
+CREATE_USER_URL = reverse('user:create')
+POSTS_URL = reverse('post:post-list')
+
+RATES = {
+    'comment': {'user': ('2/min', 2), 'endpoint': ('60/min', 3)},
+    'signup': {'ip': ('1/hour', 1)},
+    'post': {'user': ('1/hour', 1)},
+}
+
+
+class BucketTests(SimpleTestCase):
+    """ Test the bucket arithmetic """
+
+    def test_parse_rate(self):
+        """ Test rates become an interval and a burst tolerance. """
+        self.assertEqual(throttling.parse_rate('10/min', 1), (6, 0))
+        self.assertEqual(throttling.parse_rate('2/s', 5), (.5, 2))
+
+    def test_burst_then_refill(self):
+        """ Test a burst is allowed at once, then one per interval. """
+        buckets = throttling.LocalBuckets()
+        with patch('core.throttling.time.time', return_value=100):
+            self.assertEqual([buckets.throttle('k', 10, 20)
+                              for _ in range(4)], [0, 0, 0, 10])
+        with patch('core.throttling.time.time', return_value=110):
+            self.assertEqual(buckets.throttle('k', 10, 20), 0)
+            self.assertEqual(buckets.throttle('k', 10, 20), 10)
+
+    def test_shared_failure_falls_back(self):
+        """ Test buckets stay local while the shared cache is down. """
+        throttling.local_buckets.clear()
+        with patch('core.throttling.caches') as caches, \
+                self.assertLogs('core.throttling', 'WARNING'):
+            caches['shared'].throttle.side_effect = ConnectionError
+            self.assertEqual(throttling.take('fallback', 10, 0), 0)
+        self.assertGreater(
+            throttling.local_buckets.throttle('fallback', 10, 0), 9)
+
+
+@override_settings(THROTTLE_RATES=RATES, PROFILING_SAMPLE_RATE=0)
+class ThrottleApiTests(TestCase):
+    """ Test limited endpoints refuse floods with Retry-After """
+
+    def setUp(self):
+        throttling.local_buckets.clear()
+        self.user = get_user_model().objects.create_user(
+            email='throttle@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            author=self.user, title='Post', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comment(self, client=None):
+        return (client or self.client).post(COMMENT_URL, {
+            'content': 'comment',
+            'content_type': ContentType.objects.get_for_model(Post).id,
+            'object_id': self.post.id,
+        })
+
+    def test_user_limit(self):
+        """ Test a user past the burst gets 429 and Retry-After. """
+        for _ in range(2):
+            self.assertEqual(self.comment().status_code,
+                             status.HTTP_201_CREATED)
+        res = self.comment()
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+
+    def test_endpoint_limit(self):
+        """ Test the endpoint limit applies across users. """
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user(
+            email='other@example.com'))
+        codes = [self.comment(client).status_code
+                 for client in (self.client, self.client, other, other)]
+        self.assertEqual(codes, [201, 201, 201, 429])
+
+    def test_reads_not_limited(self):
+        """ Test safe methods are never throttled. """
+        for _ in range(5):
+            res = self.client.get(COMMENT_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_ip_limit(self):
+        """ Test sign ups are limited per client address. """
+        payload = {'email': 'new@example.com', 'password': 'testpass123'}
+        res = APIClient().post(CREATE_USER_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = APIClient().post(CREATE_USER_URL, dict(
+            payload, email='new2@example.com'))
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = APIClient().post(CREATE_USER_URL, dict(
+            payload, email='new3@example.com'), REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_post_writes_limited(self):
+        """ Test creating and publishing posts share the post limit. """
+        payload = {'title': 'New', 'content': 'content'}
+        res = self.client.post(POSTS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.post(POSTS_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        res = self.client.post(reverse('post:post_publish_field',
+                                       args=[self.post.pk]))
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(POSTS_URL).status_code,
+                         status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        """ Test THROTTLE_ENABLED turns every limit off. """
+        for _ in range(4):
+            self.assertEqual(self.comment().status_code,
+                             status.HTTP_201_CREATED)
+
+    def test_bench_throttle(self):
+        """ Test the benchmark reports both runs. """
+        out = StringIO()
+        call_command('bench_throttle', requests=10, stdout=out)
+        self.assertIn('enabled=False', out.getvalue())
+        self.assertIn('enabled=True', out.getvalue())
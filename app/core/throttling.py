@@ -0,0 +1,139 @@
+""" Token bucket rate limits per user, per client address and per endpoint
+
+Each limit is a bucket of ``burst`` tokens refilled at a steady rate;
+a request takes one token or is refused with ``Retry-After`` set to the
+time until the next one. Buckets are kept as a single timestamp (GCRA),
+atomically on the shared cache when it supports ``throttle`` (Redis),
+otherwise, or while it is unreachable, in the memory of each worker.
+
+Views name a ``throttle_scope``; THROTTLE_RATES maps each scope to the
+``(rate, burst)`` of its ``user``, ``ip`` and ``endpoint`` limits, with
+rates written as for DRF, e.g. ``'10/min'``. Only unsafe methods are
+throttled.
+"""
+
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate, burst):
+    """
+    Return the ``(interval, tolerance)`` in seconds of ``rate`` tokens
+    per period with room for ``burst`` at once.
+    """
+    count, period = rate.split('/')
+    interval = PERIODS[period[0]] / int(count)
+    return interval, interval * (max(burst, 1) - 1)
+
+
+class LocalBuckets:
+    """ Buckets in process memory, least recently used dropped first. """
+
+    def __init__(self, max_entries=10000):
+        self._max_entries = max_entries
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def throttle(self, key, interval, tolerance):
+        now = time.time()
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            wait = tat - tolerance - now
+            if wait > 0:
+                return wait
+            self._tats[key] = tat + interval
+            self._tats.move_to_end(key)
+            while len(self._tats) > self._max_entries:
+                self._tats.popitem(last=False)
+        return 0.0
+
+    def clear(self):
+        with self._lock:
+            self._tats.clear()
+
+
+local_buckets = LocalBuckets()
+
+
+def take(key, interval, tolerance):
+    """ Take a token of bucket ``key``; return the seconds to wait. """
+    shared = caches['shared']
+    if hasattr(shared, 'throttle'):
+        try:
+            return shared.throttle(key, interval, tolerance)
+        except Exception:
+            logger.warning('Shared throttle unavailable, using local '
+                           'buckets', exc_info=True)
+    return local_buckets.throttle(key, interval, tolerance)
+
+
+class BucketThrottle(BaseThrottle):
+    """ One token bucket limit of the view's ``throttle_scope``. """
+    kind = None
+
+    def get_bucket(self, request):
+        """ The part of the bucket key after scope and kind. """
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        scope = getattr(view, 'throttle_scope', None)
+        limit = settings.THROTTLE_RATES.get(scope, {}).get(self.kind)
+        if (not settings.THROTTLE_ENABLED or limit is None
+                or request.method in SAFE_METHODS):
+            return True
+        interval, tolerance = parse_rate(*limit)
+        key = f'throttle:{scope}:{self.kind}:{self.get_bucket(request)}'
+        wait = take(key, interval, tolerance)
+        if wait:
+            self.retry_after = wait
+            metrics.THROTTLED_REQUESTS.labels(scope, self.kind).inc()
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserBucketThrottle(BucketThrottle):
+    """ Per authenticated user, per client address for anonymous ones. """
+    kind = 'user'
+
+    def get_bucket(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+
+class IPBucketThrottle(BucketThrottle):
+    """ Per client address, whoever is logged in. """
+    kind = 'ip'
+
+    def get_bucket(self, request):
+        return self.get_ident(request)
+
+
+class EndpointBucketThrottle(BucketThrottle):
+    """ Shared by every client, keeping workers free for other views. """
+    kind = 'endpoint'
+
+    def get_bucket(self, request):
+        return 'all'
+
+
+THROTTLES = [UserBucketThrottle, IPBucketThrottle, EndpointBucketThrottle]
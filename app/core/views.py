@@ -0,0 +1,37 @@
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from core.auth import TOKEN_AUTHENTICATION
+from core.metrics import exposition
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class CacheStatsView(APIView):
+    """ Cache hit and miss counts of the worker serving the request. """
+    authentication_classes = TOKEN_AUTHENTICATION
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        cache = caches['default']
+        stats = cache.stats() if hasattr(cache, 'stats') else {}
+        return Response(dict(stats, pid=os.getpid()))
+
+
+def metrics(request):
+    """
+    Prometheus metrics of all workers in OpenMetrics format, for staff
+    or scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = settings.METRICS_TOKEN
+    auth = request.META.get('HTTP_AUTHORIZATION', '')
+    if not request.user.is_staff and not (
+            token and constant_time_compare(auth, f'Bearer {token}')):
+        return HttpResponseForbidden()
+    body, content_type = exposition()
+    return HttpResponse(body, content_type=content_type)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from post import views
@@ -8,9 +9,22 @@ router.register('posts', views.PostViewSet)
 app_name = 'post'
 
 urlpatterns = [
+    path('posts/trending/', views.TrendingPostsView.as_view(),
+         name='post-trending'),
     path('', include(router.urls)),
     path('posts/<int:pk>/publish/',
          views.PostPublishView.as_view(), name='post_publish_field'),
     path('tags/', views.TagView.as_view(), name='tags'),
     path('gallery/', views.GalleryView.as_view(), name='gallery'),
     ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('posts/', views.PostViewSet.as_async_view(
+            {'get': 'list', 'post': 'create'}), name='post-list'),
+        path('posts/<int:pk>/', views.PostViewSet.as_async_view({
+            'get': 'retrieve', 'put': 'update',
+            'patch': 'partial_update', 'delete': 'destroy'}),
+            name='post-detail'),
+        path('tags/', views.TagView.as_async_view(), name='tags'),
+    ] + urlpatterns
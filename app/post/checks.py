@@ -0,0 +1,19 @@
+""" System checks of the post settings, run before migrating on deploy """
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def trending_settings(app_configs, **kwargs):
+    """ Scores take the log of the publish weight over the half life. """
+    errors = []
+    if settings.TRENDING_PUBLISH_WEIGHT <= 0:
+        errors.append(Error(
+            'TRENDING_PUBLISH_WEIGHT must be greater than 0.',
+            hint='Published posts are ranked from their publish weight.',
+            id='post.E001'))
+    if settings.TRENDING_HALF_LIFE <= 0:
+        errors.append(Error(
+            'TRENDING_HALF_LIFE must be greater than 0.', id='post.E002'))
+    return errors
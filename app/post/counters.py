@@ -0,0 +1,198 @@
+""" Buffered, write-behind view counters for posts """
+
+import atexit
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import BigIntegerField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import Post, PostViewShard
+from post import trending
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Count post views in process memory and flush them in batches.
+
+    Every increment only touches a dict under a lock. Pending counts are
+    handed to a background task once the buffer is older than
+    ``flush_interval`` seconds or holds ``flush_threshold`` views; it
+    adds them to a random shard row of each post, so workers flushing a
+    hot post at once rarely wait on the same row. The shards are rolled
+    up into ``Post.views`` once per VIEW_ROLLUP_INTERVAL.
+    """
+
+    def __init__(self, flush_interval=None, flush_threshold=None):
+        self.flush_interval = (
+            settings.VIEW_COUNTER_FLUSH_INTERVAL
+            if flush_interval is None else flush_interval)
+        self.flush_threshold = (
+            settings.VIEW_COUNTER_FLUSH_THRESHOLD
+            if flush_threshold is None else flush_threshold)
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)
+        self._total = 0
+        self._last_flush = time.monotonic()
+
+    def incr(self, pk, n=1):
+        """
+        Buffer ``n`` views of post ``pk``, flushing when due.
+
+        Returns the views of ``pk`` buffered since the last flush, which
+        added to a row read before the call gives its current count.
+        """
+        with self._lock:
+            self._pending[pk] += n
+            buffered = self._pending[pk]
+            self._total += n
+            due = (self._total >= self.flush_threshold or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush_later()
+        return buffered
+
+    def pending(self, pk):
+        """ Return the views of ``pk`` not yet written to the database. """
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            self._total = 0
+            self._last_flush = time.monotonic()
+        return pending
+
+    def _restore(self, pending):
+        with self._lock:
+            for pk, n in pending.items():
+                self._pending[pk] += n
+                self._total += n
+
+    def flush(self):
+        """ Write all buffered views now; return how many. """
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            write_views(pending)
+        except DatabaseError:
+            logger.exception('Failed to flush %d post views', len(pending))
+            self._restore(pending)
+            return 0
+        logger.debug('Flushed views for %d posts', len(pending))
+        return sum(pending.values())
+
+    def flush_later(self):
+        """
+        Hand all buffered views to a background task; return how many.
+        The request that fills the buffer then pays for one INSERT rather
+        than an UPDATE per batch on possibly hot rows.
+        """
+        from post.tasks import add_views
+
+        pending = self._take()
+        if not pending:
+            return 0
+        try:
+            add_views.delay({str(pk): n for pk, n in pending.items()})
+        except DatabaseError:
+            logger.exception('Failed to queue %d post views', len(pending))
+            self._restore(pending)
+            return 0
+        return sum(pending.values())
+
+
+_UPSERT_SHARDS = (
+    'INSERT INTO {shards} (post_id, shard, count) '
+    'SELECT v.post_id, v.shard, v.count FROM (VALUES {values}) '
+    'AS v (post_id, shard, count) WHERE EXISTS ('
+    'SELECT 1 FROM {posts} p WHERE p.id = v.post_id) '
+    'ON CONFLICT (post_id, shard) DO UPDATE '
+    'SET count = {shards}.count + EXCLUDED.count')
+
+
+def write_views(pending):
+    """ Add ``{post id: views}`` to the shards and schedule a rollup. """
+    if pending:
+        add_to_shards(pending)
+        schedule_rollup()
+
+
+def add_to_shards(pending):
+    """
+    Add ``{post id: views}`` to a random shard of each post in one
+    upsert, skipping deleted posts.
+    """
+    rows = [(pk, random.randrange(settings.VIEW_COUNTER_SHARDS), n)
+            for pk, n in pending.items()]
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SHARDS.format(
+            shards=PostViewShard._meta.db_table,
+            posts=Post._meta.db_table,
+            values=', '.join(['(%s, %s, %s)'] * len(rows)),
+        ), [value for row in rows for value in row])
+
+
+_scheduled = None
+
+
+def schedule_rollup():
+    """
+    Queue one rollup at the end of the current VIEW_ROLLUP_INTERVAL,
+    once per process and interval.
+    """
+    from post.tasks import roll_up_views
+
+    global _scheduled
+    interval = settings.VIEW_ROLLUP_INTERVAL
+    now = time.time()
+    window = int(now // interval)
+    if window != _scheduled:
+        roll_up_views.delay(key=f'roll_up_views:{window}',
+                            countdown=interval - now % interval)
+        _scheduled = window
+
+
+def rollup_views():
+    """
+    Move the views of every shard into ``Post.views`` and the trending
+    scores in one transaction; return how many. Readers see the views
+    either in the shards or on the post, never both or neither.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PostViewShard._meta.db_table} '
+                           f'RETURNING post_id, count')
+            rows = cursor.fetchall()
+        totals = defaultdict(int)
+        for pk, n in rows:
+            totals[pk] += n
+        batches = defaultdict(list)
+        for pk, n in totals.items():
+            batches[n].append(pk)
+        for n, pks in batches.items():
+            Post.objects.filter(pk__in=pks).update(views=F('views') + n)
+            trending.add_score(pks, n * settings.TRENDING_VIEW_WEIGHT)
+    return sum(totals.values())
+
+
+def with_pending_views(queryset):
+    """ Annotate posts with ``pending_views``, their views in shards. """
+    shards = PostViewShard.objects.filter(post=OuterRef('pk')).order_by(
+        ).values('post').annotate(total=Sum('count')).values('total')
+    return queryset.annotate(pending_views=Coalesce(
+        Subquery(shards, output_field=BigIntegerField()), 0))
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
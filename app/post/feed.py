@@ -0,0 +1,105 @@
+""" Precomputed homepage feed with cached post cards """
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.db.router import primary_reads
+from core.models import Post
+from core.pagination import from_cursor, to_cursor
+
+WINDOW_KEY = 'feed:window'
+CARD_KEY = 'feed:card:{pk}'
+
+
+def _published():
+    return Post.objects.filter(published_at__isnull=False).order_by(
+        '-published_at', '-id')
+
+
+def get_window():
+    """
+    Return the newest published posts as ``(published_at, id)`` pairs.
+
+    The window is rebuilt with one index-ordered, LIMITed query whenever
+    a post changes and otherwise served from the cache.
+    """
+    window = cache.get(WINDOW_KEY)
+    if window is None:
+        with primary_reads():
+            window = list(_published().values_list('published_at', 'id')[
+                :settings.FEED_WINDOW_SIZE])
+        cache.set(WINDOW_KEY, window, settings.FEED_CACHE_TIMEOUT)
+    return window
+
+
+def get_page(cursor=None, size=None):
+    """
+    Return ``(ids, next_cursor)`` for the page after ``cursor``.
+
+    Pages inside the cached window are sliced from it; older pages fall
+    back to a keyset query on ``published_at``.
+    """
+    size = size or settings.FEED_PAGE_SIZE
+    window = get_window()
+    position = from_cursor(cursor) if cursor else None
+    if position is None:
+        start = 0
+    else:
+        start = next((i for i, entry in enumerate(window)
+                      if entry < position), len(window))
+    rows = window[start:start + size + 1]
+    if len(rows) <= size and len(window) == settings.FEED_WINDOW_SIZE:
+        after = rows[-1] if rows else position
+        qs = _published()
+        if after is not None:
+            published_at, pk = after
+            qs = qs.filter(Q(published_at__lt=published_at) |
+                           Q(published_at=published_at, id__lt=pk))
+        rows += list(qs.values_list('published_at', 'id')[
+            :size + 1 - len(rows)])
+    next_cursor = to_cursor(*rows[size - 1]) if len(rows) > size else None
+    return [pk for _, pk in rows[:size]], next_cursor
+
+
+def render_cards(request, ids):
+    """
+    Return rendered cards for ``ids`` in order.
+
+    Cards are cached per post as ``(author_id, html)``. The byline marks
+    the viewer's own posts, so those are rendered fresh and not cached;
+    everything else only hits the database on a cache miss.
+    """
+    user_id = request.user.pk
+    cached = cache.get_many([CARD_KEY.format(pk=pk) for pk in ids])
+    cards = {}
+    for pk in ids:
+        entry = cached.get(CARD_KEY.format(pk=pk))
+        if entry is not None and (user_id is None or entry[0] != user_id):
+            cards[pk] = entry[1]
+    missing = [pk for pk in ids if pk not in cards]
+    if missing:
+        posts = Post.objects.filter(pk__in=missing).select_related(
+            'author').prefetch_related('images', 'tags').defer(
+            'created_at', 'content')
+        fresh = {}
+        with primary_reads():
+            posts = list(posts)
+        for post in posts:
+            cards[post.pk] = render_to_string(
+                'post/post-card.html', {'post': post}, request=request)
+            if post.author_id != user_id:
+                fresh[CARD_KEY.format(pk=post.pk)] = (
+                    post.author_id, cards[post.pk])
+        cache.set_many(fresh, settings.FEED_CACHE_TIMEOUT)
+    return [mark_safe(cards[pk]) for pk in ids if pk in cards]
+
+
+def invalidate_posts(pks, window=False):
+    """ Drop the cached cards of ``pks`` and optionally the window. """
+    keys = [CARD_KEY.format(pk=pk) for pk in pks]
+    if window:
+        keys.append(WINDOW_KEY)
+    cache.delete_many(keys)
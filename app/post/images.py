@@ -0,0 +1,115 @@
+""" Thumbnail and WebP derivatives of gallery images """
+
+import io
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+from core import metrics
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+
+
+def derivative_name(name, width, webp=False):
+    """ Return the storage name of one derivative of image ``name``. """
+    root, ext = os.path.splitext(name)
+    if webp:
+        ext = '.webp'
+    elif ext.lower() not in FORMATS:
+        ext = '.png'
+    return f'{root}.w{width}{ext}'
+
+
+def derivative_names(gallery):
+    """ Return every derivative name ``gallery`` has, WebP included. """
+    names = []
+    for width in gallery.thumbnails:
+        names.append(derivative_name(gallery.image.name, width))
+        names.append(derivative_name(gallery.image.name, width, webp=True))
+    return list(dict.fromkeys(names))
+
+
+def derivative_urls(gallery, webp=False):
+    """ Return ``(width, url)`` pairs for the derivatives of ``gallery``. """
+    if webp and not features.check('webp'):
+        return []
+    storage = gallery.image.storage
+    return [(width, storage.url(derivative_name(gallery.image.name, width,
+                                                webp)))
+            for width in gallery.thumbnails]
+
+
+def srcset(gallery, webp=False, build_url=str):
+    """ Return an ``srcset`` value listing the derivatives of ``gallery``. """
+    return ', '.join(f'{build_url(url)} {width}w'
+                     for width, url in derivative_urls(gallery, webp))
+
+
+def _encode(image, fmt):
+    if fmt == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=settings.THUMBNAIL_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def _store(storage, name, content):
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, content)
+
+
+def build_thumbnails(gallery):
+    """
+    Write downscaled copies of the image next to the original.
+
+    One copy per ``THUMBNAIL_WIDTHS`` entry narrower than the original,
+    in the original format and as WebP when Pillow supports it. The
+    widths produced are recorded on the gallery.
+    """
+    start = time.perf_counter()
+    storage = gallery.image.storage
+    name = gallery.image.name
+    with storage.open(name, 'rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    fmt = FORMATS.get(os.path.splitext(name)[1].lower(), 'PNG')
+    webp = features.check('webp')
+    widths = []
+    for width in sorted(settings.THUMBNAIL_WIDTHS):
+        if width >= original.width:
+            break
+        thumb = original.copy()
+        thumb.thumbnail((width, original.height), Image.LANCZOS)
+        _store(storage, derivative_name(name, width), _encode(thumb, fmt))
+        if webp and fmt != 'WEBP':
+            _store(storage, derivative_name(name, width, webp=True),
+                   _encode(thumb, 'WEBP'))
+        widths.append(width)
+    gallery.thumbnails = widths
+    gallery.save(update_fields=['thumbnails'])
+    metrics.THUMBNAIL_BUILD_SECONDS.observe(time.perf_counter() - start)
+    return widths
+
+
+def delete_thumbnails(gallery):
+    """ Remove the derivatives of ``gallery`` from storage. """
+    storage = gallery.image.storage
+    for name in derivative_names(gallery):
+        storage.delete(name)
+
+
+def schedule_thumbnails(gallery):
+    """ Queue building the thumbnails of a new image, or build them now. """
+    if settings.THUMBNAIL_ASYNC:
+        from post.tasks import build_gallery_thumbnails
+        build_gallery_thumbnails.delay(
+            gallery.pk, key=f'thumbnails:{gallery.pk}:{gallery.image.name}')
+    else:
+        build_thumbnails(gallery)
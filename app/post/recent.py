@@ -0,0 +1,51 @@
+""" Cached index of the latest published posts shown on post pages """
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.db.router import primary_reads
+from core.models import Post
+
+INDEX_KEY = 'recent:index'
+SIZE = 5
+
+
+def refresh():
+    """
+    Rebuild the index with one index-ordered, LIMITed query and return
+    it as rendered list items ``(id, html)``, newest first.
+
+    One spare post is kept so that any post can leave itself out.
+    """
+    posts = Post.objects.filter(published_at__isnull=False).order_by(
+        '-published_at', '-id').only('id', 'title')[:SIZE + 1]
+    with primary_reads():
+        posts = list(posts)
+    index = [(post.pk, render_to_string('post/post-list-item.html',
+                                        {'post': post}))
+             for post in posts]
+    cache.set(INDEX_KEY, index, settings.FEED_CACHE_TIMEOUT)
+    return index
+
+
+def get_items(exclude=None):
+    """ Return the rendered items of the latest posts but ``exclude``. """
+    index = cache.get(INDEX_KEY)
+    if index is None:
+        index = refresh()
+    return [mark_safe(html) for pk, html in index if pk != exclude][:SIZE]
+
+
+def post_changed(post):
+    """
+    Refresh the index once the change of ``post`` commits if it is
+    published, e.g. through the publish endpoint, or listed.
+    """
+    index = cache.get(INDEX_KEY)
+    if index is None:
+        return
+    if post.published_at is not None or post.pk in dict(index):
+        transaction.on_commit(refresh)
@@ -0,0 +1,72 @@
+""" Signal handlers keeping post caches in sync with the database """
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete, )
+from django.dispatch import receiver
+
+from core.models import Comment, Gallery, Post, Tag
+from post import feed, images, recent, trending
+
+
+@receiver([post_save, post_delete], sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """ Drop the post card and rebuild the feed window and recent posts. """
+    feed.invalidate_posts([instance.pk], window=True)
+    recent.post_changed(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """ Rank a published post and unrank an unpublished one. """
+    trending.post_saved(instance, created)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """ Raise the trending score of a commented post. """
+    if created and instance.content_type_id == (
+            ContentType.objects.get_for_model(Post).id):
+        trending.add_score([instance.object_id],
+                           settings.TRENDING_COMMENT_WEIGHT)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, pk_set, reverse, **kwargs):
+    """ Drop the cards of posts whose tags changed. """
+    if not reverse:
+        if action.startswith('post_'):
+            feed.invalidate_posts([instance.pk])
+    elif action == 'pre_clear':
+        feed.invalidate_posts(instance.posts.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        feed.invalidate_posts(pk_set)
+
+
+@receiver([post_save, post_delete], sender=Gallery)
+def gallery_changed(sender, instance, **kwargs):
+    """ Drop the card of the post an image belongs to. """
+    feed.invalidate_posts([instance.post_id])
+
+
+@receiver(post_save, sender=Gallery)
+def gallery_saved(sender, instance, created, update_fields, **kwargs):
+    """ Build the derivatives of a new or replaced image. """
+    if created or update_fields is None or 'image' in update_fields:
+        images.schedule_thumbnails(instance)
+
+
+@receiver(post_delete, sender=Gallery)
+def gallery_deleted(sender, instance, **kwargs):
+    """ Remove the derivatives along with the image. """
+    images.delete_thumbnails(instance)
+
+
+@receiver([post_save, pre_delete], sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """ Drop the cards of every post showing the tag. """
+    feed.invalidate_posts(instance.posts.values_list('pk', flat=True))
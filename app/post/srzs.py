@@ -3,17 +3,26 @@
 from rest_framework import serializers as srzs
 from core.models import Post, Tag, Gallery
 from rest_framework.exceptions import PermissionDenied
+from post import images
+from post.uploads import StreamedImageField
 
 
 class GallerySRZ(srzs.ModelSerializer):
     """ Serializer for the Gallery"""
     post = srzs.PrimaryKeyRelatedField(queryset=Post.objects.all())
+    image = StreamedImageField()
+    srcset = srzs.SerializerMethodField()
 
     class Meta:
         model = Gallery
-        fields = ['id', 'post', 'image']
-        read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
+        fields = ['id', 'post', 'image', 'thumbnails', 'srcset']
+        read_only_fields = ['id', 'thumbnails']
+
+    def get_srcset(self, obj):
+        """ Return the derivatives as an ``srcset`` value. """
+        request = self.context.get('request')
+        build_url = request.build_absolute_uri if request else str
+        return images.srcset(obj, build_url=build_url)
 
     def create(self, validated_data):
         post = validated_data['post']
@@ -22,7 +31,6 @@ class GallerySRZ(srzs.ModelSerializer):
             if post:
                 gall = Gallery.objects.create(
                     post=post, image=validated_data['image'])
-                gall.save()
                 return gall
         else:
             raise PermissionDenied(
@@ -37,36 +45,65 @@ class TagSRZ(srzs.ModelSerializer):
         fields = ['id', 'value']
         read_only_fields = ['id']
 
+    def create(self, validated_data):
+        """ Return the tag with this value, creating it if needed. """
+        tag, created = Tag.objects.get_or_create(**validated_data)
+        return tag
+
 
 class PostSRZ(srzs.ModelSerializer):
     """ Serializer for posts """
     tags = TagSRZ(many=True, required=False)
+    views = srzs.SerializerMethodField()
 
     class Meta:
         model = Post
         fields = ['id', 'author', 'title', 'views',
                   'published_at', 'slug', 'tags']
-        read_only_fields = ['id', 'author', 'views', 'slug']
-
-    def _get_or_create_tags(self, tags, post):
-        """ Handle getting or creating tags as needed. """
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(**tag)
-            post.tags.add(tag_obj)
+        read_only_fields = ['id', 'author', 'slug']
+
+    def get_views(self, obj) -> int:
+        """ Rolled up views plus those still in shards, when loaded. """
+        return obj.views + getattr(obj, 'pending_views', 0)
+
+    def _get_or_create_tags(self, values):
+        """ Resolve tag values to tags, creating missing ones in bulk. """
+        tags = {tag.value: tag for tag in Tag.objects.filter(value__in=values)}
+        missing = [value for value in values if value not in tags]
+        if missing:
+            Tag.objects.bulk_create(
+                [Tag(value=value) for value in missing],
+                ignore_conflicts=True)
+            tags.update((tag.value, tag) for tag in
+                        Tag.objects.filter(value__in=missing))
+        return [tags[value] for value in values]
+
+    def _set_tags(self, post, tags, created=False):
+        """ Replace the post tags, touching only the changed ones. """
+        values = list(dict.fromkeys(tag['value'] for tag in tags))
+        current = {} if created else {
+            tag.value: tag for tag in post.tags.all()}
+        removed = [tag for value, tag in current.items()
+                   if value not in values]
+        if removed:
+            post.tags.remove(*removed)
+        added = [value for value in values if value not in current]
+        if added:
+            post.tags.add(*self._get_or_create_tags(added))
 
     def create(self, validated_data):
         """ Create a post """
         tags = validated_data.pop('tags', [])
         post = Post.objects.create(**validated_data)
-        self._get_or_create_tags(tags, post)
+        if tags:
+            self._set_tags(post, tags, created=True)
         return post
 
     def update(self, instance, validated_data):
         """ Update recipe. """
         tags = validated_data.pop('tags', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_tags(instance, tags)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         instance.save()
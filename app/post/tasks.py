@@ -0,0 +1,26 @@
+""" Background tasks of the post app """
+
+from core.models import Gallery
+from core.tasks import task
+from post.counters import rollup_views, write_views
+from post.images import build_thumbnails
+
+
+@task()
+def build_gallery_thumbnails(pk):
+    """ Build the derivatives of a gallery image, if it still exists. """
+    gallery = Gallery.objects.filter(pk=pk).first()
+    if gallery is not None:
+        build_thumbnails(gallery)
+
+
+@task()
+def add_views(views):
+    """ Add buffered ``{post id: views}`` to the posts. """
+    write_views({int(pk): n for pk, n in views.items()})
+
+
+@task()
+def roll_up_views():
+    """ Sum the view shards into the posts. """
+    rollup_views()
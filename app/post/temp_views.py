@@ -1,18 +1,41 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
 from django.contrib.contenttypes.models import ContentType
 from comment.forms import CommentForm
+from comment.pages import load_comment_page
+from core.conditional import enabled, last_changed, settled
+from core.db.router import read_from_replica
 from core.models import Post, Tag, Gallery
+from post.counters import view_counter
+from post import feed
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _fragment_cache(post):
+    """
+    Return the version and timeout of the cached detail fragment of
+    ``post``, not cached while replicas may still show an older post or
+    without change stamps to retire it. Tags are renamed without
+    touching the posts showing them, so their stamp counts too.
+    """
+    if not enabled():
+        return None, 0
+    version = max(last_changed(('post', post.pk), ('tags',)))
+    if not settled(version):
+        return version, 0
+    return version, settings.POST_FRAGMENT_CACHE_TIMEOUT
+
+
+@read_from_replica
 def post_detail(request, pk):
-    post = Post.objects.select_related(
-        "author").prefetch_related(
-        'images', 'tags').get(pk=pk)
+    # Images and tags are only loaded when the fragment is rendered
+    post = Post.objects.select_related("author").get(pk=pk)
     logger.debug('God %d post', post.id)
+    if request.method == "GET":
+        view_counter.incr(post.pk)
     if request.user.is_active:
         if request.method == "POST":
             comment_form = CommentForm(request.POST)
@@ -28,16 +51,20 @@ def post_detail(request, pk):
             comment_form = CommentForm()
     else:
         comment_form = None
+    comments, comment_count, comments_cursor = load_comment_page(
+        post, request.GET.get('comments_before'))
+    version, timeout = _fragment_cache(post)
     return render(request, "post/post-detail.html",
-                  {"post": post, "comment_form": comment_form})
+                  {"post": post, "comment_form": comment_form,
+                   "comments": comments, "comment_count": comment_count,
+                   "comments_cursor": comments_cursor,
+                   "post_version": version, "post_cache_timeout": timeout,
+                   "own_post": post.author_id == request.user.pk})
 
 
+@read_from_replica
 def index(request):
-    # filter(published_at__lte=timezone.now()
-    posts = Post.objects.filter(published_at__isnull = False).order_by(
-        '-published_at').prefetch_related(
-        'images').prefetch_related(
-        'tags').select_related(
-        "author").defer(
-        "created_at")
-    return render(request, "post/index.html", {'posts': posts})
+    ids, next_cursor = feed.get_page(request.GET.get('before'))
+    cards = feed.render_cards(request, ids)
+    return render(request, "post/index.html",
+                  {'cards': cards, 'next_cursor': next_cursor})
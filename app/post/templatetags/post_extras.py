@@ -1,7 +1,7 @@
 from django import template
 from django.contrib.auth import get_user_model
 from django.utils.html import format_html as fhtml
-from core.models import Post
+from post import images, recent
 from django.contrib.contenttypes.models import ContentType
 
 register = template.Library()
@@ -10,11 +10,21 @@ user_model = get_user_model()
 
 @register.inclusion_tag("post/post-list.html")
 def recent_posts(post):
-    posts = Post.objects.exclude(
-        pk=post.pk)[:5].select_related(
-        "author")
-    # content_id = ContentType.objects.get_for_model(posts.first()).id
-    return {"title": "Recent Posts", "posts": posts}
+    return {"title": "Recent Posts", "items": recent.get_items(post.pk)}
+
+
+@register.simple_tag
+def responsive_img(gallery, height, sizes):
+    """ Render a gallery image letting the browser pick a derivative. """
+    img = fhtml('<img class="img-thumbnail" src="{}" srcset="{}" sizes="{}" '
+                'alt="Gallery image" loading="lazy" '
+                'style="height:{}px; width:auto;">',
+                gallery.image.url, images.srcset(gallery), sizes, height)
+    webp = images.srcset(gallery, webp=True)
+    if not webp:
+        return img
+    return fhtml('<picture><source type="image/webp" srcset="{}" sizes="{}">'
+                 '{}</picture>', webp, sizes, img)
 
 
 @register.filter
@@ -0,0 +1,86 @@
+""" Tests for the cached homepage feed. """
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Post, Tag
+from post import feed
+
+INDEX_URL = reverse('tpost:home page')
+
+
+def create_post(user, n, **params):
+    """ Create and return a sample Post published on day ``n``. """
+    defaults = {
+        'title': f'Sample post {n}',
+        'content': 'Content of the sample post',
+        'published_at': f'2023-02-{n:02d}T11:11:11Z',
+    }
+    defaults.update(params)
+    return Post.objects.create(author=user, **defaults)
+
+
+@override_settings(FEED_PAGE_SIZE=2, FEED_WINDOW_SIZE=3)
+class FeedTests(TestCase):
+    """ Test feed paging, caching and invalidation. """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='feed@example.com', password='testpass123')
+        self.posts = [create_post(self.user, n) for n in range(1, 6)]
+        create_post(self.user, 6, published_at=None)
+
+    def test_pages_walk_whole_feed(self):
+        """ Test cursors walk the window and fall back to the DB. """
+        seen = []
+        cursor = None
+        while True:
+            ids, cursor = feed.get_page(cursor)
+            seen += ids
+            if cursor is None:
+                break
+        self.assertEqual(seen, [p.pk for p in reversed(self.posts)])
+
+    def test_index_served_from_cache(self):
+        """ Test a warm index renders without touching the database. """
+        self.client.get(INDEX_URL)
+        with self.assertNumQueries(0):
+            res = self.client.get(INDEX_URL)
+        self.assertContains(res, 'Sample post 5')
+        self.assertContains(res, 'Sample post 4')
+        self.assertNotContains(res, 'Sample post 3')
+        self.assertContains(res, '?before=')
+
+    def test_post_save_invalidates_card(self):
+        """ Test editing a post refreshes its cached card. """
+        self.client.get(INDEX_URL)
+        post = self.posts[-1]
+        post.title = 'Updated title'
+        post.save()
+        res = self.client.get(INDEX_URL)
+        self.assertContains(res, 'Updated title')
+
+    def test_tag_change_invalidates_card(self):
+        """ Test tagging a post refreshes its cached card. """
+        self.client.get(INDEX_URL)
+        tag = Tag.objects.create(value='fresh tag')
+        self.posts[-1].tags.add(tag)
+        res = self.client.get(INDEX_URL)
+        self.assertContains(res, 'fresh tag')
+        tag.value = 'renamed tag'
+        tag.save()
+        res = self.client.get(INDEX_URL)
+        self.assertContains(res, 'renamed tag')
+
+    def test_author_card_not_shared(self):
+        """ Test the author sees their own byline, others do not. """
+        self.client.get(INDEX_URL)
+        self.client.force_login(self.user)
+        res = self.client.get(INDEX_URL)
+        self.assertContains(res, '<strong>ME</strong>')
+        self.client.logout()
+        res = self.client.get(INDEX_URL)
+        self.assertNotContains(res, '<strong>ME</strong>')
@@ -0,0 +1,69 @@
+""" Query count tests for the post APIs at growing table sizes. """
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag
+from post.counters import view_counter
+
+POST_URL = reverse('post:post-list')
+SIZES = (10, 100, 1000)
+
+
+def create_posts(user, n, tags):
+    """ Bulk create ``n`` published posts each tagged with ``tags``. """
+    posts = Post.objects.bulk_create([
+        Post(author=user, title=f'Post {i}', content='content', slug=f'p{i}',
+             published_at=f'2023-02-02T11:{i // 60 % 60:02d}:{i % 60:02d}Z')
+        for i in range(n)])
+    Through = Post.tags.through
+    Through.objects.bulk_create([
+        Through(post_id=post.id, tag_id=tag.id)
+        for post in posts for tag in tags])
+    return posts
+
+
+@patch.object(view_counter, 'flush_threshold', 10 ** 6)
+@patch.object(view_counter, 'flush_interval', 10 ** 6)
+class PostQueryCountTests(TestCase):
+    """ Test the post APIs issue a fixed number of queries. """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='planner@example.com', password='testpass123')
+        self.tags = [Tag.objects.create(value=f'tag {i}') for i in range(3)]
+        self.client = APIClient()
+
+    def test_query_counts(self):
+        """ Test list, retrieve, filter and publish at 10/100/1000 posts. """
+        created = 0
+        for size in SIZES:
+            posts = create_posts(self.user, size - created, self.tags)
+            created = size
+            post = posts[-1]
+            with self.subTest(size=size, action='list'):
+                with self.assertNumQueries(2):
+                    self.client.get(POST_URL)
+            with self.subTest(size=size, action='retrieve'):
+                with self.assertNumQueries(2):
+                    self.client.get(reverse('post:post-detail',
+                                            args=[post.id]))
+            with self.subTest(size=size, action='filtered list'):
+                with self.assertNumQueries(2):
+                    res = self.client.get(POST_URL, {
+                        'tags': f'{self.tags[0].id},{self.tags[1].id}'})
+                ids = [item['id'] for item in res.data['results']]
+                self.assertEqual(len(ids), len(set(ids)))
+            with self.subTest(size=size, action='publish'):
+                self.client.force_authenticate(self.user)
+                # Including the insert of its trending score
+                with self.assertNumQueries(5):
+                    self.client.post(
+                        reverse('post:post_publish_field', args=[post.id]),
+                        {'published_at': '2023-03-03T11:11:11Z'})
+                self.client.force_authenticate(None)
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 import random
@@ -94,7 +94,7 @@ class PrivatePostApiTests(TestCase):
         posts = Post.objects.all().order_by('-published_at')
         srz = PostSRZ(posts, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, srz.data)
+        self.assertEqual(res.data['results'], srz.data)
 
     def test_posts_list_to_user(self):
         """ Test list of posts is limited to authenticated user. """
@@ -103,7 +103,7 @@ class PrivatePostApiTests(TestCase):
         create_post(user=self.user, published_at="2023-03-03T18:57:33Z")
         res = self.client.get(POST_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
 
     def test_get_post_detail(self):
         """ Test get published post detail. """
@@ -234,6 +234,49 @@ class PrivatePostApiTests(TestCase):
         self.assertIn(tag2, post.tags.all())
         self.assertNotIn(tag1, post.tags.all())
 
+    def test_create_post_with_existing_tags(self):
+        """ Test creating a post reuses tags and ignores repeats. """
+        Tag.objects.create(value='used bike')
+        payload = {
+            'title': 'Bike for sale',
+            'content': 'Barely used',
+            'tags': [{'value': 'used bike'}, {'value': 'bike parts'},
+                     {'value': 'bike parts'}],
+        }
+        res = self.client.post(POST_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        post = Post.objects.get(id=res.data['id'])
+        self.assertEqual(post.tags.count(), 2)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_create_post_tags_in_bulk(self):
+        """ Test tag queries do not grow with the number of tags. """
+        payload = {
+            'title': 'Many tags',
+            'content': 'content',
+            'tags': [{'value': f'tag {i}'} for i in range(20)],
+        }
+        with self.assertNumQueries(8):
+            res = self.client.post(POST_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['tags']), 20)
+
+    def test_update_keeps_unchanged_tags(self):
+        """ Test updating tags only touches the changed ones. """
+        kept = Tag.objects.create(value='kept')
+        dropped = Tag.objects.create(value='dropped')
+        post = create_post(user=self.user)
+        post.tags.add(kept, dropped)
+        through = Post.tags.through.objects.get(post=post, tag=kept)
+        payload = {'tags': [{'value': 'kept'}, {'value': 'added'}]}
+        res = self.client.patch(detail_url(post.id), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(Post.tags.through.objects.filter(
+            id=through.id).exists())
+        self.assertEqual(
+            sorted(post.tags.values_list('value', flat=True)),
+            ['added', 'kept'])
+
     def test_clear_post_tags(self):
         """ Test clearing a post tags """
         ag1 = Tag.objects.create(value='prius 2011')
@@ -260,11 +303,12 @@ class PrivatePostApiTests(TestCase):
         s1 = PostSRZ(p1)
         s2 = PostSRZ(p2)
         s3 = PostSRZ(p3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
 
+@override_settings(THROTTLE_ENABLED=False)
 class ImageUploadTests(TestCase):
     """ Tests for the image upload API. """
 
@@ -0,0 +1,82 @@
+""" Tests for the cached index of recent posts. """
+
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import Post
+from post import recent
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, THROTTLE_ENABLED=False)
+class RecentPostsTests(TestCase):
+    """ Test the recent posts are the latest published ones """
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='recent@example.com', password='testpass123')
+        now = timezone.now()
+        # Created out of publishing order
+        self.posts = [Post.objects.create(
+            author=self.user, title=f'Post {n}', content='content',
+            published_at=now - timedelta(days=n)) for n in (3, 1, 6, 2, 5, 4)]
+        self.draft = Post.objects.create(
+            author=self.user, title='Draft', content='content')
+
+    def ids(self, exclude=None):
+        return [int(re.search(r'href="\D*(\d+)', item).group(1))
+                for item in recent.get_items(exclude)]
+
+    def latest(self):
+        return [post.pk for post in sorted(
+            self.posts, key=lambda post: post.published_at, reverse=True)]
+
+    def test_latest_published_first(self):
+        """ Test drafts are left out and the newest posts come first. """
+        self.assertEqual(self.ids(), self.latest()[:5])
+        self.assertNotIn(self.draft.pk, self.ids(self.posts[0].pk))
+
+    def test_current_post_left_out(self):
+        """ Test a listed post sees the five others. """
+        newest = self.latest()[0]
+        self.assertEqual(self.ids(newest), self.latest()[1:6])
+
+    def test_read_without_queries(self):
+        """ Test a warm index is read with no query. """
+        recent.get_items()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ids(), self.latest()[:5])
+
+    def test_publish_updates_index(self):
+        """ Test publishing through the API puts the post first. """
+        recent.get_items()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(reverse('post:post_publish_field',
+                                args=[self.draft.pk]))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.ids()[0], self.draft.pk)
+
+    def test_unlisted_draft_ignored(self):
+        """ Test editing a draft keeps the index. """
+        recent.get_items()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.draft.title = 'Still a draft'
+            self.draft.save()
+        self.assertNotIn(recent.refresh, callbacks)
+
+    def test_deleted_post_removed(self):
+        """ Test a deleted listed post leaves the index. """
+        newest = self.latest()[0]
+        recent.get_items()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.get(pk=newest).delete()
+        self.assertEqual(self.ids(), self.latest()[1:6])
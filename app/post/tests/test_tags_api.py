@@ -95,4 +95,4 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.all().order_by('-value')
         srz = TagSRZ(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, srz.data)
+        self.assertEqual(res.data['results'], srz.data)
@@ -0,0 +1,129 @@
+""" Tests for compiled templates and cached post page fragments. """
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Gallery, Post, Tag
+from post import recent
+from post.counters import view_counter
+
+
+def create_post(user, n):
+    """ Create and return a sample published Post. """
+    return Post.objects.create(
+        author=user, title=f'Sample post {n}', content=f'Content {n}',
+        published_at=f'2023-02-{n:02d}T11:11:11Z')
+
+
+@override_settings(PROFILING_SAMPLE_RATE=0, DATABASE_REPLICAS=[],
+                   CACHE_SHARED=True)
+@patch.object(view_counter, 'flush_threshold', 10 ** 6)
+@patch.object(view_counter, 'flush_interval', 10 ** 6)
+class PostTemplateTests(TestCase):
+    """ Test post pages reuse rendered fragments until the post changes """
+
+    def setUp(self):
+        caches['shared'].clear()
+        caches['default'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='author@example.com', password='testpass123',
+            first_name='Ada', last_name='Author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts = [create_post(self.user, n) for n in range(1, 4)]
+            self.posts[0].tags.add(Tag.objects.create(value='first-tag'))
+        self.url = reverse('tpost:post-detail', args=[self.posts[0].pk])
+
+    def test_cached_loader(self):
+        """ Test templates are compiled once outside DEBUG. """
+        loaders = settings.TEMPLATES[0]['OPTIONS']['loaders']
+        self.assertEqual(loaders[0][0],
+                         'django.template.loaders.cached.Loader')
+
+    def test_fragment_reused(self):
+        """ Test a warm detail page skips the tag and image queries. """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as warm:
+            res = self.client.get(self.url)
+        self.assertContains(res, 'first-tag')
+        tables = ' '.join(query['sql'] for query in warm)
+        self.assertNotIn(Tag._meta.db_table, tables)
+        self.assertNotIn(Gallery._meta.db_table, tables)
+
+    def test_fragment_follows_changes(self):
+        """ Test editing a post or its tags renders it again. """
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].content = 'Edited content'
+            self.posts[0].save()
+        self.assertContains(self.client.get(self.url), 'Edited content')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].tags.add(Tag.objects.create(value='second-tag'))
+        self.assertContains(self.client.get(self.url), 'second-tag')
+
+    def test_fragment_follows_tag_rename(self):
+        """ Test renaming a tag renders the posts showing it again. """
+        self.client.get(self.url)
+        tag = Tag.objects.get(value='first-tag')
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.value = 'renamed-tag'
+            tag.save()
+        res = self.client.get(self.url)
+        self.assertContains(res, 'renamed-tag')
+        self.assertNotContains(res, 'first-tag')
+
+    def test_fragment_per_audience(self):
+        """ Test the author's byline is not served to other users. """
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(self.url), '<strong>ME</strong>')
+        self.client.logout()
+        res = self.client.get(self.url)
+        self.assertNotContains(res, '<strong>ME</strong>')
+        self.assertContains(res, 'Ada Author')
+
+    @override_settings(CACHE_SHARED=False)
+    def test_process_local_cache_not_cached(self):
+        """ Test fragments are not kept without stamps to retire them. """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(self.url)
+        tables = ' '.join(query['sql'] for query in second)
+        self.assertIn(Tag._meta.db_table, tables)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'],
+                       REPLICA_PIN_SECONDS=10)
+    def test_recent_change_not_cached(self):
+        """ Test fragments read while replicas may lag are not kept. """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(self.url)
+        tables = ' '.join(query['sql'] for query in second)
+        self.assertIn(Tag._meta.db_table, tables)
+
+    def test_recent_posts_rendered_once(self):
+        """ Test recent posts are rendered once for all detail pages. """
+        with patch('post.recent.render_to_string',
+                   wraps=recent.render_to_string) as render:
+            for post in self.posts:
+                self.client.get(reverse('tpost:post-detail', args=[post.pk]))
+            self.assertEqual(render.call_count, len(self.posts))
+            with self.captureOnCommitCallbacks(execute=True):
+                create_post(self.user, 4)
+            res = self.client.get(self.url)
+            self.assertEqual(render.call_count, len(self.posts) + 4)
+        self.assertContains(res, 'Sample post 4')
+
+    def test_bench_templates(self):
+        """ Test the benchmark reports both loaders and pages. """
+        out = StringIO()
+        call_command('bench_templates', posts=5, renders=2, stdout=out)
+        self.assertEqual(out.getvalue().count('page=index'), 2)
+        self.assertIn('cached_loader=True page=detail', out.getvalue())
@@ -0,0 +1,137 @@
+""" Tests for gallery thumbnails. """
+
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, features
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Gallery, Post, Task
+from core.tasks import run_pending
+from post import images
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def sample_image(width=1000, height=500, fmt='JPEG', name='photo.jpg'):
+    """ Return an uploadable image of the given size. """
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_ASYNC=False,
+                   THUMBNAIL_WIDTHS=[100, 400, 2000], THROTTLE_ENABLED=False)
+class ThumbnailTests(TestCase):
+    """ Test derivatives are built, served and removed. """
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='photographer@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            author=self.user, title='Pictures', content='content')
+
+    def test_build_on_save(self):
+        """ Test narrower copies are written when an image is saved. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image())
+        gallery.refresh_from_db()
+        self.assertEqual(gallery.thumbnails, [100, 400])
+        for width in gallery.thumbnails:
+            path = os.path.join(MEDIA_ROOT, images.derivative_name(
+                gallery.image.name, width))
+            with Image.open(path) as thumb:
+                self.assertEqual(thumb.size, (width, width // 2))
+                self.assertEqual(thumb.format, 'JPEG')
+        if features.check('webp'):
+            name = images.derivative_name(gallery.image.name, 100, webp=True)
+            with Image.open(os.path.join(MEDIA_ROOT, name)) as thumb:
+                self.assertEqual(thumb.format, 'WEBP')
+
+    @override_settings(THUMBNAIL_ASYNC=True)
+    def test_build_queued(self):
+        """ Test saves queue one build per image for the worker. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image())
+        gallery.save()
+        self.assertEqual(Task.objects.filter(
+            name='post.tasks.build_gallery_thumbnails').count(), 1)
+        run_pending()
+        gallery.refresh_from_db()
+        self.assertEqual(gallery.thumbnails, [100, 400])
+
+    def test_small_image_has_no_thumbnails(self):
+        """ Test images narrower than every width are left alone. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image(50, 50))
+        gallery.refresh_from_db()
+        self.assertEqual(gallery.thumbnails, [])
+        self.assertEqual(images.srcset(gallery), '')
+
+    def test_delete_removes_thumbnails(self):
+        """ Test deleting a gallery removes its derivatives. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image())
+        gallery.refresh_from_db()
+        paths = [os.path.join(MEDIA_ROOT, name)
+                 for name in images.derivative_names(gallery)]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        gallery.delete()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_responsive_img_tag(self):
+        """ Test the template tag lists the derivatives. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image())
+        gallery.refresh_from_db()
+        html = Template(
+            "{% load post_extras %}{% responsive_img gallery 50 '100px' %}"
+        ).render(Context({'gallery': gallery}))
+        self.assertIn(f'src="{gallery.image.url}"', html)
+        self.assertIn(images.derivative_name(gallery.image.url, 100) + ' 100w',
+                      html)
+        self.assertIn('sizes="100px"', html)
+        if features.check('webp'):
+            self.assertIn('type="image/webp"', html)
+
+    def test_api_returns_srcset(self):
+        """ Test the gallery API exposes the derivatives. """
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.post(reverse('post:gallery'),
+                          {'post': self.post.id, 'image': sample_image()},
+                          format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        gallery = Gallery.objects.get(id=res.data['id'])
+        self.assertEqual(gallery.thumbnails, [100, 400])
+        res = client.get(reverse('post:gallery'))
+        item = res.data['results'][0]
+        self.assertEqual(item['thumbnails'], [100, 400])
+        self.assertIn('http://testserver/', item['srcset'])
+        self.assertIn(' 400w', item['srcset'])
+
+    def test_backfill_command(self):
+        """ Test the command builds derivatives for old images. """
+        gallery = Gallery.objects.create(post=self.post,
+                                         image=sample_image())
+        Gallery.objects.filter(pk=gallery.pk).update(thumbnails=[])
+        out = io.StringIO()
+        call_command('build_thumbnails', stdout=out)
+        gallery.refresh_from_db()
+        self.assertEqual(gallery.thumbnails, [100, 400])
+        self.assertIn('1 images', out.getvalue())
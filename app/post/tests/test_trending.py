@@ -0,0 +1,131 @@
+""" Tests for the trending posts ranking. """
+
+import math
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, TrendingScore
+from post import trending
+from post.checks import trending_settings
+from post.counters import rollup_views, write_views
+
+TRENDING_URL = reverse('post:post-trending')
+HOUR = 3600
+
+
+def add_views(pending):
+    """ Write views and roll them up into the posts. """
+    write_views(pending)
+    rollup_views()
+
+
+def score(post):
+    return TrendingScore.objects.get(post=post).score
+
+
+@override_settings(TRENDING_HALF_LIFE=HOUR, TRENDING_PUBLISH_WEIGHT=20,
+                   TRENDING_VIEW_WEIGHT=1, TRENDING_COMMENT_WEIGHT=10,
+                   TRENDING_SIZE=3, PROFILING_SAMPLE_RATE=0,
+                   THROTTLE_ENABLED=False)
+class TrendingTests(TestCase):
+    """ Test scores follow events and decay with time """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='trending@example.com', password='testpass123')
+        self.now = timezone.now()
+        self.posts = [self.create_post(n, hours) for n, hours in
+                      enumerate([0, 1, 2, 3])]
+        self.draft = Post.objects.create(
+            author=self.user, title='Draft', content='content')
+        self.client = APIClient()
+
+    def create_post(self, n, hours):
+        """ Create a post published ``hours`` ago. """
+        return Post.objects.create(
+            author=self.user, title=f'Post {n}', content='content',
+            published_at=self.now - timedelta(hours=hours))
+
+    def ids(self, **params):
+        res = self.client.get(TRENDING_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in res.data]
+
+    def test_newest_first_without_events(self):
+        """ Test recency ranks posts and drafts are left out. """
+        self.assertEqual(self.ids(), [post.pk for post in self.posts[:3]])
+        self.assertEqual(self.ids(limit=2),
+                         [post.pk for post in self.posts[:2]])
+        self.assertNotIn(self.draft.pk, self.ids(limit=100))
+
+    def test_events_add_up(self):
+        """ Test events add their decayed weight to the score. """
+        post = self.posts[3]
+        before = score(post)
+        add_views({post.pk: 30})
+        expected = math.log(math.exp(before - trending.event_score(1))
+                            + 30)
+        self.assertAlmostEqual(score(post) - trending.event_score(1),
+                               expected, places=3)
+
+    def test_views_and_comments_raise(self):
+        """ Test viewed and commented older posts overtake newer ones. """
+        oldest = self.posts[3]
+        self.assertNotIn(oldest.pk, self.ids())
+        add_views({oldest.pk: 50, self.posts[2].pk: 1})
+        self.assertEqual(self.ids()[0], oldest.pk)
+
+        second = self.posts[2]
+        for n in range(8):
+            Comment.objects.create(
+                creator=self.user, content=f'comment {n}',
+                content_type=ContentType.objects.get_for_model(Post),
+                object_id=second.pk)
+        self.assertEqual(self.ids()[:2], [second.pk, oldest.pk])
+
+    def test_old_events_decay(self):
+        """ Test yesterday's views weigh less than today's. """
+        old, new = self.posts[0], self.posts[1]
+        with patch('post.trending.time.time',
+                   return_value=self.now.timestamp() - 10 * HOUR):
+            add_views({old.pk: 1000})
+        add_views({new.pk: 20})
+        self.assertEqual(self.ids(limit=1), [new.pk])
+
+    def test_unpublish_and_delete(self):
+        """ Test unpublished and deleted posts leave the ranking. """
+        first, second = self.posts[:2]
+        first.published_at = None
+        first.save()
+        second.delete()
+        self.assertEqual(self.ids(), [post.pk for post in self.posts[2:]])
+        self.assertFalse(TrendingScore.objects.filter(post=first).exists())
+
+    def test_publish_ranks_draft(self):
+        """ Test publishing a draft ranks it as the newest post. """
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse('post:post_publish_field',
+                                 args=[self.draft.pk]))
+        self.assertEqual(self.ids()[0], self.draft.pk)
+
+    def test_constant_queries(self):
+        """ Test the top posts take one query and one for their tags. """
+        for n in range(10):
+            self.create_post(n + 10, n)
+        with self.assertNumQueries(2):
+            self.ids()
+
+    def test_settings_checked(self):
+        """ Test weights and half lives that break scoring are refused. """
+        self.assertEqual(trending_settings(None), [])
+        with self.settings(TRENDING_PUBLISH_WEIGHT=0, TRENDING_HALF_LIFE=0):
+            self.assertEqual([error.id for error in trending_settings(None)],
+                             ['post.E001', 'post.E002'])
@@ -0,0 +1,104 @@
+""" Tests for streaming gallery uploads. """
+
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile, PngImagePlugin
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Gallery, Post
+
+GALLERY_URL = reverse('post:gallery')
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def sample_image(width, height, fmt='PNG', name='photo.png'):
+    """ Return an uploadable image of the given size. """
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FILE_UPLOAD_TEMP_DIR=MEDIA_ROOT,
+                   THUMBNAIL_ASYNC=True, GALLERY_MAX_DIMENSION=500,
+                   GALLERY_MAX_PIXELS=200000,
+                   GALLERY_MAX_UPLOAD_SIZE=200000, THROTTLE_ENABLED=False)
+class StreamingUploadTests(TestCase):
+    """ Test uploads are checked while they stream in. """
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='uploader@example.com', password='testpass123')
+        self.post = Post.objects.create(
+            author=self.user, title='Pictures', content='content')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, image):
+        return self.client.post(GALLERY_URL,
+                                {'post': self.post.id, 'image': image},
+                                format='multipart')
+
+    def test_upload_without_decoding(self):
+        """ Test an accepted upload is never decoded or verified. """
+        with patch.object(ImageFile.ImageFile, 'load',
+                          side_effect=AssertionError('decoded')), \
+                patch.object(PngImagePlugin.PngImageFile, 'verify',
+                             side_effect=AssertionError('verified')):
+            res = self.upload(sample_image(400, 300))
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        gallery = Gallery.objects.get(id=res.data['id'])
+        with Image.open(gallery.image.path) as image:
+            self.assertEqual(image.size, (400, 300))
+
+    def test_reject_large_dimensions(self):
+        """ Test images over the dimension limit are rejected. """
+        res = self.upload(sample_image(600, 10))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('dimensions', str(res.data['image']))
+        self.assertFalse(Gallery.objects.exists())
+
+    def test_reject_too_many_pixels(self):
+        """ Test images over the pixel limit are rejected. """
+        res = self.upload(sample_image(500, 500))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', str(res.data['image']))
+
+    def test_reject_large_file(self):
+        """ Test uploads over the byte limit are rejected. """
+        payload = sample_image(10, 10).read() + b'\0' * 300000
+        res = self.upload(SimpleUploadedFile('big.png', payload))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', str(res.data['image']))
+
+    def test_reject_large_body_from_header(self):
+        """ Test the declared length is enough to reject a body. """
+        with patch('post.uploads.HEADER_LIMIT', 0):
+            res = self.upload(SimpleUploadedFile('big.png', b'\0' * 250000))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', str(res.data['image']))
+
+    def test_reject_non_image(self):
+        """ Test files without an image header are rejected. """
+        res = self.upload(SimpleUploadedFile('notes.png', b'not an image'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Gallery.objects.exists())
+
+    def test_reject_unsupported_format(self):
+        """ Test image formats outside the allowed set are rejected. """
+        res = self.upload(sample_image(10, 10, fmt='BMP', name='a.bmp'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('BMP', str(res.data['image']))
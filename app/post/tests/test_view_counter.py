@@ -0,0 +1,160 @@
+""" Tests for the buffered post view counter. """
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import Post, PostViewShard, Task
+from core.tasks import run_pending
+from post.counters import (
+    ViewCounter,
+    rollup_views,
+    view_counter,
+    with_pending_views,
+    write_views, )
+from post.tasks import roll_up_views
+
+
+def create_post(**params):
+    """ Create and return a sample published Post. """
+    user = get_user_model().objects.create_user(
+        email=f'viewer{Post.objects.count()}@example.com')
+    defaults = {
+        'title': 'Sample post one',
+        'content': 'Content of the sample post one',
+        'published_at': '2023-02-02T11:11:11Z',
+    }
+    defaults.update(params)
+    return Post.objects.create(author=user, **defaults)
+
+
+def views(*posts):
+    """ Return the rolled up and sharded views of ``posts``. """
+    rows = with_pending_views(Post.objects.filter(
+        pk__in=[post.pk for post in posts])).in_bulk()
+    return [(rows[post.pk].views, rows[post.pk].pending_views)
+            for post in posts]
+
+
+class ViewCounterTests(TestCase):
+    """ Test buffering and flushing of views. """
+
+    def test_incr_is_buffered(self):
+        """ Test increments stay in memory until flushed. """
+        post = create_post()
+        counter = ViewCounter(flush_interval=60, flush_threshold=100)
+        counter.incr(post.pk)
+        counter.incr(post.pk, 2)
+        post.refresh_from_db()
+        self.assertEqual(post.views, 0)
+        self.assertEqual(counter.pending(post.pk), 3)
+
+    @patch('post.counters._scheduled', None)
+    def test_flush_batches_updates(self):
+        """ Test flushing writes every pending count in one statement. """
+        p1 = create_post()
+        p2 = create_post()
+        p3 = create_post()
+        counter = ViewCounter(flush_interval=60, flush_threshold=100)
+        counter.incr(p1.pk, 2)
+        counter.incr(p2.pk, 2)
+        counter.incr(p3.pk, 5)
+        # The shard upsert and the rollup task
+        with self.assertNumQueries(2):
+            self.assertEqual(counter.flush(), 9)
+        self.assertEqual(views(p1, p2, p3), [(0, 2), (0, 2), (0, 5)])
+        self.assertEqual(counter.pending(p1.pk), 0)
+        self.assertEqual(rollup_views(), 9)
+        self.assertEqual(views(p1, p2, p3), [(2, 0), (2, 0), (5, 0)])
+        self.assertFalse(PostViewShard.objects.exists())
+
+    def test_threshold_queues_flush(self):
+        """ Test reaching the threshold hands the buffer to a task. """
+        post = create_post()
+        counter = ViewCounter(flush_interval=60, flush_threshold=3)
+        for _ in range(3):
+            counter.incr(post.pk)
+        self.assertEqual(counter.pending(post.pk), 0)
+        self.assertEqual(views(post), [(0, 0)])
+        run_pending()
+        self.assertEqual(views(post), [(0, 3)])
+
+    def test_api_retrieve_counts_view(self):
+        """ Test the detail API feeds the counter without saving. """
+        post = create_post()
+        client = APIClient()
+        url = reverse('post:post-detail', args=[post.id])
+        res = client.get(url)
+        self.assertEqual(res.data['views'], 1)
+        view_counter.flush()
+        run_pending()
+        self.assertEqual(client.get(url).data['views'], 2)
+        rollup_views()
+        self.assertEqual(client.get(url).data['views'], 3)
+        view_counter.flush()
+
+    @override_settings(VIEW_COUNTER_SHARDS=4)
+    @patch('post.counters._scheduled', None)
+    def test_shards_spread_writes(self):
+        """ Test flushes of one post land on at most the shard count. """
+        post = create_post()
+        for _ in range(40):
+            write_views({post.pk: 1})
+        self.assertLessEqual(post.view_shards.count(), 4)
+        self.assertGreater(post.view_shards.count(), 1)
+        self.assertEqual(views(post), [(0, 40)])
+        self.assertEqual(
+            Task.objects.filter(name=roll_up_views.task_name).count(), 1)
+
+    def test_deleted_post_skipped(self):
+        """ Test views of a post deleted before the flush are dropped. """
+        post, gone = create_post(), create_post()
+        gone_pk = gone.pk
+        gone.delete()
+        write_views({post.pk: 2, gone_pk: 3})
+        self.assertEqual(views(post), [(0, 2)])
+        self.assertEqual(rollup_views(), 2)
+
+    def test_edit_keeps_rolled_up_views(self):
+        """ Test saving a post read before a roll up keeps its views. """
+        post = create_post()
+        client = APIClient()
+        client.force_authenticate(post.author)
+        url = reverse('post:post-detail', args=[post.id])
+        stale = Post.objects.get(pk=post.pk)
+        write_views({post.pk: 5})
+        rollup_views()
+        stale.title = 'Edited'
+        stale.save()
+        with patch('post.views.PostViewSet.get_object', return_value=stale):
+            client.patch(url, {'content': 'Edited content'})
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.views), ('Edited', 5))
+        self.assertEqual(post.content, 'Edited content')
+
+    def test_views_past_small_integer(self):
+        """ Test counts past 32767 are stored and served. """
+        post = create_post(views=40000)
+        write_views({post.pk: 10 ** 6})
+        rollup_views()
+        res = APIClient().get(reverse('post:post-detail', args=[post.id]))
+        self.assertEqual(res.data['views'], 1040001)
+        view_counter.flush()
+
+
+class ViewCounterBenchTests(TransactionTestCase):
+    """ Test the benchmark, whose workers need committed rows. """
+
+    def test_bench_counters(self):
+        """ Test the benchmark reports every mode and checks totals. """
+        out = StringIO()
+        call_command('bench_counters', workers='2', writes=5, stdout=out)
+        for mode in ('direct', 'shards=1', 'shards=8'):
+            self.assertIn(f'mode={mode} workers=2', out.getvalue())
+        self.assertNotIn('lost', out.getvalue())
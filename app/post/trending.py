@@ -0,0 +1,78 @@
+""" Time-decayed trending scores of published posts
+
+A post's score is the sum of its events, publishing, views and
+comments, each with its weight halved every TRENDING_HALF_LIFE seconds
+since it happened. All scores decay at the same rate, so rather than
+decaying every row the events are weighted up by the time they happen:
+an event of weight ``w`` at time ``t`` counts ``w * e^(t / tau)``. The
+ranking is the same at any moment, and a row only changes when an event
+adds to it.
+
+Scores are kept as the natural log of that sum, which grows linearly
+with time instead of overflowing. Events add with a log-sum-exp in
+one UPDATE, and the top posts are the first rows of the index on
+``TrendingScore.score``.
+"""
+
+import math
+import time
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils.dateparse import parse_datetime
+
+from core.models import Post, TrendingScore
+
+# exp() underflows in Postgres below about -745
+MIN_EXPONENT = -50.0
+
+
+def _tau():
+    return settings.TRENDING_HALF_LIFE / math.log(2)
+
+
+def event_score(weight, at=None):
+    """ Return the log score of an event of ``weight`` at epoch ``at``. """
+    return math.log(weight) + (time.time() if at is None else at) / _tau()
+
+
+def _log_add(field, score):
+    # ln(e^a + e^b) = max(a, b) + ln(1 + e^-|a - b|)
+    score = Value(score, output_field=FloatField())
+    return Greatest(F(field), score) + Ln(Value(1.0) + Exp(Greatest(
+        -Abs(F(field) - score), Value(MIN_EXPONENT))))
+
+
+def add_score(pks, weight):
+    """ Add an event of ``weight`` happening now to the posts ``pks``. """
+    if weight > 0 and pks:
+        TrendingScore.objects.filter(post_id__in=pks).update(
+            score=_log_add('score', event_score(weight)))
+
+
+def post_saved(post, created):
+    """
+    Rank a published post from its publish time, and drop a post that
+    is no longer published.
+    """
+    published_at = post.published_at
+    if published_at is None:
+        if not created:
+            TrendingScore.objects.filter(post_id=post.pk).delete()
+        return
+    if isinstance(published_at, str):
+        published_at = parse_datetime(published_at)
+    TrendingScore.objects.bulk_create([TrendingScore(
+        post_id=post.pk, score=event_score(
+            settings.TRENDING_PUBLISH_WEIGHT, published_at.timestamp()),
+    )], ignore_conflicts=True)
+
+
+def top(limit=None, queryset=None):
+    """ Return the ``limit`` highest scored published posts, best first. """
+    limit = min(limit or settings.TRENDING_SIZE, settings.TRENDING_SIZE)
+    queryset = Post.objects.all() if queryset is None else queryset
+    return queryset.filter(
+        published_at__isnull=False, trending__isnull=False,
+    ).order_by('-trending__score')[:limit]
@@ -0,0 +1,132 @@
+""" Streaming upload handling for gallery images """
+
+import io
+import struct
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image
+from rest_framework import serializers as srzs
+
+FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+HEADER_LIMIT = 256 * 1024
+
+
+def check_dimensions(width, height):
+    """ Raise ``ValidationError`` for images too large to accept. """
+    limit = settings.GALLERY_MAX_DIMENSION
+    if width > limit or height > limit:
+        raise srzs.ValidationError(
+            f'Image dimensions must be at most {limit}x{limit} pixels.')
+    if width * height > settings.GALLERY_MAX_PIXELS:
+        raise srzs.ValidationError(
+            f'Image must have at most {settings.GALLERY_MAX_PIXELS} pixels.')
+
+
+def read_header(head):
+    """
+    Return ``(format, (width, height))`` parsed from the first bytes of
+    an image, or None while more bytes are needed.
+
+    Pillow only reads headers on open; no pixel data is decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            return image.format, image.size
+    except Image.DecompressionBombError:
+        raise srzs.ValidationError(
+            f'Image must have at most {settings.GALLERY_MAX_PIXELS} pixels.')
+    except (OSError, SyntaxError, ValueError, EOFError, struct.error):
+        return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Spool the ``image`` field to a temporary file while checking it.
+
+    The request is rejected as soon as its declared length, the bytes
+    received or the dimensions in the image header exceed the gallery
+    limits, before the rest of the body is written anywhere. Other
+    fields fall through to the next handler.
+    """
+
+    field_name = 'image'
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > settings.GALLERY_MAX_UPLOAD_SIZE + HEADER_LIMIT:
+            self._reject(self._too_big())
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.file = None
+        if field_name != self.field_name:
+            return
+        self.file = TemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra)
+        self.head = b''
+        self.info = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.file is None:
+            return raw_data
+        if start + len(raw_data) > settings.GALLERY_MAX_UPLOAD_SIZE:
+            self._reject(self._too_big())
+        self.file.write(raw_data)
+        if self.info is None and len(self.head) < HEADER_LIMIT:
+            self.head += raw_data[:HEADER_LIMIT - len(self.head)]
+            try:
+                self.info = read_header(self.head)
+            except srzs.ValidationError as exc:
+                self._reject(exc.detail)
+            if self.info is not None:
+                self._check(*self.info)
+
+    def file_complete(self, file_size):
+        if self.file is None:
+            return None
+        if self.info is None:
+            self._reject('Upload a valid image.')
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.image_info = self.info
+        return self.file
+
+    def upload_interrupted(self):
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+            self.file = None
+
+    def _check(self, fmt, size):
+        if fmt not in FORMATS:
+            self._reject(f'Unsupported image format {fmt}.')
+        try:
+            check_dimensions(*size)
+        except srzs.ValidationError as exc:
+            self._reject(exc.detail)
+
+    def _too_big(self):
+        return (f'Image must be at most '
+                f'{settings.GALLERY_MAX_UPLOAD_SIZE} bytes.')
+
+    def _reject(self, message):
+        self.upload_interrupted()
+        raise srzs.ValidationError({self.field_name: message})
+
+
+class StreamedImageField(srzs.ImageField):
+    """
+    Image field trusting the header checks of ``ImageUploadHandler``.
+
+    Files spooled by the handler skip Pillow's full verification; any
+    other file is verified as usual and then held to the same limits.
+    """
+
+    def to_internal_value(self, data):
+        if getattr(data, 'image_info', None) is not None:
+            return srzs.FileField.to_internal_value(self, data)
+        file = super().to_internal_value(data)
+        check_dimensions(*file.image.size)
+        return file
@@ -1,6 +1,7 @@
-from django.db.models import Q
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
 from rest_framework import viewsets, generics
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
     IsAuthenticated, )
@@ -8,9 +9,22 @@ from rest_framework.response import Response
 
 from rest_framework.views import APIView
 from rest_framework import status
+from core import metrics
+from core.aio import AsyncReadMixin, database_sync_to_async
+from core.auth import TOKEN_AUTHENTICATION
+from core.cache import cache_anonymous
+from core.conditional import conditional
+from core.db.router import ReplicaReadMixin
 from core.models import Post, Tag, Gallery
-from post import srzs
-import datetime
+from core.pagination import (
+    PostPagination,
+    TagPagination,
+    GalleryPagination, )
+from core.throttling import THROTTLES
+from post import srzs, trending
+from post.counters import view_counter, with_pending_views
+from post.uploads import ImageUploadHandler
+import time
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -19,6 +33,15 @@ from drf_spectacular.utils import (
 )
 
 
+def post_stamps(view, request, pk=None):
+    """ A post and the tags it shows. """
+    return [('post', pk), ('tags',)]
+
+
+def post_list_stamps(view, request):
+    return [('posts',), ('tags',)]
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -30,31 +53,61 @@ from drf_spectacular.utils import (
         ]
     )
 )
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ReplicaReadMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """ View for manage post APIs """
     serializer_class = srzs.PostDetailSRZ
     queryset = Post.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = TOKEN_AUTHENTICATION
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = PostPagination
+    throttle_classes = THROTTLES
+    throttle_scope = 'post'
 
     def _params_to_ints(self, qs):
         """ Convert a list of strings to integers. """
         return [int(str_id) for str_id in qs.split(',')]
 
+    @conditional(post_list_stamps)
+    @cache_anonymous('posts', 'tags', timeout=settings.API_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(post_stamps)
     def retrieve(self, request, pk=None):
         obj = self.get_object()
-        obj.views += 1
-        obj.save()
+        obj.views += view_counter.incr(obj.pk)
         serializer = srzs.PostDetailSRZ(obj)
         return Response(serializer.data)
 
+    @conditional(post_list_stamps)
+    @cache_anonymous('posts', 'tags', timeout=settings.API_CACHE_TIMEOUT)
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
+
+    @conditional(post_stamps)
+    async def aretrieve(self, request, pk=None):
+        obj = await self.aget_object()
+        obj.views += await database_sync_to_async(view_counter.incr)(obj.pk)
+        return Response(await self.aserialize(obj))
+
+    def _plan_queryset(self, queryset):
+        """ Load the relations the current action serializes. """
+        if self.action == 'destroy':
+            return queryset
+        queryset = with_pending_views(queryset.prefetch_related('tags'))
+        if self.action != 'list':
+            queryset = queryset.select_related('author')
+        return queryset
+
     def get_queryset(self):
         """ Retrieve recipes for authenticated and ananymous users. """
         tags = self.request.query_params.get('tags')
-        queryset = self.queryset
+        queryset = self._plan_queryset(self.queryset)
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids).distinct()
+            queryset = queryset.filter(Exists(
+                Post.tags.through.objects.filter(
+                    post_id=OuterRef('pk'), tag_id__in=tag_ids)))
         if self.request.method in ('PATCH', 'PUT', 'DELETE'):
             return queryset.all().filter(author=self.request.user)
         if self.request.user.is_authenticated:
@@ -74,15 +127,17 @@ class PostViewSet(viewsets.ModelViewSet):
 
 
 class PostPublishView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = TOKEN_AUTHENTICATION
     permission_classes = [IsAuthenticated]
     serializer_class = srzs.PostDetailSRZ
+    throttle_classes = THROTTLES
+    throttle_scope = 'post'
 
     def post(self, request, pk):
         post = Post.objects.get(pk=pk)
-        if post.author != request.user:
+        if post.author_id != request.user.id:
             return Response(status.HTTP_401_UNAUTHORIZED)
-        post.published_at = datetime.datetime.now()
+        post.published_at = timezone.now()
         srz = srzs.PostDetailSRZ(post, data=request.data, partial=True)
         if srz.is_valid():
             srz.save()
@@ -91,6 +146,33 @@ class PostPublishView(APIView):
             return Response(srz.errors, status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description='Number of posts, at most TRENDING_SIZE.',
+            ),
+        ]
+    )
+)
+class TrendingPostsView(ReplicaReadMixin, generics.ListAPIView):
+    """ Published posts with the highest trending score, best first. """
+    serializer_class = srzs.PostSRZ
+    authentication_classes = TOKEN_AUTHENTICATION
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = None
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get('limit', 0))
+        except ValueError:
+            limit = 0
+        return trending.top(max(limit, 0), with_pending_views(
+            Post.objects.prefetch_related('tags')))
+
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -102,16 +184,21 @@ class PostPublishView(APIView):
         ]
     )
 )
-class TagView(generics.ListCreateAPIView):
+class TagView(ReplicaReadMixin, AsyncReadMixin, generics.ListCreateAPIView):
     serializer_class = srzs.TagSRZ
     permission_classes = [IsAuthenticatedOrReadOnly]
-    authentication_classes = [TokenAuthentication]
-    # generics.ListCreateAPIView
+    authentication_classes = TOKEN_AUTHENTICATION
+    pagination_class = TagPagination
 
-    def list(self, request):
-        qs = self.get_queryset()
-        srz = srzs.TagSRZ(qs, many=True)
-        return Response(srz.data)
+    @conditional(post_list_stamps)
+    @cache_anonymous('tags', 'posts', timeout=settings.API_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional(post_list_stamps)
+    @cache_anonymous('tags', 'posts', timeout=settings.API_CACHE_TIMEOUT)
+    async def alist(self, request, *args, **kwargs):
+        return await super().alist(request, *args, **kwargs)
 
     def get_queryset(self):
         """ Filter queryset """
@@ -124,15 +211,32 @@ class TagView(generics.ListCreateAPIView):
         return queryset
 
 
-class GalleryView(generics.ListCreateAPIView):
+class GalleryView(ReplicaReadMixin, generics.ListCreateAPIView):
     serializer_class = srzs.GallerySRZ
     permission_classes = [IsAuthenticatedOrReadOnly]
-    authentication_classes = [TokenAuthentication]
-
-    def list(self, request):
-        qs = self.get_queryset()
-        srz = srzs.GallerySRZ(qs, many=True)
-        return Response(srz.data)
+    authentication_classes = TOKEN_AUTHENTICATION
+    pagination_class = GalleryPagination
+    throttle_classes = THROTTLES
+    throttle_scope = 'upload'
+
+    @cache_anonymous('gallery', timeout=settings.API_CACHE_TIMEOUT)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = 'rejected'
+        request.upload_handlers.insert(
+            0, ImageUploadHandler(request._request))
+        try:
+            response = super().create(request, *args, **kwargs)
+            outcome = 'created'
+            metrics.GALLERY_UPLOAD_BYTES.observe(
+                request.FILES['image'].size)
+            return response
+        finally:
+            metrics.GALLERY_UPLOAD_SECONDS.labels(outcome).observe(
+                time.perf_counter() - start)
 
     def get_queryset(self):
         gueryset = Gallery.objects.all()
@@ -0,0 +1,21 @@
+""" Signal handlers keeping stored search vectors current """
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.models import Comment, Post
+from search.tasks import index_comments, index_posts
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, update_fields=None, **kwargs):
+    """ Queue reindexing a post whose text may have changed. """
+    if update_fields is None or {'title', 'content'} & set(update_fields):
+        index_posts.delay([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, update_fields=None, **kwargs):
+    """ Queue reindexing a comment whose text may have changed. """
+    if update_fields is None or 'content' in update_fields:
+        index_comments.delay([instance.pk])
@@ -0,0 +1,28 @@
+""" Serializers for search results """
+
+from rest_framework import serializers as srzs
+from core.models import Comment, Post
+
+
+class PostHitSRZ(srzs.ModelSerializer):
+    """ A post matching the search query. """
+    rank = srzs.FloatField(read_only=True)
+    headline = srzs.CharField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ['id', 'author', 'title', 'slug', 'published_at',
+                  'rank', 'headline']
+        read_only_fields = fields
+
+
+class CommentHitSRZ(srzs.ModelSerializer):
+    """ A comment matching the search query. """
+    rank = srzs.FloatField(read_only=True)
+    headline = srzs.CharField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ['id', 'creator', 'content_type', 'object_id',
+                  'created_at', 'rank', 'headline']
+        read_only_fields = fields
@@ -0,0 +1,14 @@
+""" Background tasks keeping stored search vectors current """
+
+from core.tasks import task
+from search import vectors
+
+
+@task()
+def index_posts(pks):
+    vectors.index_posts(pks)
+
+
+@task()
+def index_comments(pks):
+    vectors.index_comments(pks)
@@ -0,0 +1,116 @@
+""" Tests for the search API. """
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+
+SEARCH_URL = reverse('search:search')
+
+
+def create_post(user, **params):
+    """ Create and return a sample published Post. """
+    defaults = {
+        'title': 'Sample post',
+        'content': 'Content of the sample post',
+        'published_at': '2023-02-02T11:11:11Z',
+    }
+    defaults.update(params)
+    return Post.objects.create(author=user, **defaults)
+
+
+@override_settings(TASKS_EAGER=True)
+class SearchApiTests(TestCase):
+    """ Test ranking, highlighting, facets and paging. """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='searcher@example.com', password='testpass123')
+
+    def test_query_required(self):
+        """ Test an empty query is rejected. """
+        res = self.client.get(SEARCH_URL)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_title_ranks_above_content(self):
+        """ Test title matches outrank body matches. """
+        body = create_post(self.user, title='Selling things',
+                           content='An old bicycle in good shape')
+        title = create_post(self.user, title='Bicycle for sale',
+                            content='Red frame')
+        create_post(self.user, title='Bicycle draft', published_at=None)
+        create_post(self.user, title='Unrelated', content='Nothing here')
+        res = self.client.get(SEARCH_URL, {'q': 'bicycles'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [hit['id'] for hit in res.data['results']]
+        self.assertEqual(ids, [title.id, body.id])
+        self.assertIn('<b>bicycle</b>', res.data['results'][1]['headline'])
+
+    def test_edit_reindexes_post(self):
+        """ Test saving a post updates its search vector. """
+        post = create_post(self.user, title='Guitar for sale')
+        post.title = 'Piano for sale'
+        post.save()
+        res = self.client.get(SEARCH_URL, {'q': 'piano'})
+        self.assertEqual([hit['id'] for hit in res.data['results']],
+                         [post.id])
+        res = self.client.get(SEARCH_URL, {'q': 'guitar'})
+        self.assertEqual(res.data['results'], [])
+
+    def test_tag_facets(self):
+        """ Test facets count the tags of matching posts. """
+        camera = Tag.objects.create(value='camera')
+        lens = Tag.objects.create(value='lens')
+        for title in ('Camera body', 'Camera bag'):
+            create_post(self.user, title=title).tags.add(camera)
+        create_post(self.user, title='Camera lens').tags.add(camera, lens)
+        create_post(self.user, title='Phone').tags.add(lens)
+        res = self.client.get(SEARCH_URL, {'q': 'camera'})
+        self.assertEqual(res.data['facets']['tags'], [
+            {'id': camera.id, 'value': 'camera', 'count': 3},
+            {'id': lens.id, 'value': 'lens', 'count': 1},
+        ])
+
+    def test_walk_pages(self):
+        """ Test cursors walk every hit once, ties included. """
+        posts = [create_post(self.user, title=f'Lamp {i}')
+                 for i in range(5)]
+        ids = []
+        res = self.client.get(SEARCH_URL, {'q': 'lamp', 'page_size': 2})
+        while True:
+            ids += [hit['id'] for hit in res.data['results']]
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+        self.assertEqual(sorted(ids), sorted(p.id for p in posts))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_search_comments(self):
+        """ Test comments are searched when asked for. """
+        post = create_post(self.user)
+        comment = Comment.objects.create(
+            creator=self.user, content='Is the stroller still available?',
+            content_type=ContentType.objects.get_for_model(post),
+            object_id=post.id)
+        res = self.client.get(SEARCH_URL, {'q': 'stroller',
+                                           'type': 'comments'})
+        self.assertEqual([hit['id'] for hit in res.data['results']],
+                         [comment.id])
+        self.assertNotIn('facets', res.data)
+
+    def test_draft_comments_hidden(self):
+        """ Test comments on draft posts are not found. """
+        draft = create_post(self.user, published_at=None)
+        Comment.objects.create(
+            creator=self.user, content='Is the stroller still available?',
+            content_type=ContentType.objects.get_for_model(draft),
+            object_id=draft.id)
+        res = self.client.get(SEARCH_URL, {'q': 'stroller',
+                                           'type': 'comments'})
+        self.assertEqual(res.data['results'], [])
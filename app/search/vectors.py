@@ -0,0 +1,27 @@
+""" Stored search vectors for posts and comments """
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+
+from core.models import Comment, Post
+
+
+def post_vector():
+    """ Titles weigh more than post bodies. """
+    return (SearchVector('title', weight='A', config=settings.SEARCH_CONFIG) +
+            SearchVector('content', weight='B',
+                         config=settings.SEARCH_CONFIG))
+
+
+def comment_vector():
+    return SearchVector('content', config=settings.SEARCH_CONFIG)
+
+
+def index_posts(pks):
+    """ Recompute the stored vector of the given posts in one UPDATE. """
+    Post.objects.filter(pk__in=pks).update(search_vector=post_vector())
+
+
+def index_comments(pks):
+    """ Recompute the stored vector of the given comments in one UPDATE. """
+    Comment.objects.filter(pk__in=pks).update(search_vector=comment_vector())
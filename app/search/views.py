@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank, )
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from drf_spectacular.utils import (
+    extend_schema_view,
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+
+from core.auth import TOKEN_AUTHENTICATION
+from core.models import Comment, Post, Tag
+from core.pagination import KeysetPagination
+from search import srzs
+
+
+class SearchPagination(KeysetPagination):
+    """ Best matches first. """
+    ordering = ('-rank', '-id')
+
+
+@extend_schema_view(
+    get=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q', OpenApiTypes.STR,
+                description='Search terms, web search syntax.',
+            ),
+            OpenApiParameter(
+                'type', OpenApiTypes.STR, enum=['posts', 'comments'],
+                description='What to search, posts by default.',
+            ),
+        ]
+    )
+)
+class SearchView(generics.ListAPIView):
+    """
+    Ranked full-text search over published posts or comments, leaving
+    out the comments of draft posts.
+    """
+    authentication_classes = TOKEN_AUTHENTICATION
+    permission_classes = [AllowAny]
+    pagination_class = SearchPagination
+
+    def _comments(self):
+        return self.request.query_params.get('type') == 'comments'
+
+    def _query(self):
+        terms = self.request.query_params.get('q', '').strip()
+        if not terms:
+            raise ValidationError({'q': 'This parameter is required.'})
+        return SearchQuery(terms, config=settings.SEARCH_CONFIG,
+                           search_type='websearch')
+
+    def get_queryset(self):
+        """ Match on the GIN indexed vector and rank the matches. """
+        query = self._query()
+        if self._comments():
+            queryset = Comment.objects.exclude(
+                content_type=ContentType.objects.get_for_model(Post),
+                object_id__in=Post.objects.filter(
+                    published_at__isnull=True).values('pk'))
+        else:
+            queryset = Post.objects.filter(published_at__isnull=False)
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+            headline=SearchHeadline(
+                'content', query, config=settings.SEARCH_CONFIG),
+        ).defer('search_vector')
+
+    def get_serializer_class(self):
+        if self._comments():
+            return srzs.CommentHitSRZ
+        return srzs.PostHitSRZ
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if not self._comments() and 'cursor' not in request.query_params:
+            response.data['facets'] = {'tags': self._tag_facets()}
+        return response
+
+    def _tag_facets(self):
+        """ Count the tags of every matching post, most used first. """
+        matches = Post.objects.filter(
+            published_at__isnull=False, search_vector=self._query())
+        tags = Tag.objects.filter(posts__in=matches).annotate(
+            count=Count('posts')).order_by('-count', 'value')
+        return [{'id': tag.id, 'value': tag.value, 'count': tag.count}
+                for tag in tags[:settings.SEARCH_FACET_SIZE]]
@@ -53,3 +53,8 @@ class AuthTokenSRZ(srzs.Serializer):
             raise srzs.ValidationError(msg, code='authorization')
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSRZ(srzs.Serializer):
+    """ Serializer for a signed refresh token. """
+    refresh = srzs.CharField()
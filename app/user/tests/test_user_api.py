@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -15,6 +15,7 @@ def create_user(**params):
     return get_user_model().objects.create_user(**params)
 
 
+@override_settings(THROTTLE_ENABLED=False)
 class PublicUserApiTests(TestCase):
     """ Test the public feature of the user API """
 
@@ -1,28 +1,96 @@
-
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from rest_framework import generics, permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from core import auth
+from core.auth import TOKEN_AUTHENTICATION
+from core.throttling import THROTTLES
 from user.serzs import (
     UserSrzr,
     AuthTokenSRZ,
+    RefreshTokenSRZ,
     )
 
 
 class CreateUserViewSRZ(generics.CreateAPIView):
     """ Srsz: Create a new user in the system """
     serializer_class = UserSrzr
+    throttle_classes = THROTTLES
+    throttle_scope = 'signup'
 
 
 class CreateTokenView(ObtainAuthToken):
-    """ Create a new auth token for user. """
+    """
+    Create a new auth token for user, or a signed access and refresh
+    token pair with AUTH_TOKEN_MODE = 'signed'.
+    """
     serializer_class = AuthTokenSRZ
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        if settings.AUTH_TOKEN_MODE == 'signed':
+            return Response(auth.issue_tokens(user))
+        token, created = Token.objects.get_or_create(user=user)
+        if auth.db_token_expired(token):
+            token.delete()
+            token = Token.objects.create(user=user)
+        return Response({'token': token.key})
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """
+    Trade a signed refresh token for a new token pair. Each refresh
+    token works once.
+    """
+    serializer_class = RefreshTokenSRZ
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get_authenticate_header(self, request):
+        return auth.SignedTokenAuthentication.keyword
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user, payload = auth.verify(
+            serializer.validated_data['refresh'], auth.REFRESH)
+        if not auth.revoke(payload):
+            raise AuthenticationFailed('Token has been revoked.')
+        return Response(auth.issue_tokens(user))
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """
+    Log out: delete the database token of the request, or revoke its
+    signed access token and the refresh token given, if any.
+    """
+    serializer_class = RefreshTokenSRZ
+    authentication_classes = TOKEN_AUTHENTICATION
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        else:
+            auth.revoke(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            user, payload = auth.verify(refresh, auth.REFRESH)
+            if user.pk == request.user.pk:
+                auth.revoke(payload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """ Manage the authenticated user """
     serializer_class = UserSrzr
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = TOKEN_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
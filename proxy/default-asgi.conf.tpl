@@ -0,0 +1,27 @@
+server {
+    listen ${LISTEN_PORT};
+    location /static {
+        alias /vol/static;
+    }
+    location /static/uploads {
+        deny all;
+    }
+    location /api/comment/stream/ {
+        proxy_pass          http://${APP_HOST}:${APP_PORT};
+        proxy_http_version  1.1;
+        proxy_set_header    Host $host;
+        proxy_set_header    X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header    X-Forwarded-Proto $scheme;
+        proxy_buffering     off;
+        proxy_read_timeout  1h;
+    }
+    location / {
+        proxy_pass          http://${APP_HOST}:${APP_PORT};
+        proxy_http_version  1.1;
+        proxy_set_header    Host $host;
+        proxy_set_header    X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header    X-Forwarded-Proto $scheme;
+        client_max_body_size 10M;
+        proxy_request_buffering on;
+    }
+}
@@ -3,9 +3,13 @@ server {
     location /static {
         alias /vol/static;
     }
+    location /static/uploads {
+        deny all;
+    }
     location / {
         uwsgi_pass  ${APP_HOST}:${APP_PORT};
         include     /etc/nginx/uwsgi_params;
         client_max_body_size 10M;
+        uwsgi_request_buffering on;
     }
 }
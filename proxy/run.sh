@@ -1,4 +1,10 @@
 #!/bin/sh
 set -e
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+if [ "$APP_SERVER" = "asgi" ]; then
+    TEMPLATE=/etc/nginx/default-asgi.conf.tpl
+else
+    TEMPLATE=/etc/nginx/default.conf.tpl
+fi
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT}' \
+    < $TEMPLATE > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
\ No newline at end of file
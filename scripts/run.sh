@@ -1,6 +1,17 @@
 #!/bin/sh
 set -e
+mkdir -p "$FILE_UPLOAD_TEMP_DIR"
+# Workers keep their metrics in files here so /metrics can sum them
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
+if [ "$APP_SERVER" = "asgi" ]; then
+    gunicorn app.asgi:application --bind :9000 --workers 4 \
+        --worker-class uvicorn.workers.UvicornWorker
+else
+    uwsgi --socket :9000 --workers 4 --master --enable-threads \
+        --lazy-apps --module app.wsgi
+fi
@@ -0,0 +1,9 @@
+#!/bin/sh
+set -e
+# The worker keeps its metrics apart from the app's, which sums them in
+# through METRICS_EXTRA_DIRS
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/metrics}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+python manage.py wait_for_db
+python manage.py run_tasks